@@ -0,0 +1,138 @@
+# src/admission.py
+import os
+import threading
+from collections import deque
+from enum import Enum
+from typing import Dict, Optional
+
+from src.models import OrderStatus
+
+# Statuses in which an order is taking up kitchen capacity
+KITCHEN_STATUSES = (OrderStatus.PLACED, OrderStatus.PREPARING)
+
+
+class AdmissionPolicy(Enum):
+    REJECT = "reject"  # Turn new orders away while the kitchen is full
+    QUEUE = "queue"    # Take them, but hold them back until capacity frees up
+    QUOTE = "quote"    # Take them with an ETA that includes the backlog
+
+
+class AdmissionDecision:
+    def __init__(self, admitted: bool, queued: bool = False, extra_minutes: float = 0.0,
+                 reason: str = ""):
+        self.admitted = admitted
+        self.queued = queued
+        self.extra_minutes = extra_minutes  # Added to the order's ETA
+        self.reason = reason
+
+
+class AdmissionController:
+    """Limits how many orders the kitchen works on at once.
+
+    Orders count as in flight from admission until they are ready or
+    cancelled. Past the limit, the policy decides whether new orders are
+    rejected, queued (up to max_queue, released oldest first as orders
+    leave the kitchen) or accepted with a longer ETA.
+    """
+
+    def __init__(self, max_in_flight: int = 20, policy: AdmissionPolicy = AdmissionPolicy.REJECT,
+                 kitchen_stations: int = 4, max_queue: int = 50):
+        self.max_in_flight = max_in_flight
+        self.policy = policy
+        self.kitchen_stations = kitchen_stations
+        self.max_queue = max_queue
+        self._in_flight = set()
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+
+        # Counters exposed through metrics()
+        self.admitted = 0
+        self.queued = 0
+        self.quoted = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+
+    @classmethod
+    def from_environment(cls) -> Optional['AdmissionController']:
+        """Build a controller from ADMISSION_LIMIT and ADMISSION_POLICY, or None if no limit is set"""
+        limit = os.environ.get('ADMISSION_LIMIT')
+        if not limit:
+            return None
+        policy = AdmissionPolicy(os.environ.get('ADMISSION_POLICY', AdmissionPolicy.REJECT.value))
+        return cls(max_in_flight=int(limit), policy=policy)
+
+    def attach(self, orders: Dict) -> 'AdmissionController':
+        """Count the orders already in the kitchen, oldest first"""
+        with self._lock:
+            active = sorted((order for order in list(orders.values()) if order.status in KITCHEN_STATUSES),
+                            key=lambda order: order.creation_time)
+            for order in active:
+                if len(self._in_flight) < self.max_in_flight or self.policy != AdmissionPolicy.QUEUE:
+                    self._in_flight.add(order.order_id)
+                else:
+                    self._queue.append(order.order_id)
+        return self
+
+    @property
+    def station_load(self) -> float:
+        """Orders in flight per kitchen station"""
+        return len(self._in_flight) / self.kitchen_stations
+
+    def admit(self, order_id: str, preparation_minutes: float) -> AdmissionDecision:
+        """Decide whether a new order may enter the kitchen"""
+        with self._lock:
+            backlog = len(self._in_flight) + len(self._queue) - self.max_in_flight + 1
+            if backlog <= 0:
+                self._in_flight.add(order_id)
+                self.admitted += 1
+                return AdmissionDecision(True)
+
+            # Orders ahead beyond capacity are worked off a station's worth at a time
+            extra_minutes = -(-backlog // self.kitchen_stations) * preparation_minutes
+            if self.policy == AdmissionPolicy.QUOTE:
+                self._in_flight.add(order_id)
+                self.admitted += 1
+                self.quoted += 1
+                return AdmissionDecision(True, extra_minutes=extra_minutes)
+            if self.policy == AdmissionPolicy.QUEUE and len(self._queue) < self.max_queue:
+                self._queue.append(order_id)
+                self.admitted += 1
+                self.queued += 1
+                self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+                return AdmissionDecision(True, queued=True, extra_minutes=extra_minutes)
+
+            self.rejected += 1
+            return AdmissionDecision(False, reason="The kitchen is at capacity, please try again shortly")
+
+    def release(self, order_id: str) -> Optional[str]:
+        """Note an order left the kitchen; returns the queued order let in, if any"""
+        with self._lock:
+            if order_id in self._queue:
+                self._queue.remove(order_id)
+                return None
+            if order_id not in self._in_flight:
+                return None
+            self._in_flight.discard(order_id)
+            if self._queue and len(self._in_flight) < self.max_in_flight:
+                next_order_id = self._queue.popleft()
+                self._in_flight.add(next_order_id)
+                return next_order_id
+            return None
+
+    def is_queued(self, order_id: str) -> bool:
+        with self._lock:
+            return order_id in self._queue
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'in_flight': len(self._in_flight),
+                'max_in_flight': self.max_in_flight,
+                'station_load': len(self._in_flight) / self.kitchen_stations,
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self.max_queue_depth,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'quoted': self.quoted,
+                'rejected': self.rejected
+            }
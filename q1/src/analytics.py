@@ -0,0 +1,176 @@
+# src/analytics.py
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only the analytics module needs it
+    np = None
+
+from src.models import DeliveryMode, OrderStatus
+from src.database import Database
+from src.snapshot import StoreSnapshot
+
+# Modes are stored as small integer codes in the columnar export
+_MODES = list(DeliveryMode)
+_MODE_CODES = {mode: code for code, mode in enumerate(_MODES)}
+
+# Timestamps are naive local times, stored as seconds from this origin
+_EPOCH = datetime(1970, 1, 1)
+
+
+class OrderColumns:
+    """Order lines exported into parallel NumPy arrays, sorted by timestamp"""
+
+    def __init__(self, timestamps, item_codes, quantities, unit_prices, mode_codes,
+                 cancelled, item_ids: List[str]):
+        self.timestamps = timestamps    # datetime64[s], one entry per order line
+        self.item_codes = item_codes    # int32 index into item_ids
+        self.quantities = quantities    # int32
+        self.unit_prices = unit_prices  # float64
+        self.mode_codes = mode_codes    # int8 index into DeliveryMode
+        self.cancelled = cancelled      # bool, lines of cancelled orders
+        self.item_ids = item_ids
+        self.revenue = quantities * unit_prices
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+class OrderAnalytics:
+    """Vectorized revenue queries over the order history.
+
+    The columnar export and query results are cached until the store's
+    order generation changes, i.e. until an order is added or updated.
+    """
+
+    def __init__(self, db: Database):
+        if np is None:
+            raise ImportError("Order analytics requires NumPy (pip install numpy)")
+        self.db = db
+        self._columns: Optional[OrderColumns] = None
+        self._generation = -1
+        self._cache: Dict[tuple, object] = {}
+
+    @property
+    def columns(self) -> OrderColumns:
+        if self._columns is None or self._generation != self.db.orders_generation:
+            # Exported from a snapshot, so orders written during the export are left for next time
+            snapshot = self.db.snapshot()
+            self._generation = snapshot.generation
+            self._columns = self._export(snapshot)
+            self._cache.clear()
+        return self._columns
+
+    def _export(self, snapshot: StoreSnapshot) -> OrderColumns:
+        """Flatten every order line into columns, oldest first"""
+        timestamps, item_codes, quantities, prices, modes, cancelled = [], [], [], [], [], []
+        item_ids: List[str] = []
+        item_index: Dict[str, int] = {}
+
+        for order in snapshot.iter_orders():
+            mode_code = _MODE_CODES[order.delivery_mode]
+            is_cancelled = order.status == OrderStatus.CANCELLED
+            for item in order.items:
+                item_id = item.item_id
+                code = item_index.get(item_id)
+                if code is None:
+                    code = item_index[item_id] = len(item_ids)
+                    item_ids.append(item_id)
+
+                timestamps.append(order.creation_time)
+                item_codes.append(code)
+                quantities.append(item.quantity)
+                prices.append(item.unit_price)
+                modes.append(mode_code)
+                cancelled.append(is_cancelled)
+
+        return OrderColumns(
+            timestamps=np.array(timestamps, dtype='datetime64[s]'),
+            item_codes=np.array(item_codes, dtype=np.int32),
+            quantities=np.array(quantities, dtype=np.int32),
+            unit_prices=np.array(prices, dtype=np.float64),
+            mode_codes=np.array(modes, dtype=np.int8),
+            cancelled=np.array(cancelled, dtype=bool),
+            item_ids=item_ids
+        )
+
+    def _cached(self, key: tuple, compute):
+        columns = self.columns  # Refreshes the cache first if orders changed
+        if key not in self._cache:
+            self._cache[key] = compute(columns)
+        return self._cache[key]
+
+    def _mask(self, columns: OrderColumns, start: Optional[datetime],
+              end: Optional[datetime], include_cancelled: bool):
+        """Select lines in [start, end) using binary search on the sorted timestamps"""
+        lo = 0 if start is None else np.searchsorted(columns.timestamps, np.datetime64(start, 's'), 'left')
+        hi = len(columns) if end is None else np.searchsorted(columns.timestamps, np.datetime64(end, 's'), 'left')
+        mask = np.zeros(len(columns), dtype=bool)
+        mask[lo:hi] = True
+        if not include_cancelled:
+            mask &= ~columns.cancelled
+        return mask
+
+    def total_revenue(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      include_cancelled: bool = False) -> float:
+        """Total revenue of order lines created in [start, end)"""
+        def compute(columns):
+            return float(columns.revenue[self._mask(columns, start, end, include_cancelled)].sum())
+        return self._cached(('total', start, end, include_cancelled), compute)
+
+    def revenue_by_item(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        include_cancelled: bool = False) -> Dict[str, float]:
+        """Revenue per menu item ID"""
+        def compute(columns):
+            mask = self._mask(columns, start, end, include_cancelled)
+            totals = np.bincount(columns.item_codes[mask], weights=columns.revenue[mask],
+                                 minlength=len(columns.item_ids))
+            return {item_id: float(total) for item_id, total in zip(columns.item_ids, totals) if total}
+        return self._cached(('item', start, end, include_cancelled), compute)
+
+    def quantity_by_item(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         include_cancelled: bool = False) -> Dict[str, int]:
+        """Units sold per menu item ID"""
+        def compute(columns):
+            mask = self._mask(columns, start, end, include_cancelled)
+            totals = np.bincount(columns.item_codes[mask], weights=columns.quantities[mask],
+                                 minlength=len(columns.item_ids))
+            return {item_id: int(total) for item_id, total in zip(columns.item_ids, totals) if total}
+        return self._cached(('quantity', start, end, include_cancelled), compute)
+
+    def revenue_by_delivery_mode(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                 include_cancelled: bool = False) -> Dict[DeliveryMode, float]:
+        """Revenue per delivery mode"""
+        def compute(columns):
+            mask = self._mask(columns, start, end, include_cancelled)
+            totals = np.bincount(columns.mode_codes[mask], weights=columns.revenue[mask],
+                                 minlength=len(_MODES))
+            return {mode: float(totals[code]) for code, mode in enumerate(_MODES)}
+        return self._cached(('mode', start, end, include_cancelled), compute)
+
+    def revenue_by_time_bucket(self, bucket: timedelta = timedelta(hours=1),
+                               start: Optional[datetime] = None, end: Optional[datetime] = None,
+                               include_cancelled: bool = False) -> List[Tuple[datetime, float]]:
+        """Revenue per time bucket, e.g. per hour, as (bucket start, revenue) for non-empty buckets"""
+        bucket_seconds = int(bucket.total_seconds())
+        if bucket_seconds <= 0:
+            raise ValueError("Bucket size must be at least one second")
+
+        def compute(columns):
+            mask = self._mask(columns, start, end, include_cancelled)
+            seconds = columns.timestamps[mask].astype(np.int64)
+            buckets, inverse = np.unique(seconds // bucket_seconds, return_inverse=True)
+            totals = np.bincount(inverse, weights=columns.revenue[mask], minlength=len(buckets))
+            return [(_EPOCH + timedelta(seconds=int(b) * bucket_seconds), float(total))
+                    for b, total in zip(buckets, totals)]
+        return self._cached(('bucket', bucket_seconds, start, end, include_cancelled), compute)
+
+    def revenue_by_hour_of_day(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                               include_cancelled: bool = False) -> List[float]:
+        """Revenue for each hour of the day (0-23), summed across days"""
+        def compute(columns):
+            mask = self._mask(columns, start, end, include_cancelled)
+            hours = (columns.timestamps[mask].astype(np.int64) // 3600) % 24
+            return [float(total) for total in np.bincount(hours, weights=columns.revenue[mask], minlength=24)]
+        return self._cached(('hour_of_day', start, end, include_cancelled), compute)
@@ -0,0 +1,222 @@
+# src/archive.py
+import os
+import sys
+import gzip
+import lzma
+import json
+import struct
+import argparse
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Orders per compressed block: larger blocks compress better, smaller ones make lookups cheaper
+BLOCK_ORDERS = 500
+
+_MAGIC = b'QOAR'
+_HEADER = struct.Struct('<4sHB')    # magic, format version, codec
+_TRAILER = struct.Struct('<QQ4s')   # index offset, index length, magic
+
+CODECS = {
+    'gzip': (1, gzip.compress, gzip.decompress),
+    'lzma': (2, lzma.compress, lzma.decompress)
+}
+_CODEC_NAMES = {code: name for name, (code, _, _) in CODECS.items()}
+
+Record = Tuple[str, dict]
+
+
+class ArchiveStats:
+    """Size of an archive against the same orders as JSON lines"""
+
+    def __init__(self, codec: str):
+        self.codec = codec
+        self.orders = 0
+        self.blocks = 0
+        self.raw_bytes = 0
+        self.archive_bytes = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / self.archive_bytes if self.archive_bytes else 0.0
+
+    def report(self) -> str:
+        return (f"{self.orders} orders in {self.blocks} {self.codec} blocks: "
+                f"{self.archive_bytes:,} bytes from {self.raw_bytes:,} ({self.ratio:.1f}x smaller)")
+
+
+class BlockInfo:
+    """Where a block sits in the archive and which orders it holds"""
+
+    def __init__(self, offset: int, length: int, first: datetime, last: datetime, order_ids: List[str]):
+        self.offset = offset
+        self.length = length
+        self.first = first  # Earliest creation time in the block
+        self.last = last    # Latest creation time in the block
+        self.order_ids = order_ids
+
+    def to_dict(self) -> Dict:
+        return {'offset': self.offset, 'length': self.length, 'first': self.first.isoformat(),
+                'last': self.last.isoformat(), 'order_ids': self.order_ids}
+
+    @classmethod
+    def from_dict(cls, record: Dict) -> 'BlockInfo':
+        return cls(record['offset'], record['length'], datetime.fromisoformat(record['first']),
+                   datetime.fromisoformat(record['last']), record['order_ids'])
+
+
+def write_archive(path: str, orders: Iterable[Record], codec: str = 'lzma',
+                  block_orders: int = BLOCK_ORDERS) -> ArchiveStats:
+    """Write stored order records to a compressed archive.
+
+    Orders are packed into blocks of block_orders, each compressed on its
+    own, followed by an index of the ids and creation-time range of every
+    block. Passing orders in creation order keeps block time ranges
+    disjoint, so date-range reads touch as few blocks as possible. The
+    archive replaces path only once complete.
+    """
+    code, compress, _ = CODECS[codec]
+    stats = ArchiveStats(codec)
+    blocks: List[BlockInfo] = []
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, 1, code))
+
+        def write_block(batch: List[Record]):
+            raw = ''.join(json.dumps([order_id, record]) + '\n' for order_id, record in batch).encode()
+            data = compress(raw)
+            times = [datetime.fromisoformat(record['creation_time']) for _, record in batch]
+            blocks.append(BlockInfo(f.tell(), len(data), min(times), max(times),
+                                    [order_id for order_id, _ in batch]))
+            f.write(data)
+            stats.raw_bytes += len(raw)
+
+        batch: List[Record] = []
+        for order_id, record in orders:
+            batch.append((order_id, record))
+            stats.orders += 1
+            if len(batch) == block_orders:
+                write_block(batch)
+                batch = []
+        if batch:
+            write_block(batch)
+
+        index = compress(json.dumps([block.to_dict() for block in blocks]).encode())
+        index_offset = f.tell()
+        f.write(index)
+        f.write(_TRAILER.pack(index_offset, len(index), _MAGIC))
+        stats.blocks = len(blocks)
+        stats.archive_bytes = f.tell()
+
+    os.replace(path + '.tmp', path)
+    return stats
+
+
+class OrderArchive:
+    """Reads an order archive, decompressing only the blocks a query needs"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.blocks_read = 0  # Blocks decompressed so far
+        self._cached: Tuple[int, List[Record]] = (-1, [])
+
+        with open(path, 'rb') as f:
+            magic, version, code = _HEADER.unpack(f.read(_HEADER.size))
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            index_offset, index_length, trailer_magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != _MAGIC or trailer_magic != _MAGIC or version != 1 or code not in _CODEC_NAMES:
+                raise ValueError(f"{path} is not a compatible order archive")
+            self.codec = _CODEC_NAMES[code]
+            self._decompress = CODECS[self.codec][2]
+            f.seek(index_offset)
+            index = json.loads(self._decompress(f.read(index_length)))
+
+        self.blocks = [BlockInfo.from_dict(record) for record in index]
+        self._block_of = {order_id: number for number, block in enumerate(self.blocks)
+                          for order_id in block.order_ids}
+
+    def __len__(self) -> int:
+        return len(self._block_of)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._block_of
+
+    def _read_block(self, number: int) -> List[Record]:
+        # Consecutive lookups often hit the same block, so the last one is kept
+        if self._cached[0] != number:
+            block = self.blocks[number]
+            with open(self.path, 'rb') as f:
+                f.seek(block.offset)
+                raw = self._decompress(f.read(block.length))
+            self.blocks_read += 1
+            self._cached = (number, [tuple(json.loads(line)) for line in raw.splitlines()])
+        return self._cached[1]
+
+    def get(self, order_id: str) -> Optional[dict]:
+        """The stored record of an archived order, or None"""
+        number = self._block_of.get(order_id)
+        if number is None:
+            return None
+        for key, record in self._read_block(number):
+            if key == order_id:
+                return record
+        return None
+
+    def iter_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[Record]:
+        """Archived orders created in [start, end), reading only blocks whose range overlaps it"""
+        for number, block in enumerate(self.blocks):
+            if (start is not None and block.last < start) or (end is not None and block.first >= end):
+                continue
+            for order_id, record in self._read_block(number):
+                created = datetime.fromisoformat(record['creation_time'])
+                if (start is None or created >= start) and (end is None or created < end):
+                    yield order_id, record
+
+    def orders_by_day(self, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None) -> Dict[date, Dict[str, int]]:
+        """Archived orders per creation day in [start, end), counted by status"""
+        report: Dict[date, Dict[str, int]] = {}
+        for _, record in self.iter_range(start, end):
+            day = report.setdefault(datetime.fromisoformat(record['creation_time']).date(), {})
+            day[record['status']] = day.get(record['status'], 0) + 1
+        return dict(sorted(report.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write or query a compressed archive of orders")
+    commands = parser.add_subparsers(dest='command', required=True)
+    write = commands.add_parser('write', help="archive the orders of a data directory")
+    write.add_argument('data_dir')
+    write.add_argument('archive')
+    write.add_argument('--before', type=datetime.fromisoformat, help="only orders created before this time")
+    write.add_argument('--codec', choices=sorted(CODECS), default='lzma')
+    get = commands.add_parser('get', help="print one archived order")
+    get.add_argument('archive')
+    get.add_argument('order_id')
+    report = commands.add_parser('report', help="orders per day and status")
+    report.add_argument('archive')
+    report.add_argument('--start', type=datetime.fromisoformat)
+    report.add_argument('--end', type=datetime.fromisoformat)
+    args = parser.parse_args()
+
+    if args.command == 'write':
+        from src.database import Database
+        db = Database(data_dir=args.data_dir)
+        print(db.archive_orders(args.archive, args.before, args.codec).report())
+        db.close()
+        return
+
+    archive = OrderArchive(args.archive)
+    if args.command == 'get':
+        record = archive.get(args.order_id)
+        if record is None:
+            print(f"Order {args.order_id} is not in the archive")
+            sys.exit(1)
+        print(json.dumps(record, indent=4))
+    else:
+        for day, counts in archive.orders_by_day(args.start, args.end).items():
+            print(f"{day}: " + ", ".join(f"{status} {count}" for status, count in sorted(counts.items())))
+        print(f"({archive.blocks_read} of {len(archive.blocks)} blocks read)")
+
+
+if __name__ == "__main__":
+    main()
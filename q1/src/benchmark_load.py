@@ -0,0 +1,88 @@
+# src/benchmark_load.py
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Tuple
+
+from src.models import MenuItem, Order, OrderItem, OrderStatus, DeliveryMode
+
+
+def make_records(count: int, menu_items: Dict[str, MenuItem]) -> Dict[str, dict]:
+    """Build stored order records shaped like orders.json"""
+    item_ids = list(menu_items)
+    statuses = list(OrderStatus)
+    start = datetime(2024, 1, 1)
+    records = {}
+    for index in range(count):
+        created = start + timedelta(minutes=index)
+        records[str(uuid.uuid4())] = {
+            'customer_username': f"user{index % 100}",
+            'items': [{'menu_item_id': item_ids[(index + offset) % len(item_ids)], 'quantity': 1 + offset}
+                      for offset in range(3)],
+            'delivery_mode': DeliveryMode.HOME_DELIVERY.value,
+            'delivery_address': "1 Bench St",
+            'status': statuses[index % len(statuses)].value,
+            'creation_time': created.isoformat(),
+            'estimated_completion_time': (created + timedelta(minutes=45)).isoformat(),
+            'assigned_delivery_agent': None,
+            'version': 1
+        }
+    return records
+
+
+def hydrate_with_constructor(order_id: str, record: dict, menu_items: Dict[str, MenuItem]) -> Order:
+    """The previous load path: build through Order(...) then overwrite from the record"""
+    order_items = []
+    for item_data in record.get('items', []):
+        menu_item = menu_items.get(item_data['menu_item_id'])
+        if menu_item:
+            order_items.append(OrderItem(menu_item=menu_item, quantity=item_data['quantity']))
+    
+    order = Order(
+        order_id=order_id,
+        customer_username=record['customer_username'],
+        items=order_items,
+        delivery_mode=DeliveryMode(record['delivery_mode']),
+        delivery_address=record.get('delivery_address')
+    )
+    order.status = OrderStatus(record['status'])
+    order.creation_time = datetime.fromisoformat(record['creation_time'])
+    order.estimated_completion_time = datetime.fromisoformat(record['estimated_completion_time'])
+    order.assigned_delivery_agent = record.get('assigned_delivery_agent')
+    order.version = record.get('version', 0)
+    return order
+
+
+def time_hydration(hydrate: Callable, records: Dict[str, dict],
+                   menu_items: Dict[str, MenuItem], repeats: int = 3) -> float:
+    """Best per-order hydration time in microseconds over several runs"""
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for order_id, record in records.items():
+            hydrate(order_id, record, menu_items)
+        best = min(best, time.perf_counter() - started)
+    return best / len(records) * 1e6
+
+
+def run(count: int = 20000) -> Tuple[float, float]:
+    """Compare per-order load cost of the constructor path and Order.from_record"""
+    menu_items = {f"item{index}": MenuItem(f"item{index}", f"Item {index}", 5.0 + index, 10 + index)
+                  for index in range(20)}
+    records = make_records(count, menu_items)
+    return (time_hydration(hydrate_with_constructor, records, menu_items),
+            time_hydration(Order.from_record, records, menu_items))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    before, after = run(count)
+    print(f"Hydrating {count} orders")
+    print(f"  Order(...) + overwrite: {before:8.2f} us/order")
+    print(f"  Order.from_record:      {after:8.2f} us/order")
+    print(f"  Speedup:                {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
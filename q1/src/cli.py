@@ -1,17 +1,30 @@
 import os
+import sys
 from typing import List, Dict, Optional, Tuple
 import time
-from datetime import datetime
 
 from src.models import DeliveryMode, OrderStatus
+from src.database import Database
 from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+from src.profiling import StartupProfile
+from src.admission import AdmissionController
+from src.timeseries import ORDERS_PLACED, TIME_TO_READY, ACTIVE_AGENTS, sparkline
+from src.memory import MemoryProfiler, start_tracing
 
 class CLI:
-    def __init__(self):
-        self.user_service = UserService()
-        self.menu_service = MenuService()
-        self.order_service = OrderService()
-        self.delivery_service = DeliveryAgentService()
+    # Number of orders shown per screen in the order listings
+    PAGE_SIZE = 20
+    
+    def __init__(self, clock=None, admission=None):
+        # One store shared by every screen, so their writes never overwrite each other
+        db = Database(clock=clock)
+        self.clock = db.clock
+        self.user_service = UserService(db)
+        self.menu_service = MenuService(db)
+        self.order_service = OrderService(db, admission)
+        self.delivery_service = DeliveryAgentService(db)
+        # Kept for the session, so each memory report shows growth since the last one
+        self.memory_profiler = MemoryProfiler(db)
         
         # Current session
         self.current_user = None
@@ -34,6 +47,11 @@ class CLI:
         """Wait for user to press Enter"""
         input("\nPress Enter to continue...")
     
+    def show_more(self):
+        """Ask whether to show the next page of a listing"""
+        choice = input("\nPress Enter for more, or 'q' to stop: ")
+        return choice.strip().lower() != 'q'
+    
     def main_menu(self):
         """Display the main menu"""
         while True:
@@ -55,6 +73,8 @@ class CLI:
             elif choice == '4':
                 self.admin_login()
             elif choice == '5':
+                # Make sure changes still queued for the background writer are stored
+                self.order_service.db.close()
                 print("\nThank you for using our Food Delivery System!")
                 break
             else:
@@ -250,16 +270,23 @@ class CLI:
         """Display all orders for the current user"""
         self.print_header("My Orders")
         
-        orders = self.user_service.get_user_orders(self.current_user)
+        orders, cursor = self.user_service.get_user_orders_page(self.current_user, page_size=self.PAGE_SIZE)
         if not orders:
             print("You have no orders.")
         else:
             print(f"{'Order ID':<36} | {'Date':<19} | {'Status':<15} | {'Total':<8} | {'Delivery Type':<15}")
             print("-" * 100)
             
-            for order in orders:
-                date = order.creation_time.strftime("%Y-%m-%d %H:%M")
-                print(f"{order.order_id:<36} | {date:<19} | {order.status.value:<15} | ${order.total_price:<7.2f} | {order.delivery_mode.value:<15}")
+            # Page through the history so long-lived accounts start printing immediately
+            while True:
+                for order in orders:
+                    date = order.creation_time.strftime("%Y-%m-%d %H:%M")
+                    print(f"{order.order_id:<36} | {date:<19} | {order.status.value:<15} | ${order.total_price:<7.2f} | {order.delivery_mode.value:<15}")
+                
+                if cursor is None or not self.show_more():
+                    break
+                orders, cursor = self.user_service.get_user_orders_page(
+                    self.current_user, cursor, self.PAGE_SIZE)
         
         self.wait_for_enter()
     
@@ -278,7 +305,7 @@ class CLI:
         # Display order details
         print(f"Order ID: {order.order_id}")
         print(f"Status: {order.status.value}")
-        print(f"Estimated Time Remaining: {order.get_time_remaining()} minutes")
+        print(f"Estimated Time Remaining: {order.get_time_remaining(self.clock.now())} minutes")
         
         # Order items
         print("\nItems:")
@@ -305,7 +332,8 @@ class CLI:
             print("1. View Assigned Orders")
             print("2. Update Order Status")
             print("3. Complete Order")
-            print("4. Logout")
+            print("4. Update My Location")
+            print("5. Logout")
             
             choice = input("\nEnter your choice: ")
             
@@ -316,6 +344,8 @@ class CLI:
             elif choice == '3':
                 self.complete_delivery()
             elif choice == '4':
+                self.update_agent_location()
+            elif choice == '5':
                 self.current_agent = None
                 print("\nLogged out successfully.")
                 self.wait_for_enter()
@@ -324,6 +354,20 @@ class CLI:
                 print("\nInvalid choice. Please try again.")
                 self.wait_for_enter()
     
+    def update_agent_location(self):
+        """Report the current agent's position, used to offer them the nearest orders"""
+        self.print_header("Update My Location")
+        
+        try:
+            east = float(input("Kilometres east of the restaurant (negative for west): "))
+            north = float(input("Kilometres north of the restaurant (negative for south): "))
+            success, message = self.delivery_service.update_location(self.current_agent, east, north)
+            print(f"\n{message}")
+        except ValueError:
+            print("\nInvalid input. Please enter numbers.")
+        
+        self.wait_for_enter()
+    
     def display_agent_orders(self):
         """Display orders assigned to the current agent"""
         self.print_header("My Assigned Orders")
@@ -461,7 +505,8 @@ class CLI:
             print("4. Manage Delivery Agents")
             print("5. Restaurant Dashboard")
             print("6. Assign Delivery Agent")
-            print("7. Logout")
+            print("7. Memory Report")
+            print("8. Logout")
             
             choice = input("\nEnter your choice: ")
             
@@ -478,6 +523,8 @@ class CLI:
             elif choice == '6':
                 self.assign_delivery_agent()
             elif choice == '7':
+                self.memory_report()
+            elif choice == '8':
                 self.is_admin = False
                 print("\nLogged out successfully.")
                 self.wait_for_enter()
@@ -486,6 +533,12 @@ class CLI:
                 print("\nInvalid choice. Please try again.")
                 self.wait_for_enter()
     
+    def memory_report(self):
+        """Show the memory held by each part of the store, and growth since the last report"""
+        self.print_header("Memory Report")
+        print(self.memory_profiler.report())
+        self.wait_for_enter()
+    
     def manage_menu(self):
         """Admin interface for menu management"""
         while True:
@@ -494,7 +547,9 @@ class CLI:
             print("2. Add Menu Item")
             print("3. Update Menu Item")
             print("4. Delete Menu Item")
-            print("5. Back to Admin Menu")
+            print("5. Import Menu From File")
+            print("6. Export Menu To File")
+            print("7. Back to Admin Menu")
             
             choice = input("\nEnter your choice: ")
             
@@ -507,6 +562,10 @@ class CLI:
             elif choice == '4':
                 self.delete_menu_item()
             elif choice == '5':
+                self.import_menu()
+            elif choice == '6':
+                self.export_menu()
+            elif choice == '7':
                 break
             else:
                 print("\nInvalid choice. Please try again.")
@@ -539,6 +598,25 @@ class CLI:
         
         self.wait_for_enter()
     
+    def import_menu(self):
+        """Add or update menu items from a CSV or JSONL file"""
+        self.print_header("Import Menu")
+        print("Columns: name, price, preparation_time and optionally item_id to update an item.")
+        
+        path = input("Enter file path (.csv or .jsonl): ").strip()
+        success, message = self.menu_service.import_items(path)
+        print(f"\n{message}")
+        self.wait_for_enter()
+    
+    def export_menu(self):
+        """Write the menu to a CSV or JSONL file"""
+        self.print_header("Export Menu")
+        
+        path = input("Enter file path (.csv or .jsonl): ").strip()
+        success, message = self.menu_service.export_items(path)
+        print(f"\n{message}")
+        self.wait_for_enter()
+    
     def update_menu_item(self):
         """Update an existing menu item"""
         self.print_header("Update Menu Item")
@@ -632,15 +710,20 @@ class CLI:
         """View all orders in the system"""
         self.print_header("All Orders")
         
-        orders = self.order_service.get_all_orders()
+        orders, cursor = self.order_service.get_orders_page(page_size=self.PAGE_SIZE)
         if not orders:
             print("No orders in the system.")
         else:
             print(f"{'Order ID':<36} | {'Customer':<15} | {'Status':<15} | {'Total':<8} | {'Type':<15}")
             print("-" * 95)
             
-            for order in orders:
-                print(f"{order.order_id:<36} | {order.customer_username:<15} | {order.status.value:<15} | ${order.total_price:<7.2f} | {order.delivery_mode.value:<15}")
+            while True:
+                for order in orders:
+                    print(f"{order.order_id:<36} | {order.customer_username:<15} | {order.status.value:<15} | ${order.total_price:<7.2f} | {order.delivery_mode.value:<15}")
+                
+                if cursor is None or not self.show_more():
+                    break
+                orders, cursor = self.order_service.get_orders_page(cursor, self.PAGE_SIZE)
         
         self.wait_for_enter()
     
@@ -661,8 +744,10 @@ class CLI:
         print("-" * 90)
         
         order_map = {}
+        order_versions = {}
         for i, order in enumerate(active_orders, 1):
             order_map[i] = order
+            order_versions[i] = order.version
             print(f"{i:<3} | {order.order_id:<36} | {order.customer_username:<15} | {order.status.value:<15} | {order.delivery_mode.value:<15}")
         
         try:
@@ -695,9 +780,11 @@ class CLI:
                 status_choice = int(input("\nSelect new status: "))
                 if 1 <= status_choice <= len(valid_transitions[current_status]):
                     new_status = valid_transitions[current_status][status_choice - 1]
+                    # Reject the update if someone else changed the order while we were choosing
                     result, message = self.order_service.update_order_status(
                         selected_order.order_id, 
-                        new_status
+                        new_status,
+                        expected_version=order_versions[order_choice]
                     )
                     print(f"\n{message}")
                 else:
@@ -768,9 +855,9 @@ class CLI:
         """Show restaurant dashboard with real-time data"""
         self.print_header("Restaurant Dashboard")
         
-        orders = self.order_service.get_all_orders()
-        active_orders = [order for order in orders if order.status not in 
-                        [OrderStatus.DELIVERED, OrderStatus.PICKED_UP, OrderStatus.CANCELLED]]
+        # A point-in-time view, so orders placed or updated meanwhile cannot skew the figures
+        orders = list(self.order_service.get_orders_snapshot().orders.values())
+        active_orders = [order for order in orders if order.is_active]
         
         # Order counts by status
         status_counts = {}
@@ -779,8 +866,9 @@ class CLI:
             status_counts[status] = status_counts.get(status, 0) + 1
         
         # Daily order total
+        now = self.clock.now()
         today_orders = [order for order in orders if 
-                       order.creation_time.date() == datetime.now().date()]
+                       order.creation_time.date() == now.date()]
         today_revenue = sum(order.total_price for order in today_orders)
         
         # Display dashboard
@@ -792,13 +880,40 @@ class CLI:
         for status, count in status_counts.items():
             print(f"- {status}: {count}")
         
+        # Measured time spent in each stage, from the rolling timing histograms
+        stage_summary = self.order_service.db.stage_timings.stage_summary()
+        if stage_summary:
+            print("\nTime Spent Per Stage (recent orders):")
+            for stage, samples, p50, p95, p99 in stage_summary:
+                print(f"- {stage}: p50 {p50:.1f} mins, p95 {p95:.1f} mins, p99 {p99:.1f} mins ({samples} orders)")
+        
+        # Throughput trends from the time series, one character per minute or hour
+        timeseries = self.order_service.db.timeseries
+        print("\nTrends (last hour by minute | last 24 hours by hour):")
+        for name, label, unit in ((ORDERS_PLACED, "Orders/min", ""), (TIME_TO_READY, "Time to ready", " mins"),
+                                  (ACTIVE_AGENTS, "Active agents", "")):
+            minutes = timeseries.values(name, now=now)
+            hours = timeseries.values(name, hourly=True, now=now)
+            latest = next((value for value in reversed(hours) if value is not None), 0)
+            print(f"- {label:<14} {sparkline(minutes)} | {sparkline(hours)} {latest:.1f}{unit}")
+        
+        # Kitchen load and backpressure, when intake is limited
+        admission = self.order_service.admission
+        if admission is not None:
+            metrics = admission.metrics()
+            print(f"\nKitchen Load ({admission.policy.value} past {metrics['max_in_flight']} orders):")
+            print(f"- In flight: {metrics['in_flight']} ({metrics['station_load']:.1f} per station)")
+            print(f"- Queued: {metrics['queue_depth']} (peak {metrics['max_queue_depth']})")
+            print(f"- Admitted: {metrics['admitted']}, quoted longer ETAs: {metrics['quoted']}, "
+                  f"rejected: {metrics['rejected']}")
+        
         print("\nRecent Active Orders:")
         if active_orders:
             print(f"{'Order ID':<36} | {'Customer':<15} | {'Status':<15} | {'Time Left':<10}")
             print("-" * 80)
             
-            for order in sorted(active_orders, key=lambda o: o.get_time_remaining())[:5]:  # Show 5 most urgent orders
-                print(f"{order.order_id:<36} | {order.customer_username:<15} | {order.status.value:<15} | {order.get_time_remaining()} mins")
+            for order in sorted(active_orders, key=lambda o: o.get_time_remaining(now))[:5]:  # Show 5 most urgent orders
+                print(f"{order.order_id:<36} | {order.customer_username:<15} | {order.status.value:<15} | {order.get_time_remaining(now)} mins")
         else:
             print("No active orders.")
         
@@ -825,8 +940,10 @@ class CLI:
         print("-" * 90)
         
         order_map = {}
+        order_versions = {}
         for i, order in enumerate(ready_orders, 1):
             order_map[i] = order
+            order_versions[i] = order.version
             print(f"{i:<3} | {order.order_id:<36} | {order.customer_username:<15} | {order.delivery_address or 'N/A':<30}")
         
         try:
@@ -851,8 +968,10 @@ class CLI:
             print("-" * 55)
             
             agent_map = {}
+            agent_versions = {}
             for i, agent in enumerate(available_agents, 1):
                 agent_map[i] = agent
+                agent_versions[i] = agent.version
                 print(f"{i:<3} | {agent.username:<20} | {agent.phone:<15} | {len(agent.current_orders):<12}")
             
             agent_choice = int(input("\nSelect agent number: "))
@@ -866,7 +985,9 @@ class CLI:
             # Assign the agent to the order
             result, message = self.delivery_service.assign_agent_to_order(
                 selected_order.order_id, 
-                selected_agent.username
+                selected_agent.username,
+                expected_order_version=order_versions[order_choice],
+                expected_agent_version=agent_versions[agent_choice]
             )
             
             print(f"\n{message}")
@@ -880,25 +1001,60 @@ class CLI:
 
 def main():
     """Main entry point for the application"""
+    # Pass --startup-profile to print where cold start time goes
+    profile = StartupProfile()
+    show_profile = '--startup-profile' in sys.argv[1:]
+    # Pass --memory-profile to trace allocations for the admin Memory Report
+    if '--memory-profile' in sys.argv[1:]:
+        start_tracing()
+    
     # Create data directory if it doesn't exist
     import os
     os.makedirs("data", exist_ok=True)
     
     # Add sample data for demonstration if needed
-    menu_service = MenuService()
-    user_service = UserService()
-    delivery_service = DeliveryAgentService()
+    with profile.phase("create seed services"):
+        menu_service = MenuService()
+        user_service = UserService()
+        delivery_service = DeliveryAgentService()
     
     # Add sample menu items if no menu exists
+    with profile.phase("seed sample data"):
+        _seed_sample_data(menu_service, user_service, delivery_service)
+        # The CLI reloads from storage, so seed writes must not be left pending
+        for service in (menu_service, user_service, delivery_service):
+            service.db.close()
+    
+    # Start the CLI
+    with profile.phase("create CLI services"):
+        cli = CLI(admission=AdmissionController.from_environment())
+    
+    if show_profile:
+        print(profile.report("CLI Startup Profile"))
+        print()
+        print(cli.order_service.db.load_profile.report("Data Directory Load (per store)"))
+        if cli.order_service.db.order_load_stats is not None:
+            print("\nOrders File Load")
+            print("-" * 50)
+            print(cli.order_service.db.order_load_stats.report())
+        input("\nPress Enter to continue...")
+    
+    cli.main_menu()
+
+
+def _seed_sample_data(menu_service, user_service, delivery_service):
+    """Add the demo menu, customer and agent on first run"""
     if len(menu_service.get_all_items()) == 0:
-        menu_service.add_item("Margherita Pizza", 9.99, 15)
-        menu_service.add_item("Pepperoni Pizza", 11.99, 18)
-        menu_service.add_item("Veggie Burger", 8.50, 12)
-        menu_service.add_item("Chicken Wings", 7.99, 20)
-        menu_service.add_item("French Fries", 3.99, 8)
-        menu_service.add_item("Chocolate Cake", 5.99, 5)
-        menu_service.add_item("Caesar Salad", 6.99, 10)
-        menu_service.add_item("Iced Tea", 2.50, 2)
+        menu_service.add_items([
+            ("Margherita Pizza", 9.99, 15),
+            ("Pepperoni Pizza", 11.99, 18),
+            ("Veggie Burger", 8.50, 12),
+            ("Chicken Wings", 7.99, 20),
+            ("French Fries", 3.99, 8),
+            ("Chocolate Cake", 5.99, 5),
+            ("Caesar Salad", 6.99, 10),
+            ("Iced Tea", 2.50, 2)
+        ])
     
     # Add a test customer if none exists
     success, _ = user_service.get_user_details("customer")
@@ -908,10 +1064,6 @@ def main():
     # Add a test delivery agent if none exists
     if not delivery_service.get_agent_details("agent")[0]:
         delivery_service.register_agent("agent", "password", "555-5678")
-    
-    # Start the CLI
-    cli = CLI()
-    cli.main_menu()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,38 @@
+# src/clock.py
+import threading
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """Wall-clock time, the default everywhere"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+
+class VirtualClock:
+    """Time that only moves when told to, for tests and simulations"""
+
+    def __init__(self, start: datetime = datetime(2024, 1, 1, 9, 0)):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        with self._lock:
+            return self._now
+
+    def advance(self, delta: timedelta):
+        if delta < timedelta(0):
+            raise ValueError("A virtual clock cannot go backwards")
+        with self._lock:
+            self._now += delta
+
+    def advance_to(self, moment: datetime):
+        """Move the clock forward to a moment; earlier moments leave it unchanged"""
+        with self._lock:
+            if moment > self._now:
+                self._now = moment
+
+
+# Shared default so components without an injected clock agree on the time source
+SYSTEM_CLOCK = SystemClock()
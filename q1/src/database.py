@@ -1,50 +1,226 @@
 import os
-import json
-from typing import Dict, List, Optional
+import threading
+from bisect import bisect_right, insort
+from contextlib import contextmanager
+from itertools import takewhile
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 
-from src.models import User, MenuItem, Order, DeliveryAgent, OrderItem, DeliveryMode, OrderStatus
+from src.models import User, MenuItem, Order, DeliveryAgent, OrderStatus, OrderHistory
+from src.json_stream import LoadStats
+from src.storage import JsonFileStorage
+from src.profiling import StartupProfile
+from src.clock import SYSTEM_CLOCK
+from src.idempotency import IdempotencyTable
+from src.metrics import StageTimings
+from src.distance import DeliveryTimeEstimator
+from src.snapshot import SnapshotTable, StoreSnapshot
+from src.timeseries import TimeSeriesRecorder, TIMESERIES_FILE
+from src.writer import BackgroundWriter, DurabilityMode
+from src.migrations import Migrator
+from src.replication_log import (ReplicationLog, REPLICATION_LOG_FILE, REPLICATED_COLLECTIONS, ROTATE_BYTES,
+                                 read_checkpoint, write_checkpoint)
+from src.archive import ArchiveStats, write_archive
+from src.spatial import AgentGrid, Location
+
+
+def order_sort_key(order: Order) -> Tuple[datetime, str]:
+    """Stable listing key for orders: creation time, ties broken by order ID"""
+    return (order.creation_time, order.order_id)
+
+
+def encode_cursor(order: Order) -> str:
+    """Encode the position just after an order as an opaque page cursor"""
+    return f"{order.creation_time.isoformat()}|{order.order_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a page cursor back into an order sort key"""
+    created, _, order_id = cursor.partition('|')
+    return (datetime.fromisoformat(created), order_id)
+
+
+# Record codecs shared by the loaders, the savers and replication
+
+def _user_record(user: User) -> dict:
+    return {'password': user.password, 'address': user.address, 'phone': user.phone}
+
+
+def _user_from_record(username: str, record: dict) -> User:
+    return User(username=username, password=record['password'], address=record['address'],
+                phone=record['phone'])
+
+
+def _menu_item_record(item: MenuItem) -> dict:
+    return {'name': item.name, 'price': item.price, 'preparation_time': item.preparation_time}
+
+
+def _menu_item_from_record(item_id: str, record: dict) -> MenuItem:
+    return MenuItem(item_id=item_id, name=record['name'], price=record['price'],
+                    preparation_time=record['preparation_time'])
+
+
+def _order_record(order: Order) -> dict:
+    return {
+        'customer_username': order.customer_username,
+        'items': [{'menu_item_id': item.menu_item.item_id, 'quantity': item.quantity}
+                  for item in order.items],
+        'delivery_mode': order.delivery_mode.value,
+        'delivery_address': order.delivery_address,
+        'status': order.status.value,
+        'creation_time': order.creation_time.isoformat(),
+        'estimated_completion_time': order.estimated_completion_time.isoformat(),
+        'assigned_delivery_agent': order.assigned_delivery_agent,
+        'version': order.version,
+        # Copied in one step, a service thread may be adding a status meanwhile
+        'status_times': {status.value: entered.isoformat()
+                         for status, entered in dict(order.status_times).items()}
+    }
+
+
+def _agent_record(agent: DeliveryAgent) -> dict:
+    return {
+        'password': agent.password,
+        'phone': agent.phone,
+        'available': agent.available,
+        'current_orders': list(agent.current_orders),
+        'version': agent.version,
+        'location': list(agent.location) if agent.location else None
+    }
+
+
+def _agent_from_record(username: str, record: dict) -> DeliveryAgent:
+    agent = DeliveryAgent(username=username, password=record['password'], phone=record['phone'])
+    agent.available = record.get('available', True)
+    agent.current_orders = record.get('current_orders', [])
+    agent.version = record.get('version', 0)
+    location = record.get('location')
+    agent.location = tuple(location) if location else None
+    return agent
+
+
+# Record locks per kind; keys sharing a stripe also share its lock
+LOCK_STRIPES = 256
+LOCK_KINDS = ('idempotency', 'order', 'agent')
 
 
 class Database:
-    """Database class for handling data persistence using JSON files"""
+    """Database class for handling data persistence through a storage backend"""
 
-    def __init__(self):
-        """Initialize database and create data files if needed"""
-        # Get data directory from environment or use default
-        self.data_dir = os.environ.get('DATA_DIR', 'data')
+    def __init__(self, data_dir: Optional[str] = None, storage=None,
+                 durability: Optional[DurabilityMode] = None, write_interval: float = 0.5,
+                 clock=None, replicate: Optional[bool] = None):
+        """Initialize database and create data files if needed.
+        
+        Records are kept in the given storage backend, by default JSON files
+        in data_dir, else the DATA_DIR environment variable, else 'data'.
+        Writes follow the durability mode, else the DURABILITY_MODE
+        environment variable, else sync. Services on this store read the
+        time from its clock, the system clock unless one is given. With
+        replicate, else REPLICATION_LOG=1, every record write is also logged
+        for warm standby replicas, which start from the directory's checkpoint.
+        """
+        if storage is None:
+            storage = JsonFileStorage(data_dir or os.environ.get('DATA_DIR', 'data'))
+        self.storage = storage
+        self.data_dir = storage.data_dir  # None for in-memory storage
+        
+        self.clock = clock or SYSTEM_CLOCK
+        
+        # Record-level log followed by replicas, appended before each write returns
+        if replicate is None:
+            replicate = os.environ.get('REPLICATION_LOG') == '1'
+        self.replication_log: Optional[ReplicationLog] = None
+        
+        # Change feed of order events, shared by every store on the same storage
+        self.change_feed = storage.change_feed()
+        if clock is not None:
+            self.change_feed.clock = clock
+        
+        # Load initial data, once the files are at the current schema
+        self.order_load_stats: Optional[LoadStats] = None
+        self.load_profile = StartupProfile()
+        if self.data_dir:
+            with self.load_profile.phase('migrate schema'):
+                Migrator(self.data_dir).migrate()
+        # Loading is CPU-bound JSON parsing, so collections load one after another and
+        # each phase time is that file's own; orders resolve menu items, so the menu comes first
+        self.users = self._timed_load('load users', self._load_users)
+        self.menu_items = self._timed_load('load menu_items', self._load_menu_items)
+        self.orders = self._timed_load('load orders', self._load_orders)
+        self.delivery_agents = self._timed_load('load delivery_agents', self._load_delivery_agents)
+        self.idempotency_keys = self._timed_load('load idempotency_keys', self._load_idempotency_keys)
+        self.stage_timings = self._timed_load('load stage_timings', self._load_stage_timings)
+        
+        # Operational time series, restored from the dump left by the last close
+        self.timeseries = TimeSeriesRecorder(self.clock)
+        if self.data_dir:
+            self.timeseries.load(os.path.join(self.data_dir, TIMESERIES_FILE))
+        
+        # Optional travel-time matrix kept next to the data files
+        self.delivery_estimator = DeliveryTimeEstimator.open(self.data_dir) if self.data_dir else None
+        
+        # Striped record locks for versioned read-check-write sequences, a fixed set per record kind
+        self._record_locks: Dict[str, List[threading.RLock]] = {
+            kind: [threading.RLock() for _ in range(LOCK_STRIPES)] for kind in LOCK_KINDS}
+        
+        # Bumped on every order write so derived views know when to rebuild
+        self.orders_generation = 0
+        # Guards the sorted order indexes against concurrent inserts
+        self._index_lock = threading.Lock()
+        # Copy-on-write order copies for snapshot(), built the first time one is taken
+        self._snapshots: Optional[SnapshotTable] = None
+        self._snapshot_lock = threading.Lock()
+        
+        # Orders sorted by creation time, used for cursor pagination
+        with self.load_profile.phase('build order index'):
+            self._order_index = sorted(order_sort_key(order) for order in self.orders.values())
+            # Each customer's orders sorted the same way, so their pages are found by bisection
+            self._user_order_index: Dict[str, List[Tuple[datetime, str]]] = {}
+            for key in self._order_index:
+                self._user_order_index.setdefault(self.orders[key[1]].customer_username, []).append(key)
+            for user in self.users.values():
+                self._bind_order_history(user)
         
-        # Create data directory if it doesn't exist
-        os.makedirs(self.data_dir, exist_ok=True)
+        # Agents with a last-known position, for nearest-agent queries
+        self.agent_grid = AgentGrid()
+        for agent in self.delivery_agents.values():
+            self._place_agent(agent)
+        # Set when positions have moved since delivery_agents was last marked dirty
+        self._locations_moved = False
+        # For stores sharing one fleet of agents: finds the store holding an agent this one does not
+        self.agent_directory: Optional[Callable[[str], Optional['Database']]] = None
+        # Set when stage timings have changed since they were last marked dirty
+        self._timings_changed = False
+        self.load_profile.finish()
         
-        # Define file paths
-        self.users_file = os.path.join(self.data_dir, 'users.json')
-        self.menu_items_file = os.path.join(self.data_dir, 'menu_items.json')
-        self.orders_file = os.path.join(self.data_dir, 'orders.json')
-        self.delivery_agents_file = os.path.join(self.data_dir, 'delivery_agents.json')
+        # Mutators mark collections dirty and the writer decides when they hit storage
+        if durability is None:
+            durability = DurabilityMode(os.environ.get('DURABILITY_MODE', DurabilityMode.SYNC.value))
+        self.writer = BackgroundWriter({
+            'users': self._save_users,
+            'menu_items': self._save_menu_items,
+            'orders': self._save_orders,
+            'delivery_agents': self._save_delivery_agents,
+            'idempotency_keys': self._save_idempotency_keys,
+            'stage_timings': self._save_stage_timings
+        }, durability, write_interval)
         
-        # Load initial data
-        self.users = self._load_users()
-        self.menu_items = self._load_menu_items()
-        self.orders = self._load_orders()
-        self.delivery_agents = self._load_delivery_agents()
+        if replicate:
+            self.enable_replication()
+
+    def _timed_load(self, phase: str, loader: Callable[[], Dict]) -> Dict:
+        """Run a collection loader, recording its time in the load profile"""
+        with self.load_profile.phase(phase):
+            return loader()
 
     def _load_users(self) -> Dict[str, User]:
-        """Load users from JSON file"""
+        """Load users from storage"""
         try:
-            if os.path.exists(self.users_file):
-                with open(self.users_file, 'r') as f:
-                    data = json.load(f)
+            if self.storage.exists('users'):
                 users = {}
-                for username, user_data in data.items():
-                    user = User(
-                        username=username,
-                        password=user_data['password'],
-                        address=user_data['address'],
-                        phone=user_data['phone']
-                    )
-                    user.order_history = user_data.get('order_history', [])
-                    users[username] = user
+                for username, user_data in self.storage.iter_records('users'):
+                    users[username] = _user_from_record(username, user_data)
                 return users
             return {}
         except Exception as e:
@@ -52,20 +228,12 @@ class Database:
             return {}
 
     def _load_menu_items(self) -> Dict[str, MenuItem]:
-        """Load menu items from JSON file"""
+        """Load menu items from storage"""
         try:
-            if os.path.exists(self.menu_items_file):
-                with open(self.menu_items_file, 'r') as f:
-                    data = json.load(f)
+            if self.storage.exists('menu_items'):
                 menu_items = {}
-                for item_id, item_data in data.items():
-                    item = MenuItem(
-                        item_id=item_id,
-                        name=item_data['name'],
-                        price=item_data['price'],
-                        preparation_time=item_data['preparation_time']
-                    )
-                    menu_items[item_id] = item
+                for item_id, item_data in self.storage.iter_records('menu_items'):
+                    menu_items[item_id] = _menu_item_from_record(item_id, item_data)
                 return menu_items
             return {}
         except Exception as e:
@@ -73,43 +241,17 @@ class Database:
             return {}
 
     def _load_orders(self) -> Dict[str, Order]:
-        """Load orders from JSON file"""
+        """Load orders from storage, one record at a time"""
         try:
-            if os.path.exists(self.orders_file):
-                with open(self.orders_file, 'r') as f:
-                    data = json.load(f)
-                
-                orders = {}
-                for order_id, order_data in data.items():
-                    # First load all menu items needed for this order
-                    order_items = []
-                    for item_data in order_data.get('items', []):
-                        menu_item_id = item_data['menu_item_id']
-                        menu_item = self.get_menu_item(menu_item_id)
-                        if menu_item:
-                            order_item = OrderItem(
-                                menu_item=menu_item,
-                                quantity=item_data['quantity']
-                            )
-                            order_items.append(order_item)
-                    
-                    # Create the order
-                    order = Order(
-                        order_id=order_id,
-                        customer_username=order_data['customer_username'],
-                        items=order_items,
-                        delivery_mode=DeliveryMode(order_data['delivery_mode']),
-                        delivery_address=order_data.get('delivery_address')
-                    )
-                    
-                    # Set additional properties
-                    order.status = OrderStatus(order_data['status'])
-                    order.creation_time = datetime.fromisoformat(order_data['creation_time'])
-                    order.estimated_completion_time = datetime.fromisoformat(order_data['estimated_completion_time'])
-                    order.assigned_delivery_agent = order_data.get('assigned_delivery_agent')
-                    
-                    orders[order_id] = order
+            if self.storage.exists('orders'):
+                stats = LoadStats()
+                from_record = Order.from_record
+                menu_items = self.menu_items
+                orders = {order_id: from_record(order_id, order_data, menu_items)
+                          for order_id, order_data in self.storage.iter_records('orders', stats=stats)}
                 
+                stats.finish()
+                self.order_load_stats = stats
                 return orders
             return {}
         except Exception as e:
@@ -117,130 +259,256 @@ class Database:
             return {}
 
     def _load_delivery_agents(self) -> Dict[str, DeliveryAgent]:
-        """Load delivery agents from JSON file"""
+        """Load delivery agents from storage"""
         try:
-            if os.path.exists(self.delivery_agents_file):
-                with open(self.delivery_agents_file, 'r') as f:
-                    data = json.load(f)
+            if self.storage.exists('delivery_agents'):
                 agents = {}
-                for username, agent_data in data.items():
-                    agent = DeliveryAgent(
-                        username=username,
-                        password=agent_data['password'],
-                        phone=agent_data['phone']
-                    )
-                    agent.available = agent_data.get('available', True)
-                    agent.current_orders = agent_data.get('current_orders', [])
-                    agents[username] = agent
+                for username, agent_data in self.storage.iter_records('delivery_agents'):
+                    agents[username] = _agent_from_record(username, agent_data)
                 return agents
             return {}
         except Exception as e:
             print(f"Error loading delivery agents: {e}")
             return {}
 
+    def _load_idempotency_keys(self) -> IdempotencyTable:
+        """Load recent order idempotency keys from storage"""
+        table = IdempotencyTable()
+        try:
+            for key, record in self.storage.iter_records('idempotency_keys'):
+                table.load_record(key, record)
+        except Exception as e:
+            print(f"Error loading idempotency keys: {e}")
+        return table
+
+    def _load_stage_timings(self) -> StageTimings:
+        """Load order stage timing histograms from storage"""
+        timings = StageTimings()
+        try:
+            for key, record in self.storage.iter_records('stage_timings'):
+                timings.load_record(key, record)
+        except Exception as e:
+            print(f"Error loading stage timings: {e}")
+        return timings
+
     def _save_users(self) -> bool:
-        """Save users to JSON file"""
+        """Save users to storage"""
         try:
-            user_data = {}
-            for username, user in self.users.items():
-                user_data[username] = {
-                    'password': user.password,
-                    'address': user.address,
-                    'phone': user.phone,
-                    'order_history': user.order_history
-                }
-            
-            with open(self.users_file, 'w') as f:
-                json.dump(user_data, f, indent=4)
+            user_data = {username: _user_record(user) for username, user in list(self.users.items())}
+            self.storage.write_collection('users', user_data)
             return True
         except Exception as e:
             print(f"Error saving users: {e}")
             return False
 
     def _save_menu_items(self) -> bool:
-        """Save menu items to JSON file"""
+        """Save menu items to storage"""
         try:
-            item_data = {}
-            for item_id, item in self.menu_items.items():
-                item_data[item_id] = {
-                    'name': item.name,
-                    'price': item.price,
-                    'preparation_time': item.preparation_time
-                }
-            
-            with open(self.menu_items_file, 'w') as f:
-                json.dump(item_data, f, indent=4)
+            item_data = {item_id: _menu_item_record(item) for item_id, item in list(self.menu_items.items())}
+            self.storage.write_collection('menu_items', item_data)
             return True
         except Exception as e:
             print(f"Error saving menu items: {e}")
             return False
 
     def _save_orders(self) -> bool:
-        """Save orders to JSON file"""
+        """Save orders to storage"""
         try:
-            order_data = {}
-            for order_id, order in self.orders.items():
-                # Convert items to serializable format
-                items = []
-                for item in order.items:
-                    items.append({
-                        'menu_item_id': item.menu_item.item_id,
-                        'quantity': item.quantity
-                    })
-                
-                # Create serializable order data
-                order_data[order_id] = {
-                    'customer_username': order.customer_username,
-                    'items': items,
-                    'delivery_mode': order.delivery_mode.value,
-                    'delivery_address': order.delivery_address,
-                    'status': order.status.value,
-                    'creation_time': order.creation_time.isoformat(),
-                    'estimated_completion_time': order.estimated_completion_time.isoformat(),
-                    'assigned_delivery_agent': order.assigned_delivery_agent
-                }
-            
-            with open(self.orders_file, 'w') as f:
-                json.dump(order_data, f, indent=4)
+            order_data = {order_id: _order_record(order) for order_id, order in list(self.orders.items())}
+            self.storage.write_collection('orders', order_data)
             return True
         except Exception as e:
             print(f"Error saving orders: {e}")
             return False
 
     def _save_delivery_agents(self) -> bool:
-        """Save delivery agents to JSON file"""
+        """Save delivery agents to storage"""
         try:
-            agent_data = {}
-            for username, agent in self.delivery_agents.items():
-                agent_data[username] = {
-                    'password': agent.password,
-                    'phone': agent.phone,
-                    'available': agent.available,
-                    'current_orders': agent.current_orders
-                }
-            
-            with open(self.delivery_agents_file, 'w') as f:
-                json.dump(agent_data, f, indent=4)
+            # Positions moved from here on are picked up by the next save
+            self._locations_moved = False
+            agent_data = {username: _agent_record(agent) for username, agent in list(self.delivery_agents.items())}
+            self.storage.write_collection('delivery_agents', agent_data)
             return True
         except Exception as e:
             print(f"Error saving delivery agents: {e}")
             return False
 
+    def _save_idempotency_keys(self) -> bool:
+        """Save recent order idempotency keys to storage"""
+        try:
+            self.storage.write_collection('idempotency_keys', self.idempotency_keys.to_records())
+            return True
+        except Exception as e:
+            print(f"Error saving idempotency keys: {e}")
+            return False
+
+    def _save_stage_timings(self) -> bool:
+        """Save order stage timing histograms to storage"""
+        try:
+            self._timings_changed = False
+            self.storage.write_collection('stage_timings', self.stage_timings.to_records())
+            return True
+        except Exception as e:
+            print(f"Error saving stage timings: {e}")
+            return False
+
     def save_data(self) -> bool:
-        """Save all data to disk"""
+        """Save all data to storage"""
         return (self._save_users() and 
                 self._save_menu_items() and 
                 self._save_orders() and 
-                self._save_delivery_agents())
+                self._save_delivery_agents() and
+                self._save_idempotency_keys() and
+                self._save_stage_timings())
+
+    def flush(self) -> bool:
+        """Write any changes the background writer has not stored yet, and changed stage timings"""
+        if self._timings_changed:
+            self.writer.mark_dirty('stage_timings')
+        self._rotate_if_large()
+        return self.writer.flush()
+
+    def close(self) -> bool:
+        """Flush pending changes, stop the background writer, dump the time series and release the distance matrix"""
+        if self.data_dir:
+            self.timeseries.dump(os.path.join(self.data_dir, TIMESERIES_FILE))
+        if self.delivery_estimator is not None:
+            self.delivery_estimator.close()
+            self.delivery_estimator = None
+        if self._locations_moved:
+            self.writer.mark_dirty('delivery_agents')
+        if self._timings_changed:
+            self.writer.mark_dirty('stage_timings')
+        self._rotate_if_large()
+        return self.writer.close()
+
+    def enable_replication(self) -> bool:
+        """Log record writes for replicas from now on, checkpointing if the directory has no checkpoint"""
+        if not self.data_dir:
+            return False
+        if self.replication_log is None:
+            self.replication_log = ReplicationLog(os.path.join(self.data_dir, REPLICATION_LOG_FILE), self.clock)
+        if read_checkpoint(self.data_dir) is None:
+            return self.checkpoint()
+        return True
+
+    def checkpoint(self) -> bool:
+        """Start a new replication log segment and write a consistent copy of the store to bootstrap replicas from.
+        
+        Writes are applied in memory before they are logged, so every entry
+        up to the rotation is already in the copy; entries after it may be
+        too, and replaying those whole records again is harmless.
+        """
+        if self.replication_log is None:
+            return False
+        try:
+            seq = self.replication_log.rotate()
+            collections = {collection: self._collection_records(collection)
+                           for collection in REPLICATED_COLLECTIONS}
+            write_checkpoint(self.data_dir, seq, collections)
+            return True
+        except Exception as e:
+            print(f"Error writing replication checkpoint: {e}")
+            return False
+
+    def _rotate_if_large(self):
+        if self.replication_log is not None and self.replication_log.size() > ROTATE_BYTES:
+            self.checkpoint()
+
+    def _collection_records(self, collection: str) -> Dict[str, dict]:
+        """Every record of a collection in its stored form"""
+        if collection == 'idempotency_keys':
+            return self.idempotency_keys.to_records()
+        records = {'users': self.users, 'menu_items': self.menu_items, 'orders': self.orders,
+                   'delivery_agents': self.delivery_agents}[collection]
+        encoded = {key: self._encode(collection, key) for key in list(records)}
+        return {key: record for key, record in encoded.items() if record is not None}
+
+    def _changed(self, collection: str, key: str) -> bool:
+        """Log a record write for replicas, if enabled, and mark its collection dirty"""
+        return self._changed_many(collection, [key])
+
+    def _changed_many(self, collection: str, keys: Iterable[str]) -> bool:
+        """Log several record writes and mark their collection dirty once, so they cost one write"""
+        if self.replication_log is not None:
+            for key in keys:
+                self.replication_log.append(collection, key, self._encode(collection, key))
+        return self.writer.mark_dirty(collection)
+
+    def _encode(self, collection: str, key: str) -> Optional[dict]:
+        """The stored form of one record, or None if it has been deleted"""
+        if collection == 'idempotency_keys':
+            return self.idempotency_keys.to_record(key)
+        records, encode = {
+            'users': (self.users, _user_record),
+            'menu_items': (self.menu_items, _menu_item_record),
+            'orders': (self.orders, _order_record),
+            'delivery_agents': (self.delivery_agents, _agent_record)
+        }[collection]
+        record = records.get(key)
+        return encode(record) if record is not None else None
+
+    def apply_change(self, collection: str, key: str, record: Optional[dict]) -> bool:
+        """Apply a record written by another store, as a replica following its log does"""
+        if collection == 'orders':
+            return self.add_order(Order.from_record(key, record, self.menu_items))
+        if collection == 'idempotency_keys':
+            self.idempotency_keys.load_record(key, record)
+        elif collection == 'users':
+            user = _user_from_record(key, record)
+            self.users[key] = user
+            self._bind_order_history(user)
+        else:
+            records, decode = {
+                'menu_items': (self.menu_items, _menu_item_from_record),
+                'delivery_agents': (self.delivery_agents, _agent_from_record)
+            }[collection]
+            if record is None:
+                records.pop(key, None)
+            else:
+                records[key] = decode(key, record)
+            if collection == 'delivery_agents' and record is None:
+                self.agent_grid.remove(key)
+            elif collection == 'delivery_agents':
+                self._place_agent(records[key])
+        return self.writer.mark_dirty(collection)
+
+    # Record locking
+    def _record_lock(self, kind: str, key: str) -> threading.RLock:
+        """Get the lock guarding one record, shared with the other keys on its stripe"""
+        return self._record_locks[kind][hash(key) % LOCK_STRIPES]
+
+    @contextmanager
+    def lock_records(self, order_ids: Iterable[str] = (), agent_usernames: Iterable[str] = (),
+                     idempotency_keys: Iterable[str] = ()):
+        """Hold the locks of the given idempotency keys, orders and agents.
+
+        Each key maps to one of a fixed set of lock stripes per kind, so
+        memory does not grow with the number of records. Stripes are always
+        taken idempotency keys first, then orders, then agents, each in
+        stripe order, so callers locking overlapping records cannot deadlock.
+        """
+        locks = []
+        for kind, keys in (('idempotency', idempotency_keys), ('order', order_ids), ('agent', agent_usernames)):
+            stripes = self._record_locks[kind]
+            locks += [stripes[stripe] for stripe in sorted({hash(key) % LOCK_STRIPES for key in keys})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
 
     # User operations
     def add_user(self, user: User) -> bool:
         """Add a new user to the database"""
-        if user.username in self.users:
+        # setdefault is atomic, so of two concurrent registrations only one wins
+        if self.users.setdefault(user.username, user) is not user:
             return False
         
-        self.users[user.username] = user
-        return self._save_users()
+        self._bind_order_history(user)
+        return self._changed('users', user.username)
 
     def get_user(self, username: str) -> Optional[User]:
         """Get a user by username"""
@@ -251,19 +519,26 @@ class Database:
         user = self.get_user(username)
         return user is not None and user.password == password
 
-    def get_user_orders(self, username: str) -> List[Order]:
-        """Get all orders for a specific user"""
-        user = self.get_user(username)
-        if not user:
-            return []
+    def _bind_order_history(self, user: User):
+        """Point a user's order history at their entry in the order index"""
+        user.order_history = OrderHistory(self._user_order_index.setdefault(user.username, []))
+
+    def iter_user_orders(self, username: str, after: Optional[str] = None) -> Iterator[Order]:
+        """Yield a user's orders oldest first, starting after the given cursor"""
+        index = self._user_order_index.get(username)
+        if index is None:
+            return
         
-        user_orders = []
-        for order_id in user.order_history:
-            order = self.orders.get(order_id)
+        position = bisect_right(index, decode_cursor(after)) if after else 0
+        while position < len(index):
+            order = self.orders.get(index[position][1])
+            position += 1
             if order:
-                user_orders.append(order)
-        
-        return user_orders
+                yield order
+
+    def get_user_orders(self, username: str) -> List[Order]:
+        """Get all orders for a specific user, oldest first"""
+        return list(self.iter_user_orders(username))
 
     def update_user(self, user: User) -> bool:
         """Update an existing user"""
@@ -271,13 +546,20 @@ class Database:
             return False
         
         self.users[user.username] = user
-        return self._save_users()
+        self._bind_order_history(user)
+        return self._changed('users', user.username)
 
     # Menu item operations
     def add_menu_item(self, item: MenuItem) -> bool:
         """Add a new menu item to the database"""
         self.menu_items[item.item_id] = item
-        return self._save_menu_items()
+        return self._changed('menu_items', item.item_id)
+
+    def put_menu_items(self, items: List[MenuItem]) -> bool:
+        """Add or replace several menu items, stored in one write"""
+        for item in items:
+            self.menu_items[item.item_id] = item
+        return self._changed_many('menu_items', [item.item_id for item in items])
 
     def get_menu_item(self, item_id: str) -> Optional[MenuItem]:
         """Get a menu item by ID"""
@@ -293,7 +575,7 @@ class Database:
             return False
         
         self.menu_items[item.item_id] = item
-        return self._save_menu_items()
+        return self._changed('menu_items', item.item_id)
 
     def delete_menu_item(self, item_id: str) -> bool:
         """Delete a menu item"""
@@ -301,22 +583,34 @@ class Database:
             return False
         
         del self.menu_items[item_id]
-        return self._save_menu_items()
+        return self._changed('menu_items', item_id)
 
     # Order operations
     def add_order(self, order: Order) -> bool:
         """Add a new order to the database"""
         # Add the order to the orders dictionary
-        self.orders[order.order_id] = order
-        
-        # Add the order to the user's order history
-        user = self.get_user(order.customer_username)
-        if user:
-            if order.order_id not in user.order_history:
-                user.order_history.append(order.order_id)
-            
-        # Save both orders and users to ensure consistency
-        return self._save_orders() and self._save_users()
+        with self._index_lock:
+            if order.order_id not in self.orders:
+                insort(self._order_index, order_sort_key(order))
+                # The customer's order history is their entry in this index
+                insort(self._user_order_index.setdefault(order.customer_username, []), order_sort_key(order))
+            self.orders[order.order_id] = order
+        self._order_written(order)
+        return self._changed('orders', order.order_id)
+
+    def _order_written(self, order: Order):
+        """Bump the order generation and refresh the order's snapshot copy"""
+        with self._snapshot_lock:
+            self.orders_generation += 1
+            if self._snapshots is not None:
+                self._snapshots.put(order)
+
+    def snapshot(self) -> StoreSnapshot:
+        """Get a point-in-time, read-only view of every order for long reads"""
+        with self._snapshot_lock:
+            if self._snapshots is None:
+                self._snapshots = SnapshotTable(self.orders)
+            return self._snapshots.snapshot(self.orders_generation)
 
     def get_order(self, order_id: str) -> Optional[Order]:
         """Get an order by ID"""
@@ -326,22 +620,68 @@ class Database:
         """Get all orders"""
         return list(self.orders.values())
 
+    def iter_orders(self, after: Optional[str] = None) -> Iterator[Order]:
+        """Yield orders oldest first, starting after the given cursor"""
+        position = bisect_right(self._order_index, decode_cursor(after)) if after else 0
+        
+        # Walk by position so orders added mid-iteration are picked up, not skipped
+        while position < len(self._order_index):
+            order = self.orders.get(self._order_index[position][1])
+            position += 1
+            if order:
+                yield order
+
+    def archive_orders(self, path: str, before: Optional[datetime] = None,
+                       codec: str = 'lzma') -> ArchiveStats:
+        """Write finished orders created before the given time to a compressed archive, oldest first"""
+        finished = (OrderStatus.DELIVERED, OrderStatus.PICKED_UP, OrderStatus.CANCELLED)
+        orders = takewhile(lambda order: before is None or order.creation_time < before, self.iter_orders())
+        return write_archive(path, ((order.order_id, _order_record(order))
+                                    for order in orders if order.status in finished), codec)
+
     def update_order(self, order: Order) -> bool:
         """Update an existing order"""
         if order.order_id not in self.orders:
             return False
         
         self.orders[order.order_id] = order
-        return self._save_orders()
+        order.version += 1
+        self._order_written(order)
+        return self._changed('orders', order.order_id)
+
+    def record_idempotency_key(self, key: str, fingerprint: str, result: Tuple[bool, str]) -> bool:
+        """Remember the result of an order request made with an idempotency key"""
+        self.idempotency_keys.put(key, fingerprint, result, now=self.clock.now())
+        return self._changed('idempotency_keys', key)
+
+    def record_stage_timing(self, order: Order, previous_status: OrderStatus) -> bool:
+        """Add the time an order spent in the status it just left to the timing histograms.
+        
+        Every status change adds a timing, so in every durability mode the
+        histograms are only stored on flush() or when the store closes.
+        """
+        if not self.stage_timings.record(order, previous_status):
+            return False
+        self._timings_changed = True
+        return True
 
     # Delivery agent operations
     def add_delivery_agent(self, agent: DeliveryAgent) -> bool:
         """Add a new delivery agent to the database"""
-        if agent.username in self.delivery_agents:
+        if self.delivery_agents.setdefault(agent.username, agent) is not agent:
             return False
         
-        self.delivery_agents[agent.username] = agent
-        return self._save_delivery_agents()
+        self._place_agent(agent)
+        return self._changed('delivery_agents', agent.username)
+
+    def delete_delivery_agent(self, username: str) -> bool:
+        """Delete a delivery agent"""
+        if username not in self.delivery_agents:
+            return False
+        
+        del self.delivery_agents[username]
+        self.agent_grid.remove(username)
+        return self._changed('delivery_agents', username)
 
     def get_delivery_agent(self, username: str) -> Optional[DeliveryAgent]:
         """Get a delivery agent by username"""
@@ -353,7 +693,7 @@ class Database:
 
     def get_available_delivery_agents(self) -> List[DeliveryAgent]:
         """Get available delivery agents"""
-        return [agent for agent in self.delivery_agents.values() if agent.available]
+        return [agent for agent in list(self.delivery_agents.values()) if agent.available]
 
     def update_delivery_agent(self, agent: DeliveryAgent) -> bool:
         """Update an existing delivery agent"""
@@ -361,4 +701,39 @@ class Database:
             return False
         
         self.delivery_agents[agent.username] = agent
-        return self._save_delivery_agents()
+        agent.version += 1
+        self._place_agent(agent)
+        return self._changed('delivery_agents', agent.username)
+
+    def _place_agent(self, agent: DeliveryAgent):
+        """Keep an agent's grid entry in step with its last-known position"""
+        if agent.location is None:
+            self.agent_grid.remove(agent.username)
+        else:
+            self.agent_grid.update(agent.username, agent.location)
+
+    def update_agent_location(self, username: str, location: Location) -> bool:
+        """Record an agent's position.
+        
+        Positions arrive far more often than anything else about an agent,
+        so an update only moves the agent in the grid. It is stored, without
+        a version bump, with the agent's next write or when the store closes.
+        """
+        agent = self.delivery_agents.get(username)
+        if agent is None:
+            return False
+        
+        agent.location = location
+        self.agent_grid.update(username, location)
+        self._locations_moved = True
+        return True
+
+    def nearest_available_agents(self, location: Location, limit: int = 1) -> List[DeliveryAgent]:
+        """Available agents with a known position closest to location, nearest first"""
+        def available(username: str) -> bool:
+            agent = self.delivery_agents.get(username)
+            return agent is not None and agent.available
+        
+        agents = (self.delivery_agents.get(username)
+                  for _, username in self.agent_grid.nearest(location, limit, available))
+        return [agent for agent in agents if agent is not None]
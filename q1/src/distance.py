@@ -0,0 +1,101 @@
+# src/distance.py
+import os
+import re
+import json
+import mmap
+import struct
+from array import array
+from typing import Callable, Dict, Iterable, Optional
+
+MATRIX_FILE = 'distance_matrix.bin'
+ZONES_FILE = 'distance_zones.json'
+
+# Magic, format version and node count, followed by count * count float32 minutes, row by row
+_HEADER = struct.Struct('<4sII')
+_MAGIC = b'QDTM'
+_CELL = struct.Struct('<f')
+
+# The restaurant's own node in the matrix
+RESTAURANT = 'restaurant'
+
+
+def normalize_address(address: str) -> str:
+    """Reduce an address to the form used as a key in the zone index"""
+    return ' '.join(re.sub(r'[.,#]', ' ', address.lower()).split())
+
+
+def write_matrix(data_dir: str, nodes: Iterable[str], minutes: Callable[[str, str], float],
+                 addresses: Optional[Dict[str, str]] = None):
+    """Write a travel-time matrix and its zone index.
+
+    minutes(origin, destination) gives the travel time between two nodes;
+    rows are written one at a time so large matrices never sit in memory.
+    addresses maps street addresses to the zone node that serves them.
+    """
+    nodes = list(nodes)
+    with open(os.path.join(data_dir, MATRIX_FILE), 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, 1, len(nodes)))
+        for origin in nodes:
+            array('f', (minutes(origin, destination) for destination in nodes)).tofile(f)
+
+    with open(os.path.join(data_dir, ZONES_FILE), 'w') as f:
+        json.dump({
+            'nodes': {node: index for index, node in enumerate(nodes)},
+            'addresses': {normalize_address(address): zone for address, zone in (addresses or {}).items()}
+        }, f)
+
+
+class DeliveryTimeEstimator:
+    """Travel times looked up in a memory-mapped matrix.
+
+    The matrix file is mapped rather than read, so only the pages touched
+    by lookups are loaded and each lookup is a single offset calculation.
+    """
+
+    def __init__(self, matrix_path: str, zones_path: str):
+        with open(zones_path, 'r') as f:
+            zones = json.load(f)
+        self.nodes: Dict[str, int] = zones['nodes']
+        self.addresses: Dict[str, str] = zones.get('addresses', {})
+
+        self._file = open(matrix_path, 'rb')
+        self._matrix = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, self.size = _HEADER.unpack_from(self._matrix, 0)
+        if magic != _MAGIC or len(self._matrix) != _HEADER.size + self.size * self.size * _CELL.size:
+            self.close()
+            raise ValueError(f"{matrix_path} is not a valid distance matrix")
+
+    @classmethod
+    def open(cls, data_dir: str) -> Optional['DeliveryTimeEstimator']:
+        """Open the matrix in a data directory, or None if it has none"""
+        matrix_path = os.path.join(data_dir, MATRIX_FILE)
+        zones_path = os.path.join(data_dir, ZONES_FILE)
+        if not (os.path.exists(matrix_path) and os.path.exists(zones_path)):
+            return None
+        try:
+            return cls(matrix_path, zones_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading distance matrix: {e}")
+            return None
+
+    def zone_for(self, address: Optional[str]) -> Optional[str]:
+        """Get the zone serving an address, if the index knows it"""
+        if not address:
+            return None
+        return self.addresses.get(normalize_address(address))
+
+    def travel_minutes(self, origin: str, destination: str) -> Optional[float]:
+        """Travel time between two nodes, or None if either is unknown"""
+        i, j = self.nodes.get(origin), self.nodes.get(destination)
+        if i is None or j is None:
+            return None
+        return _CELL.unpack_from(self._matrix, _HEADER.size + (i * self.size + j) * _CELL.size)[0]
+
+    def delivery_minutes(self, address: Optional[str], origin: str = RESTAURANT) -> Optional[float]:
+        """Travel time from the restaurant (or another node) to an address"""
+        zone = self.zone_for(address)
+        return self.travel_minutes(origin, zone) if zone else None
+
+    def close(self):
+        self._matrix.close()
+        self._file.close()
@@ -0,0 +1,274 @@
+# src/events.py
+import os
+import json
+import time
+import threading
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime
+from enum import Enum
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.clock import SYSTEM_CLOCK
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where only one process may write the log
+    fcntl = None
+
+# Every this many events the byte offset of an event's line is indexed, so
+# reads from an offset seek close to it instead of starting at byte 0
+INDEX_EVERY = 256
+
+# Events an in-memory feed keeps for replay; older ones are dropped
+MEMORY_EVENTS = 10000
+
+
+class OrderEventType(Enum):
+    CREATED = "created"
+    STATUS_CHANGED = "status_changed"
+    AGENT_ASSIGNED = "agent_assigned"
+
+
+class OrderEvent:
+    def __init__(self, seq: int, event_type: OrderEventType, order_id: str,
+                 timestamp: datetime, data: Optional[Dict] = None):
+        self.seq = seq
+        self.event_type = event_type
+        self.order_id = order_id
+        self.timestamp = timestamp
+        self.data = data or {}
+
+    def to_dict(self) -> Dict:
+        return {
+            'seq': self.seq,
+            'type': self.event_type.value,
+            'order_id': self.order_id,
+            'timestamp': self.timestamp.isoformat(),
+            'data': self.data
+        }
+
+    @classmethod
+    def from_dict(cls, record: Dict) -> 'OrderEvent':
+        return cls(
+            seq=record['seq'],
+            event_type=OrderEventType(record['type']),
+            order_id=record['order_id'],
+            timestamp=datetime.fromisoformat(record['timestamp']),
+            data=record.get('data')
+        )
+
+
+def read_last_seq(path: str) -> int:
+    """Read the sequence number of the last record in a JSON-lines log"""
+    if not os.path.exists(path):
+        return 0
+
+    last_line = b''
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b''
+        # Scan backwards in blocks so large logs are not read in full
+        while position > 0 and not last_line:
+            step = min(4096, position)
+            position -= step
+            f.seek(position)
+            buffer = f.read(step) + buffer
+            lines = buffer.strip().split(b'\n')
+            if len(lines) > 1 or position == 0:
+                last_line = lines[-1]
+
+    if not last_line:
+        return 0
+    try:
+        return json.loads(last_line)['seq']
+    except (ValueError, KeyError) as e:
+        print(f"Error reading change feed: {e}")
+        return 0
+
+
+class Subscription:
+    """Handle for an in-process feed consumer"""
+
+    def __init__(self, feed: 'ChangeFeed', callback: Callable[[OrderEvent], None], offset: int):
+        self.feed = feed
+        self.callback = callback
+        self.offset = offset  # Sequence number of the last event delivered
+
+    def deliver(self, event: OrderEvent):
+        if event.seq > self.offset:
+            self.callback(event)
+            self.offset = event.seq
+
+    def unsubscribe(self):
+        self.feed.unsubscribe(self)
+
+
+class ChangeFeed:
+    """Append-only, sequence-numbered log of order events.
+
+    Events are written one JSON object per line, so the file can be tailed
+    by other processes while in-process consumers subscribe directly.
+    Without a path the log is kept in memory only, holding the most recent
+    MEMORY_EVENTS events.
+    """
+
+    _feeds: Dict[str, 'ChangeFeed'] = {}
+    _feeds_lock = threading.Lock()
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.clock = SYSTEM_CLOCK  # Source of event timestamps
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._events: deque = deque(maxlen=MEMORY_EVENTS)  # Used when there is no file
+        # Sparse (seq, byte offset) pairs, in order, for events whose line starts at that offset
+        self._index: List[Tuple[int, int]] = []
+        self.last_lines_read = 0  # Lines the last read() went through, including skipped ones
+        self.last_seq = self._read_last_seq()
+
+    @classmethod
+    def for_file(cls, path: str) -> 'ChangeFeed':
+        """Get the feed for a log file, shared by every store using that file"""
+        key = os.path.abspath(path)
+        with cls._feeds_lock:
+            feed = cls._feeds.get(key)
+            if feed is None:
+                feed = cls._feeds[key] = cls(path)
+            return feed
+
+    def _read_last_seq(self) -> int:
+        """Read the sequence number of the last event in the log"""
+        return read_last_seq(self.path) if self.path else 0
+
+    def publish(self, event_type: OrderEventType, order_id: str, **data) -> OrderEvent:
+        """Append an event to the log and deliver it to subscribers"""
+        with self._lock:
+            if self.path is None:
+                event = OrderEvent(self.last_seq + 1, event_type, order_id, self.clock.now(), data)
+                self._events.append(event)
+            else:
+                with open(self.path, 'ab') as f:
+                    # Other processes may append to the same log, so the next
+                    # sequence number is taken from the file under an exclusive lock
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    try:
+                        seq = self._read_last_seq() + 1
+                        event = OrderEvent(seq, event_type, order_id, self.clock.now(), data)
+                        self._note_offset(seq, f.seek(0, os.SEEK_END))
+                        f.write((json.dumps(event.to_dict()) + '\n').encode())
+                        f.flush()
+                    finally:
+                        if fcntl is not None:
+                            fcntl.flock(f, fcntl.LOCK_UN)
+            self.last_seq = event.seq
+
+            # Delivery happens under the lock so every consumer sees events in order
+            for subscription in list(self._subscribers):
+                try:
+                    subscription.deliver(event)
+                except Exception as e:
+                    print(f"Error delivering order event: {e}")
+        return event
+
+    def _note_offset(self, seq: int, position: int):
+        """Index where an event's line starts, for every INDEX_EVERY-th event"""
+        if seq % INDEX_EVERY != 1:
+            return
+        with self._lock:
+            at = bisect_right(self._index, (seq, position))
+            if at == 0 or self._index[at - 1][0] != seq:
+                self._index.insert(at, (seq, position))
+
+    def _seek(self, f: BinaryIO, offset: int):
+        """Move to the last indexed line at or before the first event after offset"""
+        with self._lock:
+            at = bisect_right(self._index, (offset + 1, float('inf')))
+            f.seek(self._index[at - 1][1] if at else 0)
+
+    def read(self, offset: int = 0) -> Iterator[OrderEvent]:
+        """Yield logged events with a sequence number greater than offset"""
+        if self.path is None:
+            with self._lock:
+                events = list(self._events)
+            # Sequence numbers are consecutive, so the first event wanted is found by position
+            start = offset - events[0].seq + 1 if events else 0
+            yield from islice(events, max(0, start), None)
+            return
+        if not os.path.exists(self.path):
+            return
+
+        self.last_lines_read = 0
+        with open(self.path, 'rb') as f:
+            self._seek(f, offset)
+            position = f.tell()
+            for line in f:
+                start, position = position, position + len(line)
+                # A writer may be mid-line; the event is read once its newline arrives
+                if not line.endswith(b'\n'):
+                    return
+                self.last_lines_read += 1
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._note_offset(record['seq'], start)
+                if record['seq'] > offset:
+                    yield OrderEvent.from_dict(record)
+
+    def subscribe(self, callback: Callable[[OrderEvent], None],
+                  offset: Optional[int] = None) -> Subscription:
+        """Subscribe to new events.
+
+        With an offset, logged events after it are replayed first; without one
+        only events published from now on are delivered.
+        """
+        with self._lock:
+            if offset is None:
+                offset = self.last_seq = self._read_last_seq() if self.path else self.last_seq
+            subscription = Subscription(self, callback, offset)
+            for event in self.read(subscription.offset):
+                subscription.deliver(event)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def tail(self, offset: int = 0, poll_interval: float = 0.5,
+             stop: Optional[threading.Event] = None) -> Iterator[OrderEvent]:
+        """Follow the log file like `tail -f`, yielding events after offset.
+
+        Works across processes since it only reads the file. Runs until the
+        stop event is set.
+        """
+        if self.path is None:
+            raise ValueError("An in-memory change feed has no file to tail")
+        while not os.path.exists(self.path):
+            if stop is not None and stop.is_set():
+                return
+            time.sleep(poll_interval)
+
+        with open(self.path, 'rb') as f:
+            self._seek(f, offset)
+            partial = b''
+            while stop is None or not stop.is_set():
+                line = f.readline()
+                if not line:
+                    time.sleep(poll_interval)
+                    continue
+
+                # A writer may be mid-line, hold on to it until the newline arrives
+                partial += line
+                if not partial.endswith(b'\n'):
+                    continue
+                record = json.loads(partial)
+                self._note_offset(record['seq'], f.tell() - len(partial))
+                partial = b''
+                if record['seq'] > offset:
+                    offset = record['seq']
+                    yield OrderEvent.from_dict(record)
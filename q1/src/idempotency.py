@@ -0,0 +1,76 @@
+# src/idempotency.py
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+
+def request_fingerprint(*args) -> str:
+    """Digest of a request's arguments, to spot a key reused for a different request"""
+    return hashlib.sha256(json.dumps(args, default=str).encode()).hexdigest()
+
+
+class IdempotencyTable:
+    """Bounded map of idempotency key -> request fingerprint and original result, oldest first.
+
+    Entries expire after the TTL, and once the table is full the oldest
+    entry is evicted to make room, so its size never exceeds capacity.
+    """
+
+    def __init__(self, capacity: int = 10000, ttl: timedelta = timedelta(hours=24)):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, Tuple[datetime, str, bool, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict_expired(self, now: datetime):
+        # Entries are in insertion order, so expired ones are all at the front
+        while self._entries:
+            key, (created, _, _, _) = next(iter(self._entries.items()))
+            if now - created < self.ttl:
+                break
+            del self._entries[key]
+
+    def get(self, key: str, now: Optional[datetime] = None) -> Optional[Tuple[str, Tuple[bool, str]]]:
+        """Get the stored request fingerprint and result for a key, if it has not expired"""
+        with self._lock:
+            self._evict_expired(now or datetime.now())
+            entry = self._entries.get(key)
+            return (entry[1], (entry[2], entry[3])) if entry else None
+
+    def put(self, key: str, fingerprint: str, result: Tuple[bool, str], now: Optional[datetime] = None):
+        """Remember the fingerprint and result of the request made with a key"""
+        now = now or datetime.now()
+        with self._lock:
+            self._evict_expired(now)
+            self._entries.pop(key, None)
+            self._entries[key] = (now, fingerprint, result[0], result[1])
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _record(entry) -> dict:
+        created, fingerprint, success, message = entry
+        return {'created': created.isoformat(), 'fingerprint': fingerprint,
+                'success': success, 'message': message}
+
+    def to_records(self) -> Dict[str, dict]:
+        with self._lock:
+            return {key: self._record(entry) for key, entry in self._entries.items()}
+
+    def to_record(self, key: str) -> Optional[dict]:
+        """The persisted form of one entry, or None if it is not held"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return self._record(entry) if entry else None
+
+    def load_record(self, key: str, record: dict):
+        """Restore one persisted entry; records must arrive oldest first"""
+        with self._lock:
+            self._entries[key] = (datetime.fromisoformat(record['created']), record.get('fingerprint', ''),
+                                  record['success'], record['message'])
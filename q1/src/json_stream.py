@@ -0,0 +1,131 @@
+# src/json_stream.py
+import json
+import time
+import tracemalloc
+from typing import Any, Iterator, Optional, TextIO, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+
+class LoadStats:
+    """Records loaded, elapsed time and memory high-water marks for a streaming load"""
+
+    def __init__(self):
+        self.records = 0
+        self.bytes_read = 0
+        self.peak_buffer_bytes = 0  # Largest slice of raw text held at once
+        # Peak traced bytes allocated during the load, beyond what was held
+        # when it started; only known while tracemalloc is tracing
+        self.peak_traced_bytes: Optional[int] = None
+        self._traced_at_start: Optional[int] = None
+        if tracemalloc.is_tracing():
+            # The process-wide peak may predate the load, so it restarts here
+            self._traced_at_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._started
+        if self._traced_at_start is not None and tracemalloc.is_tracing():
+            self.peak_traced_bytes = tracemalloc.get_traced_memory()[1] - self._traced_at_start
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds > 0 else 0.0
+
+    def report(self) -> str:
+        lines = [
+            f"Records loaded: {self.records}",
+            f"Load time: {self.seconds * 1000:.1f} ms ({self.records_per_second:,.0f} records/s)",
+            f"Bytes read: {self.bytes_read:,}",
+            f"Peak parse buffer: {self.peak_buffer_bytes:,} bytes"
+        ]
+        if self.peak_traced_bytes is not None:
+            lines.append(f"Peak traced memory during load: {self.peak_traced_bytes:,} bytes")
+        return "\n".join(lines)
+
+
+def iter_object_items(f: TextIO, chunk_size: int = 64 * 1024,
+                      stats: Optional[LoadStats] = None) -> Iterator[Tuple[str, Any]]:
+    """Yield the (key, value) pairs of a top-level JSON object one at a time.
+
+    Only the raw text of the current record is buffered, so the whole document
+    is never parsed into a single dict. Raises ValueError on malformed input.
+    """
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def read_more() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        # Drop the text already consumed before growing the buffer
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        if stats is not None:
+            stats.bytes_read += len(chunk)
+            stats.peak_buffer_bytes = max(stats.peak_buffer_bytes, len(buffer))
+        return True
+
+    def next_char() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not read_more():
+                raise ValueError("Unexpected end of JSON document")
+
+    def decode() -> Any:
+        nonlocal pos
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof or not read_more():
+                    raise
+                continue
+            # A number cut by the chunk boundary decodes as a shorter one ('1.' as 1),
+            # so one whose text runs to the end of the buffer is re-read with more input
+            if not eof and isinstance(value, (int, float)) and not isinstance(value, bool):
+                tail = end
+                while tail < len(buffer) and buffer[tail] in _NUMBER_CHARS:
+                    tail += 1
+                if tail >= len(buffer) and read_more():
+                    continue
+            pos = end
+            return value
+
+    if next_char() != '{':
+        raise ValueError("Expected a JSON object at top level")
+    pos += 1
+
+    if next_char() == '}':
+        return
+
+    while True:
+        if next_char() != '"':
+            raise ValueError(f"Expected a string key at offset {pos}")
+        key = decode()
+        if next_char() != ':':
+            raise ValueError(f"Expected ':' after key {key!r}")
+        pos += 1
+        next_char()
+        value = decode()
+        if stats is not None:
+            stats.records += 1
+        yield key, value
+
+        separator = next_char()
+        pos += 1
+        if separator == '}':
+            return
+        if separator != ',':
+            raise ValueError(f"Expected ',' or '}}' after value for key {key!r}")
@@ -0,0 +1,223 @@
+# src/memory.py
+import os
+import sys
+import types
+import tracemalloc
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from src.models import User, MenuItem, Order, OrderItem, DeliveryAgent, OrderHistory
+
+# Model types bytes are attributed to; anything they reference counts towards the innermost one
+MODEL_TYPES = (User, MenuItem, Order, OrderItem, DeliveryAgent)
+
+# Shared or foreign objects that are never walked into or counted
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                  types.MethodType, Enum)
+
+# Source files listed under allocation sites
+TOP_SITES = 8
+
+# Attribution of bytes not held inside any model object, such as dicts and indexes
+UNOWNED = '(containers)'
+
+
+def store_roots(db) -> List[Tuple[str, object, int]]:
+    """The structures of a store to measure, as (name, root, entries).
+
+    Objects reachable from several roots count towards the first, so the
+    menu, customers and agents come before the orders that refer to them.
+    Users' order histories are views onto the order index and count with it.
+    """
+    roots = [
+        ('menu_items', db.menu_items, len(db.menu_items)),
+        ('users', db.users, len(db.users)),
+        ('delivery_agents', db.delivery_agents, len(db.delivery_agents)),
+        ('orders', db.orders, len(db.orders)),
+        ('order indexes', (db._order_index, db._user_order_index), len(db._order_index)),
+        ('agent grid', db.agent_grid, len(db.agent_grid)),
+        ('idempotency_keys', db.idempotency_keys, len(db.idempotency_keys)),
+        ('stage_timings', db.stage_timings, 0),
+        ('timeseries', db.timeseries, 0)
+    ]
+    if db._snapshots is not None:
+        roots.append(('order snapshots', db._snapshots, len(db._snapshots)))
+    return roots
+
+
+def _referents(obj) -> List[object]:
+    if isinstance(obj, dict):
+        # Copied in one step, as service threads may be writing to the store meanwhile
+        return [part for item in list(obj.items()) for part in item]
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return []
+    referents = []
+    if hasattr(obj, '__dict__'):
+        referents.append(vars(obj))
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(obj, name):
+                referents.append(getattr(obj, name))
+    return referents
+
+
+def deep_sizeof(root, seen: set, by_type: Dict[str, List[int]], owner: str = UNOWNED) -> int:
+    """Bytes of root and everything it reaches that is not already in seen.
+
+    Each object's own size is added to by_type under the innermost model
+    object that holds it, as [objects, bytes]. Objects are walked with an
+    explicit stack, so deep structures cannot hit the recursion limit.
+    """
+    total = 0
+    stack = [(root, owner)]
+    while stack:
+        obj, owner = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, MODEL_TYPES):
+            owner = type(obj).__name__
+            by_type.setdefault(owner, [0, 0])[0] += 1
+        size = sys.getsizeof(obj)
+        by_type.setdefault(owner, [0, 0])[1] += size
+        total += size
+        if isinstance(obj, OrderHistory):
+            continue
+        stack.extend((referent, owner) for referent in _referents(obj))
+    return total
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process, where /proc provides it"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class MemorySnapshot:
+    """Bytes held per store structure and per model type at one moment"""
+
+    def __init__(self, collections: Dict[str, Tuple[int, int]], types_: Dict[str, Tuple[int, int]],
+                 rss: Optional[int], traced: Optional[Tuple[int, int]], trace=None):
+        self.collections = collections  # name -> (entries, bytes)
+        self.types = types_             # type name -> (objects, bytes)
+        self.rss = rss
+        self.traced = traced            # tracemalloc (current, peak) bytes, if tracing
+        self.trace = trace              # tracemalloc snapshot, if tracing
+
+    @property
+    def total(self) -> int:
+        return sum(size for _, size in self.collections.values())
+
+
+def _site_name(filename: str) -> str:
+    """Project files relative to the working directory, others by file name"""
+    relative = os.path.relpath(filename)
+    return os.path.basename(filename) if relative.startswith('..') else relative
+
+
+def _mb(size: int) -> str:
+    return f"{size / (1024 * 1024):>9.2f} MB"
+
+
+def _delta(size: int, previous: Optional[int]) -> str:
+    if previous is None:
+        return ""
+    change = size - previous
+    return f"  {'+' if change >= 0 else '-'}{abs(change) / 1024:,.1f} KB"
+
+
+class MemoryProfiler:
+    """Breaks down a store's memory by structure and model type.
+
+    Each snapshot is compared with the previous one taken by the same
+    profiler, so repeated reports show growth. With tracemalloc tracing,
+    started by start_tracing() before the store loads, reports also list
+    the source files holding the most allocated memory.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.previous: Optional[MemorySnapshot] = None
+
+    def snapshot(self) -> MemorySnapshot:
+        seen: set = set()
+        by_type: Dict[str, List[int]] = {}
+        collections = {}
+        for name, root, entries in store_roots(self.db):
+            collections[name] = (entries, deep_sizeof(root, seen, by_type))
+        types_ = {name: (count, size) for name, (count, size) in by_type.items()}
+
+        traced = trace = None
+        if tracemalloc.is_tracing():
+            traced = tracemalloc.get_traced_memory()
+            # The profiler's own bookkeeping and module imports would crowd out the store
+            trace = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, '<frozen importlib*')))
+        return MemorySnapshot(collections, types_, _rss_bytes(), traced, trace)
+
+    def report(self) -> str:
+        """Take a snapshot and describe it, with growth since the last report"""
+        current = self.snapshot()
+        previous, self.previous = self.previous, current
+
+        def before(table: str, name: str) -> Optional[int]:
+            if previous is None:
+                return None
+            return getattr(previous, table).get(name, (0, 0))[1]
+
+        lines = ["Memory by store structure", "-" * 60]
+        for name, (count, size) in current.collections.items():
+            lines.append(f"{name:<20} {count:>9,} entries {_mb(size)}{_delta(size, before('collections', name))}")
+        lines.append(f"{'Total':<36} {_mb(current.total)}"
+                     f"{_delta(current.total, previous.total if previous else None)}")
+
+        lines += ["", "Memory by model type", "-" * 60]
+        for name, (count, size) in sorted(current.types.items(), key=lambda entry: -entry[1][1]):
+            lines.append(f"{name:<20} {count:>9,} objects {_mb(size)}{_delta(size, before('types', name))}")
+
+        lines += ["", "Process", "-" * 60]
+        if current.rss is not None:
+            lines.append(f"{'Resident set size':<36} {_mb(current.rss)}"
+                         f"{_delta(current.rss, previous.rss if previous else None)}")
+        if current.traced is None:
+            lines.append("Allocation tracing is off; start with --memory-profile to see allocation sites")
+        else:
+            lines.append(f"{'Traced now':<36} {_mb(current.traced[0])}")
+            lines.append(f"{'Traced peak':<36} {_mb(current.traced[1])}")
+            lines += ["", "Top allocation sites", "-" * 60]
+            if previous is not None and previous.trace is not None:
+                stats = current.trace.compare_to(previous.trace, 'filename')
+            else:
+                stats = current.trace.statistics('filename')
+            for stat in stats[:TOP_SITES]:
+                frame = stat.traceback[0]
+                growth = f"  {stat.size_diff / 1024:+,.1f} KB" if previous is not None and previous.trace else ""
+                lines.append(f"{_site_name(frame.filename):<36} {_mb(stat.size)}{growth}")
+        return "\n".join(lines)
+
+
+def start_tracing():
+    """Trace allocations from here on; call before the store loads to see its allocation sites"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def main():
+    from src.database import Database
+
+    start_tracing()
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('DATA_DIR', 'data')
+    db = Database(data_dir=data_dir)
+    print(MemoryProfiler(db).report())
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# src/metrics.py
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.models import Order, OrderStatus, DEFAULT_DELIVERY_MINUTES
+
+# Upper bounds, in minutes, of the histogram buckets; the last bucket is open-ended
+BUCKET_BOUNDS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120)
+
+# Samples needed before a measured time replaces the default estimate
+MIN_SAMPLES = 5
+
+
+class LatencyHistogram:
+    """Fixed bucketed counts of recent durations, in minutes.
+
+    Each bucket holds a count and the sum of its durations, so the
+    histogram is the same small size however many orders it has seen.
+    Once it holds `decay_at` durations every bucket is halved, so it
+    follows current kitchen and road conditions rather than all-time ones.
+    """
+
+    def __init__(self, decay_at: int = 200, counts: Iterable[float] = (), sums: Iterable[float] = ()):
+        self.decay_at = decay_at
+        self.counts = [0.0] * (len(BUCKET_BOUNDS) + 1)
+        self.sums = [0.0] * (len(BUCKET_BOUNDS) + 1)
+        for bucket, (count, total) in enumerate(zip(counts, sums)):
+            self.counts[bucket], self.sums[bucket] = float(count), float(total)
+
+    def __len__(self) -> int:
+        return round(sum(self.counts))
+
+    @staticmethod
+    def _bucket(minutes: float) -> int:
+        return bisect_left(BUCKET_BOUNDS, minutes)
+
+    def add(self, minutes: float):
+        minutes = max(0.0, minutes)
+        bucket = self._bucket(minutes)
+        self.counts[bucket] += 1
+        self.sums[bucket] += minutes
+        if sum(self.counts) >= self.decay_at:
+            self.counts = [count / 2 for count in self.counts]
+            self.sums = [total / 2 for total in self.sums]
+
+    def mean(self) -> Optional[float]:
+        count = sum(self.counts)
+        return sum(self.sums) / count if count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Get the q-th quantile (0-1), as the mean of the bucket it falls in"""
+        rank = q * sum(self.counts)
+        seen = 0.0
+        for count, total in zip(self.counts, self.sums):
+            seen += count
+            if count and seen >= rank:
+                return round(total / count, 1)
+        return None
+
+    def buckets(self) -> List[Tuple[str, int]]:
+        """Get (label, count) pairs for each bucket"""
+        labels = [f"<={bound}m" for bound in BUCKET_BOUNDS] + [f">{BUCKET_BOUNDS[-1]}m"]
+        return list(zip(labels, (round(count) for count in self.counts)))
+
+    def to_record(self) -> dict:
+        return {'counts': [round(count, 3) for count in self.counts],
+                'sums': [round(total, 1) for total in self.sums]}
+
+    @classmethod
+    def from_record(cls, record: dict, decay_at: int = 200) -> 'LatencyHistogram':
+        """Rebuild a histogram from its record; records from before buckets were stored hold raw samples"""
+        histogram = cls(decay_at, record.get('counts', ()), record.get('sums', ()))
+        for minutes in record.get('samples', ()):
+            histogram.add(minutes)
+        return histogram
+
+
+class StageTimings:
+    """Rolling histograms of how long orders spend in each status.
+
+    Time in every status is tracked per stage, time in preparation per menu
+    item, and time out for delivery per agent.
+    """
+
+    def __init__(self, decay_at: int = 200):
+        self.decay_at = decay_at
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.items: Dict[str, LatencyHistogram] = {}
+        self.agents: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, histograms: Dict[str, LatencyHistogram], key: str, minutes: float):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = LatencyHistogram(self.decay_at)
+        histogram.add(minutes)
+
+    def record(self, order: Order, previous_status: OrderStatus) -> bool:
+        """Record the time an order spent in the status it just left"""
+        entered = order.status_times.get(previous_status)
+        left = order.status_times.get(order.status)
+        if entered is None or left is None:
+            return False
+
+        minutes = (left - entered).total_seconds() / 60
+        with self._lock:
+            self._add(self.stages, previous_status.value, minutes)
+            if previous_status == OrderStatus.PREPARING:
+                for item in order.items:
+                    self._add(self.items, item.menu_item.item_id, minutes)
+            elif previous_status == OrderStatus.OUT_FOR_DELIVERY and order.assigned_delivery_agent:
+                self._add(self.agents, order.assigned_delivery_agent, minutes)
+        return True
+
+    def delivery_minutes(self, agent_username: Optional[str] = None) -> float:
+        """Estimate delivery time: the agent's median, else everyone's, else the default"""
+        with self._lock:
+            for histogram in (self.agents.get(agent_username) if agent_username else None,
+                              self.stages.get(OrderStatus.OUT_FOR_DELIVERY.value)):
+                if histogram is not None and len(histogram) >= MIN_SAMPLES:
+                    return histogram.quantile(0.5)
+        return DEFAULT_DELIVERY_MINUTES
+
+    def stage_minutes(self, status: OrderStatus, default: float) -> float:
+        """Median time orders spend in a status, or the default until it has been measured"""
+        with self._lock:
+            histogram = self.stages.get(status.value)
+            if histogram is not None and len(histogram) >= MIN_SAMPLES:
+                return histogram.quantile(0.5)
+        return default
+
+    def stage_summary(self) -> List[Tuple[str, int, float, float, float]]:
+        """Get (stage, samples, p50, p95, p99) for every measured stage"""
+        with self._lock:
+            return [(stage, len(histogram), histogram.quantile(0.5), histogram.quantile(0.95),
+                     histogram.quantile(0.99))
+                    for stage, histogram in self.stages.items()]
+
+    # Persistence: one record per histogram holding its bucket counts and sums
+
+    def to_records(self) -> Dict[str, dict]:
+        with self._lock:
+            records = {}
+            for kind, histograms in (('stage', self.stages), ('item', self.items), ('agent', self.agents)):
+                for key, histogram in histograms.items():
+                    records[f"{kind}:{key}"] = histogram.to_record()
+            return records
+
+    def load_record(self, key: str, record: dict):
+        kind, _, name = key.partition(':')
+        histograms = {'stage': self.stages, 'item': self.items, 'agent': self.agents}.get(kind)
+        if histograms is not None:
+            with self._lock:
+                histograms[name] = LatencyHistogram.from_record(record, self.decay_at)
@@ -0,0 +1,264 @@
+# src/migrations.py
+import os
+import sys
+import json
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.storage import COLLECTIONS, JsonFileStorage
+
+# Sidecar holding the schema version of each collection file
+SCHEMA_FILE = 'schema_version.json'
+# Progress of an interrupted migration, removed once it completes
+CHECKPOINT_FILE = 'schema_migration.json'
+
+# Records written between checkpoints
+CHECKPOINT_EVERY = 1000
+
+Record = Tuple[str, dict]
+
+
+class MigrationStep(NamedTuple):
+    """Rewrites one record of a collection from from_version to from_version + 1"""
+    collection: str
+    from_version: int
+    description: str
+    apply: Callable[[str, dict], Optional[Record]]  # None drops the record
+
+
+# Registered steps, applied in version order
+MIGRATIONS: List[MigrationStep] = []
+
+
+def migration(collection: str, from_version: int, description: str):
+    """Register a function as the step upgrading a collection past from_version.
+
+    Steps must be idempotent: a run interrupted between replacing a file and
+    recording its new version applies them again on resume.
+    """
+    def register(apply: Callable[[str, dict], Optional[Record]]):
+        MIGRATIONS.append(MigrationStep(collection, from_version, description, apply))
+        return apply
+    return register
+
+
+@migration('users', 1, "drop order_history, derived from orders since version 2")
+def _drop_user_order_history(key: str, record: dict) -> Record:
+    record.pop('order_history', None)
+    return key, record
+
+
+@migration('orders', 1, "fill in version and status_times for orders written before they existed")
+def _backfill_order_version_and_status_times(key: str, record: dict) -> Record:
+    record.setdefault('version', 0)
+    if not record.get('status_times'):
+        record['status_times'] = {'Placed': record['creation_time']}
+    return key, record
+
+
+@migration('delivery_agents', 1, "fill in version for agents written before it existed")
+def _fill_agent_version(key: str, record: dict) -> Record:
+    record.setdefault('version', 0)
+    return key, record
+
+
+def current_versions(steps: Iterable[MigrationStep] = None) -> Dict[str, int]:
+    """Latest schema version of every collection: one past its last step, else 1"""
+    versions = {collection: 1 for collection in COLLECTIONS}
+    for step in (MIGRATIONS if steps is None else steps):
+        versions[step.collection] = max(versions.get(step.collection, 1), step.from_version + 1)
+    return versions
+
+
+def read_versions(data_dir: str) -> Optional[Dict[str, int]]:
+    """Schema versions recorded in a data directory, or None if it has no sidecar"""
+    path = os.path.join(data_dir, SCHEMA_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data: dict):
+    """Replace a small JSON file in one step, so readers see the old or the new content"""
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(path + '.tmp', path)
+
+
+def _apply(chain: List[MigrationStep], key: str, record: dict) -> Optional[Record]:
+    """Run a record through consecutive steps; None once a step drops it"""
+    for step in chain:
+        migrated = step.apply(key, record)
+        if migrated is None:
+            return None
+        key, record = migrated
+    return key, record
+
+
+class MigrationStats:
+    """Records migrated and throughput for one collection"""
+
+    def __init__(self, collection: str, from_version: int, to_version: int, resumed_at: int = 0):
+        self.collection = collection
+        self.from_version = from_version
+        self.to_version = to_version
+        self.resumed_at = resumed_at  # Source records already processed before an interruption
+        self.records = 0
+        self.dropped = 0
+        self.seconds = 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds > 0 else 0.0
+
+    def report(self) -> str:
+        resumed = f", resumed after {self.resumed_at}" if self.resumed_at else ""
+        return (f"{self.collection}: version {self.from_version} -> {self.to_version}, "
+                f"{self.records} records ({self.dropped} dropped{resumed}) in {self.seconds:.2f} s "
+                f"({self.records_per_second:,.0f} records/s)")
+
+
+class Migrator:
+    """Brings the collection files of a data directory up to the current schema.
+
+    Each collection is streamed record by record from its file through the
+    pending steps into a new file, which replaces the old one only when
+    complete, so memory stays bounded by the largest record. Progress is
+    checkpointed, and an interrupted run picks up where it stopped.
+    """
+
+    def __init__(self, data_dir: str, steps: Optional[List[MigrationStep]] = None,
+                 checkpoint_every: int = CHECKPOINT_EVERY):
+        self.data_dir = data_dir
+        self.storage = JsonFileStorage(data_dir)
+        self.steps = MIGRATIONS if steps is None else steps
+        self.targets = current_versions(self.steps)
+        self.checkpoint_every = checkpoint_every
+
+    def versions(self) -> Dict[str, int]:
+        """Schema versions of the collection files.
+
+        A directory without a sidecar is either new, and so current, or from
+        before versioning, when every existing file is at version 1.
+        """
+        recorded = read_versions(self.data_dir)
+        if recorded is not None:
+            return {collection: recorded.get(collection, 1) for collection in self.targets}
+        return {collection: 1 if self.storage.exists(collection) else target
+                for collection, target in self.targets.items()}
+
+    def pending(self) -> Dict[str, Tuple[int, int]]:
+        """Collections behind the current schema, as (version, target)"""
+        return {collection: (version, self.targets[collection])
+                for collection, version in self.versions().items() if version < self.targets[collection]}
+
+    def migrate(self, progress: Optional[Callable[[MigrationStats], None]] = None) -> List[MigrationStats]:
+        """Run every pending migration, returning per-collection statistics"""
+        versions = self.versions()
+        results = []
+        for collection, (version, target) in self.pending().items():
+            if self.storage.exists(collection):
+                results.append(self._migrate_collection(collection, version, target, progress))
+            versions[collection] = target
+            _write_json(os.path.join(self.data_dir, SCHEMA_FILE), versions)
+
+        if read_versions(self.data_dir) is None:
+            _write_json(os.path.join(self.data_dir, SCHEMA_FILE), versions)
+        return results
+
+    def _chain(self, collection: str, version: int, target: int) -> List[MigrationStep]:
+        by_version = {step.from_version: step for step in self.steps if step.collection == collection}
+        return [by_version[v] for v in range(version, target) if v in by_version]
+
+    def _migrate_collection(self, collection: str, version: int, target: int,
+                            progress: Optional[Callable[[MigrationStats], None]]) -> MigrationStats:
+        chain = self._chain(collection, version, target)
+        source = self.storage.path(collection)
+        output = source + '.migrating'
+        checkpoint_path = os.path.join(self.data_dir, CHECKPOINT_FILE)
+
+        # Resume only a checkpoint for this exact migration; anything else starts over
+        checkpoint = {}
+        if os.path.exists(checkpoint_path) and os.path.exists(output):
+            with open(checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+            if (checkpoint.get('collection'), checkpoint.get('from'), checkpoint.get('to')) != \
+                    (collection, version, target):
+                checkpoint = {}
+
+        read = checkpoint.get('read', 0)
+        written = checkpoint.get('written', 0)
+        stats = MigrationStats(collection, version, target, resumed_at=read)
+        started = time.perf_counter()
+
+        with open(output, 'r+' if checkpoint else 'w') as out:
+            if checkpoint:
+                # Drop anything written after the last checkpoint
+                out.truncate(checkpoint['offset'])
+                out.seek(checkpoint['offset'])
+            else:
+                out.write('{')
+
+            for position, (key, record) in enumerate(self.storage.iter_records(collection)):
+                if position < read:
+                    continue
+                migrated = _apply(chain, key, record)
+                if migrated is None:
+                    stats.dropped += 1
+                else:
+                    out.write(',\n    ' if written else '\n    ')
+                    out.write(f"{json.dumps(migrated[0])}: {json.dumps(migrated[1])}")
+                    written += 1
+                    stats.records += 1
+                read = position + 1
+                if read % self.checkpoint_every == 0:
+                    self._checkpoint(out, checkpoint_path, collection, version, target, read, written)
+                    stats.seconds = time.perf_counter() - started
+                    if progress:
+                        progress(stats)
+
+            out.write('\n}\n' if written else '}\n')
+            out.flush()
+            os.fsync(out.fileno())
+
+        os.replace(output, source)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        stats.seconds = time.perf_counter() - started
+        return stats
+
+    def _checkpoint(self, out, checkpoint_path: str, collection: str, version: int, target: int,
+                    read: int, written: int):
+        """Make the output durable up to here and record how far the source has been read"""
+        out.flush()
+        os.fsync(out.fileno())
+        _write_json(checkpoint_path, {'collection': collection, 'from': version, 'to': target,
+                                      'read': read, 'written': written, 'offset': out.tell()})
+
+
+def main():
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('DATA_DIR', 'data')
+    migrator = Migrator(data_dir)
+    pending = migrator.pending()
+    if not pending:
+        print(f"{data_dir} is at the current schema")
+        return
+
+    for collection, (version, target) in pending.items():
+        print(f"Pending: {collection} version {version} -> {target}")
+    last_report = [time.perf_counter()]
+
+    def progress(stats: MigrationStats):
+        # At most one progress line a second
+        if time.perf_counter() - last_report[0] >= 1:
+            last_report[0] = time.perf_counter()
+            print(f"  {stats.collection}: {stats.resumed_at + stats.records + stats.dropped} records "
+                  f"({stats.records_per_second:,.0f} records/s)")
+
+    for stats in migrator.migrate(progress):
+        print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 # src/models.py
 import datetime
 import uuid
+from collections.abc import Sequence
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 
 class OrderStatus(Enum):
@@ -20,16 +21,46 @@ class DeliveryMode(Enum):
     TAKEAWAY = "Takeaway"
 
 
+# Minutes allowed for delivery when there is no measured delivery time to go on
+DEFAULT_DELIVERY_MINUTES = 30
+
+# Value -> member maps, cheaper than calling the enum per record on load
+_STATUS_BY_VALUE = {status.value: status for status in OrderStatus}
+_MODE_BY_VALUE = {mode.value: mode for mode in DeliveryMode}
+
+
+class OrderHistory(Sequence):
+    """Read-only view of a customer's order IDs, oldest first.
+
+    Backed by the store's sorted (creation time, order ID) keys for the
+    customer, so it follows new orders without being stored with the user.
+    """
+
+    def __init__(self, keys: Optional[List[Tuple[datetime.datetime, str]]] = None):
+        self._keys = keys if keys is not None else []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [order_id for _, order_id in self._keys[index]]
+        return self._keys[index][1]
+
+    def __iter__(self) -> Iterator[str]:
+        return (order_id for _, order_id in self._keys)
+
+    def __repr__(self) -> str:
+        return f"OrderHistory({list(self)!r})"
+
+
 class User:
     def __init__(self, username: str, password: str, address: str, phone: str):
         self.username = username
         self.password = password
         self.address = address
         self.phone = phone
-        self.order_history: List[str] = []  # List of order IDs
-
-    def add_order(self, order_id: str):
-        self.order_history.append(order_id)
+        self.order_history = OrderHistory()  # Order IDs, bound to the store's index when added
 
 
 class MenuItem:
@@ -56,25 +87,55 @@ class OrderItem:
 
 class Order:
     def __init__(self, order_id: str, customer_username: str, items: List[OrderItem], 
-                 delivery_mode: DeliveryMode, delivery_address: Optional[str] = None):
+                 delivery_mode: DeliveryMode, delivery_address: Optional[str] = None,
+                 delivery_minutes: Optional[float] = None, now: Optional[datetime.datetime] = None):
         self.order_id = order_id
         self.customer_username = customer_username
         self.items = items
         self.delivery_mode = delivery_mode
         self.delivery_address = delivery_address
         self.status = OrderStatus.PLACED
-        self.creation_time = datetime.datetime.now()
-        self.estimated_completion_time = self._calculate_estimated_completion_time()
+        self.creation_time = now or datetime.datetime.now()
+        # When the order entered each status it has been in
+        self.status_times: Dict[OrderStatus, datetime.datetime] = {OrderStatus.PLACED: self.creation_time}
+        self.estimated_completion_time = self._calculate_estimated_completion_time(delivery_minutes)
         self.assigned_delivery_agent: Optional[str] = None
-
-    def _calculate_estimated_completion_time(self) -> datetime.datetime:
+        self.version = 0  # Incremented by the store on every write
+
+    @classmethod
+    def from_record(cls, order_id: str, record: Dict, menu_items: Dict[str, MenuItem]) -> 'Order':
+        """Rebuild a stored order directly from its fields.
+
+        Skips the constructor, so nothing is recomputed: creation and
+        completion times come from the record as stored. Items whose menu
+        item no longer exists are dropped.
+        """
+        order = cls.__new__(cls)
+        order.order_id = order_id
+        order.customer_username = record['customer_username']
+        order.items = [OrderItem(menu_items[item['menu_item_id']], item['quantity'])
+                       for item in record.get('items', ())
+                       if item['menu_item_id'] in menu_items]
+        order.delivery_mode = _MODE_BY_VALUE[record['delivery_mode']]
+        order.delivery_address = record.get('delivery_address')
+        order.status = _STATUS_BY_VALUE[record['status']]
+        order.creation_time = datetime.datetime.fromisoformat(record['creation_time'])
+        status_times = record.get('status_times')
+        order.status_times = ({_STATUS_BY_VALUE[status]: datetime.datetime.fromisoformat(entered)
+                               for status, entered in status_times.items()}
+                              if status_times else {OrderStatus.PLACED: order.creation_time})
+        order.estimated_completion_time = datetime.datetime.fromisoformat(record['estimated_completion_time'])
+        order.assigned_delivery_agent = record.get('assigned_delivery_agent')
+        order.version = record.get('version', 0)
+        return order
+
+    def _calculate_estimated_completion_time(self, delivery_minutes: Optional[float] = None) -> datetime.datetime:
         # Calculate max preparation time across all items
         max_prep_time = max([item.preparation_time for item in self.items], default=0)
         
         # Add delivery time if it's a home delivery
         if self.delivery_mode == DeliveryMode.HOME_DELIVERY:
-            # Assuming 30 minutes for delivery
-            total_time = max_prep_time + 30
+            total_time = max_prep_time + (delivery_minutes or DEFAULT_DELIVERY_MINUTES)
         else:
             total_time = max_prep_time
         
@@ -84,8 +145,11 @@ class Order:
     def total_price(self) -> float:
         return sum(item.total_price for item in self.items)
 
-    def update_status(self, new_status: OrderStatus):
+    def update_status(self, new_status: OrderStatus, delivery_minutes: Optional[float] = None,
+                      now: Optional[datetime.datetime] = None):
+        now = now or datetime.datetime.now()
         self.status = new_status
+        self.status_times[new_status] = now
         
         # Update estimated time based on status
         if new_status == OrderStatus.PREPARING:
@@ -94,17 +158,18 @@ class Order:
         elif new_status == OrderStatus.READY_FOR_PICKUP:
             if self.delivery_mode == DeliveryMode.HOME_DELIVERY:
                 # Reset the timer for delivery portion
-                self.estimated_completion_time = datetime.datetime.now() + datetime.timedelta(minutes=30)
+                self.estimated_completion_time = now + datetime.timedelta(
+                    minutes=delivery_minutes or DEFAULT_DELIVERY_MINUTES)
         elif new_status in [OrderStatus.DELIVERED, OrderStatus.PICKED_UP]:
             # Order is complete
-            self.estimated_completion_time = datetime.datetime.now()
+            self.estimated_completion_time = now
 
-    def get_time_remaining(self) -> int:
+    def get_time_remaining(self, now: Optional[datetime.datetime] = None) -> int:
         """Returns the estimated time remaining in minutes."""
         if self.status in [OrderStatus.DELIVERED, OrderStatus.PICKED_UP, OrderStatus.CANCELLED]:
             return 0
         
-        time_remaining = (self.estimated_completion_time - datetime.datetime.now()).total_seconds() / 60
+        time_remaining = (self.estimated_completion_time - (now or datetime.datetime.now())).total_seconds() / 60
         return max(0, int(time_remaining))
 
     def assign_delivery_agent(self, agent_username: str):
@@ -119,6 +184,8 @@ class DeliveryAgent:
         self.phone = phone
         self.available = True
         self.current_orders: List[str] = []  # List of order IDs
+        self.version = 0  # Incremented by the store on every write
+        self.location: Optional[Tuple[float, float]] = None  # Last-known km east and north of the restaurant
 
     def assign_order(self, order_id: str):
         if order_id not in self.current_orders:
@@ -0,0 +1,41 @@
+# src/profiling.py
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+
+class StartupProfile:
+    """Wall-clock timings of named startup phases, run one after another"""
+
+    def __init__(self):
+        self.phases: List[Tuple[str, float]] = []
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+
+    def finish(self):
+        """Freeze the total at the current time"""
+        self._finished = time.perf_counter()
+
+    def record(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    @property
+    def elapsed(self) -> float:
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._started
+
+    def report(self, title: str = "Startup Profile") -> str:
+        lines = [title, "-" * 50]
+        for name, seconds in self.phases:
+            lines.append(f"{name:<36} {seconds * 1000:>9.2f} ms")
+        lines.append("-" * 50)
+        lines.append(f"{'Total (wall clock)':<36} {self.elapsed * 1000:>9.2f} ms")
+        return "\n".join(lines)
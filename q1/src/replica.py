@@ -0,0 +1,191 @@
+# src/replica.py
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+from typing import Dict, Optional
+
+from src.clock import SYSTEM_CLOCK
+from src.database import Database
+from src.migrations import SCHEMA_FILE
+from src.replication_log import (REPLICATION_LOG_FILE, REPLICATED_COLLECTIONS, LogReader, ReplicationLog,
+                                 entry_time, read_checkpoint)
+from src.storage import JsonFileStorage, MemoryStorage
+from src.writer import DurabilityMode
+
+REPLICA_STATE_FILE = 'replica_state.json'
+
+
+class Replica:
+    """Warm standby store following a primary's replication log.
+
+    A new replica copies the primary's latest checkpoint, then replays the
+    log segment that starts with it: entries hold whole records, so
+    replaying ones the checkpoint already reflects is harmless and the end
+    state matches the primary. The segment and byte offset reached are
+    stored with the applied sequence number, so a restarted replica reads
+    on from there. Reads can be served from replica.db, and promote() turns
+    the replica into a store that takes writes and logs them for replicas
+    of its own.
+    """
+
+    def __init__(self, primary_dir: str, data_dir: Optional[str] = None,
+                 poll_interval: float = 0.2, clock=None):
+        self.primary_dir = primary_dir
+        self.data_dir = data_dir
+        self.poll_interval = poll_interval
+        self.clock = clock or SYSTEM_CLOCK
+        self.log = ReplicationLog(os.path.join(primary_dir, REPLICATION_LOG_FILE), self.clock)
+
+        storage = JsonFileStorage(data_dir) if data_dir else MemoryStorage()
+        state = self._load_state()
+        if state is None:
+            state = self._bootstrap(storage)
+        self.applied_seq = state['applied_seq']
+        self.promoted = state.get('promoted', False)
+        self._reader = LogReader(self.log.path, state.get('log_segment', 0), state.get('log_offset', 0))
+
+        # Applied changes are coalesced; replica_state.json only advances once they are stored
+        self.db = Database(storage=storage, durability=DurabilityMode.INTERVAL, clock=clock, replicate=False)
+        if self.promoted and data_dir:
+            self.db.enable_replication()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load_state(self) -> Optional[Dict]:
+        if not self.data_dir or not os.path.exists(os.path.join(self.data_dir, REPLICA_STATE_FILE)):
+            return None
+        with open(os.path.join(self.data_dir, REPLICA_STATE_FILE), 'r') as f:
+            return json.load(f)
+
+    def _save_state(self):
+        if not self.data_dir:
+            return
+        path = os.path.join(self.data_dir, REPLICA_STATE_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'applied_seq': self.applied_seq, 'promoted': self.promoted,
+                       'log_segment': self._reader.base, 'log_offset': self._reader.position}, f)
+        os.replace(path + '.tmp', path)
+
+    def _bootstrap(self, storage) -> Dict:
+        """Start from a copy of the primary's latest checkpoint, returning the state it leaves off at"""
+        checkpoint = read_checkpoint(self.primary_dir)
+        if checkpoint is None:
+            raise ValueError(f"{self.primary_dir} has no replication checkpoint; "
+                             f"start the primary with REPLICATION_LOG=1 first")
+        seq, checkpoint_dir = checkpoint
+        source = JsonFileStorage(checkpoint_dir)
+        for collection in REPLICATED_COLLECTIONS:
+            if source.exists(collection):
+                storage.write_collection(collection, dict(source.iter_records(collection)))
+        if self.data_dir:
+            shutil.copyfile(os.path.join(checkpoint_dir, SCHEMA_FILE), os.path.join(self.data_dir, SCHEMA_FILE))
+        # The checkpoint was written as the log segment following entry seq began
+        return {'applied_seq': seq, 'log_segment': seq, 'log_offset': 0}
+
+    def poll(self) -> int:
+        """Apply every complete entry the primary has logged since the last poll"""
+        with self._lock:
+            if self.promoted:
+                return 0
+            applied = 0
+            for entry in self._reader.read_new():
+                if entry['seq'] <= self.applied_seq:
+                    continue
+                self.db.apply_change(entry['collection'], entry['key'], entry['record'])
+                self.applied_seq = entry['seq']
+                applied += 1
+            return applied
+
+    def lag(self) -> Dict[str, float]:
+        """Replication lag: entries not yet applied, and how long the oldest of them has been waiting"""
+        behind = max(0, self.log.last_seq() - self.applied_seq)
+        seconds = 0.0
+        if behind:
+            with self._lock:
+                waiting = self._reader.peek()
+            if waiting is not None:
+                seconds = max(0.0, (self.clock.now() - entry_time(waiting)).total_seconds())
+        return {'events': behind, 'seconds': seconds, 'applied_seq': self.applied_seq}
+
+    def flush(self) -> bool:
+        """Store applied changes and record how far the log has been applied"""
+        with self._lock:
+            if not self.db.flush():
+                return False
+            self._save_state()
+            return True
+
+    def start(self):
+        """Follow the log on a background thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replica", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.poll():
+                    self.flush()
+            except Exception as e:
+                print(f"Error applying replication log: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def promote(self) -> Database:
+        """Stop following, apply what the primary logged last and take writes from now on.
+        
+        With a data directory the promoted store logs its writes and
+        checkpoints, so a new replica can follow it in turn.
+        """
+        self.stop()
+        self.poll()
+        with self._lock:
+            self.promoted = True
+        self.flush()
+        if self.data_dir:
+            self.db.enable_replication()
+        return self.db
+
+    def close(self):
+        self.stop()
+        self.flush()
+        self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a warm standby replica of a primary data directory")
+    parser.add_argument('--primary', default='data', help="the primary's data directory")
+    parser.add_argument('--data', default='replica_data', help="this replica's data directory")
+    parser.add_argument('--promote', action='store_true', help="catch up once and promote this replica")
+    args = parser.parse_args()
+
+    replica = Replica(args.primary, args.data)
+    if args.promote:
+        replica.promote()
+        replica.close()
+        print(f"Promoted at entry {replica.applied_seq}; start the application with "
+              f"DATA_DIR={args.data} REPLICATION_LOG=1")
+        return
+
+    replica.start()
+    try:
+        while True:
+            time.sleep(5)
+            lag = replica.lag()
+            print(f"Applied {lag['applied_seq']}, behind by {lag['events']} entries ({lag['seconds']:.1f} s)")
+    except KeyboardInterrupt:
+        replica.close()
+
+
+if __name__ == "__main__":
+    main()
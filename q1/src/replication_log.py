@@ -0,0 +1,211 @@
+# src/replication_log.py
+import os
+import json
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.clock import SYSTEM_CLOCK
+from src.events import read_last_seq, fcntl
+from src.migrations import SCHEMA_FILE, current_versions
+from src.storage import JsonFileStorage
+
+REPLICATION_LOG_FILE = 'replication.jsonl'
+# The segment before the last rotation, kept for replicas still reading it
+PREVIOUS_SEGMENT_SUFFIX = '.1'
+
+# Pointer to the newest checkpoint, replaced in one step once its directory is complete
+CHECKPOINT_FILE = 'replication_checkpoint.json'
+CHECKPOINT_DIR = 'replication_checkpoints'
+
+# Collections a checkpoint holds, which replicas bootstrap from
+REPLICATED_COLLECTIONS = ('users', 'menu_items', 'orders', 'delivery_agents', 'idempotency_keys')
+
+# A primary checkpoints and starts a new segment once the log grows past this size
+ROTATE_BYTES = 64 * 1024 * 1024
+
+
+class ReplicationLog:
+    """Append-only log of every record a primary store writes.
+
+    Each line holds a sequence number, the collection, key and full stored
+    form of the record (None once deleted) and when it was written. Lines
+    are flushed before the write returns, whatever the durability mode, so
+    a replica following the log is never behind the files.
+
+    rotate() starts a new segment whose first line is a header holding the
+    sequence number it follows on from; the previous segment is kept.
+    """
+
+    def __init__(self, path: str, clock=None):
+        self.path = path
+        self.clock = clock or SYSTEM_CLOCK
+        self._lock = threading.Lock()
+
+    def _open_locked(self):
+        """Open the current segment for appending, holding its file lock"""
+        while True:
+            f = open(self.path, 'a')
+            if fcntl is None:
+                return f
+            fcntl.flock(f, fcntl.LOCK_EX)
+            # A rotation may have replaced the file while this one waited for the lock
+            if os.path.exists(self.path) and os.fstat(f.fileno()).st_ino == os.stat(self.path).st_ino:
+                return f
+            f.close()
+
+    def append(self, collection: str, key: str, record: Optional[dict]) -> int:
+        """Log one record write, returning its sequence number"""
+        # Every store on the directory appends here, so numbering happens under a file lock
+        with self._lock, self._open_locked() as f:
+            seq = read_last_seq(self.path) + 1
+            f.write(json.dumps({'seq': seq, 'collection': collection, 'key': key, 'record': record,
+                                'written': self.clock.now().isoformat()}) + '\n')
+            f.flush()
+        return seq
+
+    def rotate(self) -> int:
+        """Start a new segment, returning the sequence number of the last entry before it"""
+        with self._lock, self._open_locked():
+            seq = read_last_seq(self.path)
+            header = {'seq': seq, 'segment': seq, 'written': self.clock.now().isoformat()}
+            with open(self.path + '.tmp', 'w') as new:
+                new.write(json.dumps(header) + '\n')
+            # The old segment is linked under its new name before the new one replaces
+            # it, so the log path always exists for appenders in other processes
+            previous = self.path + PREVIOUS_SEGMENT_SUFFIX
+            if os.path.exists(previous + '.tmp'):
+                os.remove(previous + '.tmp')
+            os.link(self.path, previous + '.tmp')
+            os.replace(previous + '.tmp', previous)
+            os.replace(self.path + '.tmp', self.path)
+        return seq
+
+    def last_seq(self) -> int:
+        return read_last_seq(self.path)
+
+    def size(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+
+def segment_base(path: str) -> Optional[int]:
+    """Sequence number a log segment follows on from, 0 for one never rotated, None if missing"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        line = f.readline()
+    if not line.endswith('\n'):
+        return 0
+    return json.loads(line).get('segment', 0)
+
+
+class LogReader:
+    """Reads complete entries from a replication log as they are appended.
+
+    The reader remembers the segment it is in and its byte offset there,
+    so a replica can store both and resume where it stopped. When the
+    primary rotates, the rest of the previous segment is read first.
+    """
+
+    def __init__(self, path: str, base: int = 0, position: int = 0):
+        self.path = path
+        self.base = base
+        self.position = position
+
+    def _segment_path(self) -> str:
+        """The file holding the reader's segment, following it once rotated away"""
+        if segment_base(self.path) in (None, self.base):
+            return self.path
+        previous = self.path + PREVIOUS_SEGMENT_SUFFIX
+        if segment_base(previous) == self.base:
+            return previous
+        raise ValueError(f"Replication log segment {self.base} is gone; bootstrap the replica again")
+
+    def _read(self, path: str, limit: Optional[int] = None) -> Tuple[List[dict], int]:
+        """Complete entries from the reader's position; a line still being written waits for the next read"""
+        entries = []
+        position = self.position
+        with open(path, 'rb') as f:
+            f.seek(position)
+            while limit is None or len(entries) < limit:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break
+                position += len(line)
+                entry = json.loads(line)
+                if 'collection' in entry:  # Segment headers hold no change
+                    entries.append(entry)
+        return entries, position
+
+    def read_new(self) -> List[dict]:
+        """Entries appended since the last call, moving on to newer segments as they appear"""
+        entries = []
+        while os.path.exists(self.path):
+            path = self._segment_path()
+            new, self.position = self._read(path)
+            entries += new
+            if path == self.path:
+                return entries
+            # The previous segment is finished; carry on at the start of the current one
+            self.base, self.position = segment_base(self.path), 0
+        return entries
+
+    def peek(self) -> Optional[dict]:
+        """The next entry read_new() would return, without moving past it"""
+        if not os.path.exists(self.path):
+            return None
+        path = self._segment_path()
+        entries, _ = self._read(path, limit=1)
+        if entries or path == self.path:
+            return entries[0] if entries else None
+        reader = LogReader(self.path, segment_base(self.path))
+        return reader.peek()
+
+
+def entry_time(entry: dict) -> datetime:
+    return datetime.fromisoformat(entry['written'])
+
+
+def write_checkpoint(data_dir: str, seq: int, collections: Dict[str, Dict[str, dict]]):
+    """Write a consistent copy of the replicated collections as of log entry seq.
+
+    The copy goes to its own directory, and only once every file is written
+    is the pointer file replaced to name it, so readers never see a partial
+    checkpoint. The checkpoint before it is kept for replicas still copying.
+    """
+    root = os.path.join(data_dir, CHECKPOINT_DIR)
+    name = str(seq)
+    target = os.path.join(root, name)
+    building = target + '.tmp'
+    if os.path.exists(building):
+        shutil.rmtree(building)
+    storage = JsonFileStorage(building)
+    for collection in REPLICATED_COLLECTIONS:
+        storage.write_collection(collection, collections.get(collection, {}))
+    with open(os.path.join(building, SCHEMA_FILE), 'w') as f:
+        json.dump(current_versions(), f, indent=4)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.replace(building, target)
+
+    pointer = os.path.join(data_dir, CHECKPOINT_FILE)
+    previous = read_checkpoint(data_dir)
+    with open(pointer + '.tmp', 'w') as f:
+        json.dump({'seq': seq, 'dir': os.path.join(CHECKPOINT_DIR, name)}, f)
+    os.replace(pointer + '.tmp', pointer)
+
+    keep = {name, str(previous[0]) if previous else name}
+    for entry in os.listdir(root):
+        if entry not in keep:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+
+def read_checkpoint(data_dir: str) -> Optional[Tuple[int, str]]:
+    """The newest checkpoint of a data directory, as (seq, directory), or None if it has none"""
+    pointer = os.path.join(data_dir, CHECKPOINT_FILE)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, 'r') as f:
+        checkpoint = json.load(f)
+    return checkpoint['seq'], os.path.join(data_dir, checkpoint['dir'])
@@ -1,14 +1,153 @@
+import os
+import csv
+import json
+import math
+import time
 import uuid
-from typing import List, Optional, Tuple
-from datetime import datetime
+import random
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
 
 from src.models import User, MenuItem, Order, DeliveryAgent, OrderItem, DeliveryMode, OrderStatus
-from src.database import Database
+from src.database import Database, encode_cursor
+from src.events import OrderEvent, OrderEventType, Subscription
+from src.idempotency import request_fingerprint
+from src.snapshot import StoreSnapshot
+from src.timeseries import ORDERS_PLACED, TIME_TO_READY, ACTIVE_AGENTS
+from src.admission import AdmissionController, KITCHEN_STATUSES
+from src.spatial import RESTAURANT_LOCATION
+
+# Default number of orders returned per page by the paginated queries
+DEFAULT_PAGE_SIZE = 20
+
+# Prefix of the message returned when a versioned write loses a race
+VERSION_CONFLICT = "Version conflict"
+
+# Nearest agents tried for a new order before falling back to any available agent
+NEAREST_CANDIDATES = 8
+
+# Columns of menu import and export files
+MENU_FIELDS = ('item_id', 'name', 'price', 'preparation_time')
+
+
+def _check_version(kind: str, key: str, record, expected_version: Optional[int]) -> Optional[str]:
+    """Return a conflict message if a record has moved past the expected version"""
+    if expected_version is None or record.version == expected_version:
+        return None
+    return f"{VERSION_CONFLICT}: {kind} {key} is at version {record.version}, expected {expected_version}"
+
+
+def is_version_conflict(message: str) -> bool:
+    """Whether a service result message reports a version conflict"""
+    return message.startswith(VERSION_CONFLICT)
+
+
+def retry_on_conflict(operation: Callable[[], Tuple[bool, str]], attempts: int = 3,
+                      backoff: float = 0.01) -> Tuple[bool, str]:
+    """Run an optimistic write, re-running it while it reports a version conflict.
+    
+    The operation should re-read the record and its version on every call,
+    so each retry decides against fresh state.
+    """
+    for attempt in range(attempts):
+        success, message = operation()
+        if success or not is_version_conflict(message):
+            return success, message
+        # Randomised backoff keeps racing writers from colliding in lockstep
+        time.sleep(backoff * (2 ** attempt) * random.random())
+    return success, message
+
+
+def _paginate(orders: Iterator[Order], page_size: int) -> Tuple[List[Order], Optional[str]]:
+    """Take one page from an order stream, with the cursor for the next page"""
+    page = list(islice(orders, page_size + 1))
+    if len(page) <= page_size:
+        return page, None
+    
+    page = page[:page_size]
+    return page, encode_cursor(page[-1])
+
+
+def _menu_file_format(path: str) -> Optional[str]:
+    """Menu file format from its extension: 'csv', 'jsonl' or None"""
+    extension = os.path.splitext(path)[1].lower()
+    return {'.csv': 'csv', '.jsonl': 'jsonl'}.get(extension)
+
+
+def _read_menu_rows(f, file_format: str) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, row) from a menu file; a JSONL line that is not JSON yields None"""
+    if file_format == 'csv':
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def _menu_item_from_row(row, seen_ids: Set[str]) -> Tuple[Optional[MenuItem], List[str]]:
+    """Build a menu item from an import row, or list everything wrong with it"""
+    if not isinstance(row, dict):
+        return None, ["not a JSON object"]
+    
+    problems = []
+    name = str(row.get('name') or '').strip()
+    if not name:
+        problems.append("name is missing")
+    try:
+        price = float(row.get('price'))
+        if not math.isfinite(price) or price <= 0:
+            problems.append("price must be positive")
+    except (TypeError, ValueError):
+        problems.append(f"price {row.get('price')!r} is not a number")
+    try:
+        preparation_time = int(row.get('preparation_time'))
+        if preparation_time != float(row.get('preparation_time')):
+            raise ValueError("fractional minutes")
+        if preparation_time <= 0:
+            problems.append("preparation time must be positive")
+    except (TypeError, ValueError):
+        problems.append(f"preparation time {row.get('preparation_time')!r} is not a whole number")
+    
+    item_id = str(row.get('item_id') or '').strip() or str(uuid.uuid4())
+    if item_id in seen_ids:
+        problems.append(f"item ID {item_id} appears more than once")
+    seen_ids.add(item_id)
+    
+    if problems:
+        return None, problems
+    return MenuItem(item_id, name, price, preparation_time), []
+
+
+def _record_active_agents(db: Database):
+    """Sample how many agents are out with orders into the time series"""
+    busy = sum(1 for agent in list(db.delivery_agents.values()) if agent.current_orders)
+    db.timeseries.record(ACTIVE_AGENTS, busy, now=db.clock.now())
+
+
+def _release_agent(db: Database, order: Order):
+    """Take an order off its agent, in whichever store holds the agent"""
+    username = order.assigned_delivery_agent
+    agent_db = db
+    if db.get_delivery_agent(username) is None and db.agent_directory is not None:
+        agent_db = db.agent_directory(username) or db
+    with agent_db.lock_records(agent_usernames=[username]):
+        agent = agent_db.get_delivery_agent(username)
+        if agent:
+            agent.complete_order(order.order_id)
+            agent_db.update_delivery_agent(agent)
+    _record_active_agents(agent_db)
 
 
 class UserService:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
     
     def register_user(self, username: str, password: str, address: str, phone: str) -> Tuple[bool, str]:
         """Register a new user"""
@@ -36,11 +175,20 @@ class UserService:
     def get_user_orders(self, username: str) -> List[Order]:
         """Get all orders for a user"""
         return self.db.get_user_orders(username)
+    
+    def iter_user_orders(self, username: str, cursor: Optional[str] = None) -> Iterator[Order]:
+        """Stream a user's orders oldest first, resuming after the cursor"""
+        return self.db.iter_user_orders(username, cursor)
+    
+    def get_user_orders_page(self, username: str, cursor: Optional[str] = None,
+                             page_size: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Order], Optional[str]]:
+        """Get one page of a user's orders and the cursor for the next page"""
+        return _paginate(self.db.iter_user_orders(username, cursor), page_size)
 
 
 class MenuService:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
     
     def add_item(self, name: str, price: float, preparation_time: int) -> Tuple[bool, str]:
         """Add a new menu item"""
@@ -51,6 +199,73 @@ class MenuService:
             return True, f"Item added successfully with ID: {item_id}"
         return False, "Failed to add item"
     
+    def add_items(self, items: Iterable[Tuple[str, float, int]]) -> Tuple[bool, str]:
+        """Add several menu items, given as (name, price, preparation time), with one write"""
+        menu_items = [MenuItem(str(uuid.uuid4()), name, price, preparation_time)
+                      for name, price, preparation_time in items]
+        if self.db.put_menu_items(menu_items):
+            return True, f"{len(menu_items)} items added successfully"
+        return False, "Failed to add items"
+    
+    def import_items(self, path: str) -> Tuple[bool, str]:
+        """Add or update menu items from a CSV or JSONL file.
+        
+        Rows have name, price and preparation_time, and optionally the
+        item_id of an item to replace. Every row is validated in one pass
+        before anything is stored; if any row is invalid nothing is imported
+        and the message lists each invalid line. Valid files are stored in
+        one write.
+        """
+        file_format = _menu_file_format(path)
+        if file_format is None:
+            return False, "Menu files must be .csv or .jsonl"
+        
+        items: List[MenuItem] = []
+        errors: List[str] = []
+        seen_ids: Set[str] = set()
+        try:
+            with open(path, 'r', newline='') as f:
+                for line_number, row in _read_menu_rows(f, file_format):
+                    item, problems = _menu_item_from_row(row, seen_ids)
+                    if item is None:
+                        errors.append(f"Line {line_number}: " + "; ".join(problems))
+                    else:
+                        items.append(item)
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
+            return False, f"Could not read {path}: {e}"
+        
+        if errors:
+            return False, f"Import failed, {len(errors)} invalid rows:\n" + "\n".join(errors)
+        if not items:
+            return False, "No menu items found in file"
+        
+        updated = sum(1 for item in items if item.item_id in self.db.menu_items)
+        if self.db.put_menu_items(items):
+            return True, f"Imported {len(items)} items ({len(items) - updated} added, {updated} updated)"
+        return False, "Failed to import items"
+    
+    def export_items(self, path: str) -> Tuple[bool, str]:
+        """Write the whole menu to a CSV or JSONL file that import_items can read back"""
+        file_format = _menu_file_format(path)
+        if file_format is None:
+            return False, "Menu files must be .csv or .jsonl"
+        
+        rows: List[Dict] = [{'item_id': item.item_id, 'name': item.name, 'price': item.price,
+                             'preparation_time': item.preparation_time}
+                            for item in self.db.get_all_menu_items()]
+        try:
+            with open(path + '.tmp', 'w', newline='') as f:
+                if file_format == 'csv':
+                    writer = csv.DictWriter(f, fieldnames=MENU_FIELDS)
+                    writer.writeheader()
+                    writer.writerows(rows)
+                else:
+                    f.writelines(json.dumps(row) + '\n' for row in rows)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            return False, f"Could not write {path}: {e}"
+        return True, f"Exported {len(rows)} items to {path}"
+    
     def get_all_items(self) -> List[MenuItem]:
         """Get all menu items"""
         return self.db.get_all_menu_items()
@@ -78,18 +293,71 @@ class MenuService:
 
 
 class OrderService:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Optional[Database] = None, admission: Optional[AdmissionController] = None):
+        # A store passed in is shared with other services and must not be swapped out.
+        # Services sharing a store are safe to call from many threads; an owned store
+        # is reloaded on every order and is meant for a single caller.
+        self._owns_db = db is None
+        self.db = db or Database()
+        # Optional limit on the orders the kitchen takes on at once
+        self.admission = admission.attach(self.db.orders) if admission else None
     
     def create_order(self, username: str, item_quantities: List[Tuple[str, int]], 
-                     delivery_mode: DeliveryMode, delivery_address: Optional[str] = None) -> Tuple[bool, str]:
-        """Create a new order"""
-        # Explicitly reload the database to ensure the latest user data
-        self.db = Database()
-        
+                     delivery_mode: DeliveryMode, delivery_address: Optional[str] = None,
+                     idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
+        """Create a new order.
+        
+        A request retried with the same idempotency key returns the result of
+        the first successful attempt instead of placing a second order. Reusing
+        a key for a request with different arguments is rejected.
+        """
+        success, message, _ = self.place_order(username, item_quantities, delivery_mode,
+                                               delivery_address, idempotency_key)
+        return success, message
+    
+    def place_order(self, username: str, item_quantities: List[Tuple[str, int]],
+                    delivery_mode: DeliveryMode, delivery_address: Optional[str] = None,
+                    idempotency_key: Optional[str] = None) -> Tuple[bool, str, Optional[Order]]:
+        """Create a new order as create_order() does, also returning the order placed.
+        
+        The order is None when the request fails or a retry returns the
+        result of the attempt that placed it.
+        """
+        # Explicitly reload the database to ensure the latest user data,
+        # storing any writes the old copy still has pending first
+        if self._owns_db:
+            self.db.close()
+            self.db = Database(storage=self.db.storage, durability=self.db.writer.mode,
+                               write_interval=self.db.writer.interval, clock=self.db.clock)
+        
+        if idempotency_key is None:
+            return self._place_order(username, item_quantities, delivery_mode, delivery_address)
+        
+        fingerprint = request_fingerprint(username, item_quantities, delivery_mode.value, delivery_address)
+        
+        # Hold the key's lock so a concurrent retry waits for the first attempt
+        with self.db.lock_records(idempotency_keys=[idempotency_key]):
+            previous = self.db.idempotency_keys.get(idempotency_key, now=self.db.clock.now())
+            if previous is not None:
+                previous_fingerprint, previous_result = previous
+                if previous_fingerprint != fingerprint:
+                    return (False, f"Idempotency key {idempotency_key} was already used for a different order",
+                            None)
+                return previous_result[0], previous_result[1], None
+            
+            success, message, order = self._place_order(username, item_quantities, delivery_mode,
+                                                         delivery_address)
+            # Failed attempts are not remembered so the client can fix and retry them
+            if success and not self.db.record_idempotency_key(idempotency_key, fingerprint, (success, message)):
+                print("Warning: Failed to save idempotency key")
+            return success, message, order
+    
+    def _place_order(self, username: str, item_quantities: List[Tuple[str, int]], delivery_mode: DeliveryMode,
+                     delivery_address: Optional[str]) -> Tuple[bool, str, Optional[Order]]:
+        """Validate, store and announce a new order"""
         user = self.db.get_user(username)
         if not user:
-            return False, f"User not found"
+            return False, f"User not found", None
         
         # Check if delivery address is provided for home delivery
         if delivery_mode == DeliveryMode.HOME_DELIVERY and not delivery_address:
@@ -100,17 +368,28 @@ class OrderService:
         for item_id, quantity in item_quantities:
             menu_item = self.db.get_menu_item(item_id)
             if not menu_item:
-                return False, f"Menu item with ID {item_id} not found"
+                return False, f"Menu item with ID {item_id} not found", None
             
             order_item = OrderItem(menu_item, quantity)
             order_items.append(order_item)
         
         if not order_items:
-            return False, "Order must contain at least one item"
+            return False, "Order must contain at least one item", None
         
         # Create order
         order_id = str(uuid.uuid4())
-        order = Order(order_id, username, order_items, delivery_mode, delivery_address)
+        order = Order(order_id, username, order_items, delivery_mode, delivery_address,
+                      delivery_minutes=self._estimate_delivery_minutes(delivery_address),
+                      now=self.db.clock.now())
+        
+        # Hold back or turn away orders the kitchen has no room for
+        if self.admission is not None:
+            preparation_minutes = self.db.stage_timings.stage_minutes(
+                OrderStatus.PREPARING, max(item.preparation_time for item in order_items))
+            decision = self.admission.admit(order_id, preparation_minutes)
+            if not decision.admitted:
+                return False, decision.reason, None
+            order.estimated_completion_time += timedelta(minutes=decision.extra_minutes)
         
         # For home delivery orders, assign a delivery agent if available
         if delivery_mode == DeliveryMode.HOME_DELIVERY:
@@ -118,30 +397,64 @@ class OrderService:
         
         # Add order to database first
         if not self.db.add_order(order):
-            return False, "Failed to place order"
-            
-        # Now explicitly update the user's order history
-        user = self.db.get_user(username)  # Get fresh user object
-        if user:
-            if order_id not in user.order_history:
-                user.add_order(order_id)
-                if not self.db.update_user(user):  # Add this method to Database class
-                    print("Warning: Failed to update user order history")
+            if self.admission is not None:
+                self.admission.release(order_id)
+            return False, "Failed to place order", None
+        
+        self.db.change_feed.publish(
+            OrderEventType.CREATED, order_id,
+            customer_username=username,
+            delivery_mode=delivery_mode.value,
+            status=order.status.value
+        )
+        if order.assigned_delivery_agent:
+            self.db.change_feed.publish(
+                OrderEventType.AGENT_ASSIGNED, order_id,
+                agent_username=order.assigned_delivery_agent
+            )
+        
+        self.db.timeseries.record(ORDERS_PLACED, now=order.creation_time)
+        if order.assigned_delivery_agent:
+            _record_active_agents(self.db)
         
-        return True, f"Order placed successfully with ID: {order_id}"
+        return True, f"Order placed successfully with ID: {order_id}", order
+    
+    def _estimate_delivery_minutes(self, address: Optional[str],
+                                   agent_username: Optional[str] = None) -> float:
+        """Delivery time from the distance matrix if it knows the address, else from measured deliveries"""
+        if self.db.delivery_estimator is not None:
+            minutes = self.db.delivery_estimator.delivery_minutes(address)
+            if minutes is not None:
+                return minutes
+        return self.db.stage_timings.delivery_minutes(agent_username)
     
     def _assign_delivery_agent(self, order: Order) -> bool:
-        """Assign a delivery agent to the order"""
-        available_agents = self.db.get_available_delivery_agents()
-        if not available_agents:
-            return False
-        
-        # Assign to the first available agent
-        agent = available_agents[0]
-        order.assign_delivery_agent(agent.username)
-        agent.assign_order(order.order_id)
-        self.db.update_delivery_agent(agent)
-        return True
+        """Assign the available delivery agent nearest the restaurant to the order.
+        
+        Agents with no known position, or whose nearest rivals are all taken
+        meanwhile, are tried afterwards in no particular order.
+        """
+        nearest = self.db.nearest_available_agents(RESTAURANT_LOCATION, NEAREST_CANDIDATES)
+        for agent in nearest:
+            if self._reserve_agent(order, agent):
+                return True
+        
+        # Only scan every agent once all the nearby candidates were taken first
+        tried = {agent.username for agent in nearest}
+        for agent in self.db.get_available_delivery_agents():
+            if agent.username not in tried and self._reserve_agent(order, agent):
+                return True
+        return False
+    
+    def _reserve_agent(self, order: Order, agent: DeliveryAgent) -> bool:
+        """Assign the order to the agent if they are still available once we hold their lock"""
+        with self.db.lock_records(agent_usernames=[agent.username]):
+            if not agent.available:
+                return False
+            order.assign_delivery_agent(agent.username)
+            agent.assign_order(order.order_id)
+            self.db.update_delivery_agent(agent)
+            return True
     
     def get_order(self, order_id: str) -> Optional[Order]:
         """Get order details"""
@@ -151,44 +464,96 @@ class OrderService:
         """Get all orders"""
         return self.db.get_all_orders()
     
-    def update_order_status(self, order_id: str, status: OrderStatus) -> Tuple[bool, str]:
-        """Update order status"""
-        order = self.db.get_order(order_id)
-        if not order:
-            return False, "Order not found"
-        
-        # Check if status transition is valid
-        valid_transitions = {
-            OrderStatus.PLACED: [OrderStatus.PREPARING, OrderStatus.CANCELLED],
-            OrderStatus.PREPARING: [OrderStatus.READY_FOR_PICKUP, OrderStatus.CANCELLED],
-            OrderStatus.READY_FOR_PICKUP: [OrderStatus.OUT_FOR_DELIVERY, OrderStatus.PICKED_UP],
-            OrderStatus.OUT_FOR_DELIVERY: [OrderStatus.DELIVERED]
-        }
-        
-        if order.status not in valid_transitions or status not in valid_transitions.get(order.status, []):
-            return False, f"Invalid status transition from {order.status.value} to {status.value}"
-        
-        order.update_status(status)
-        
-        # Handle delivery agent workflow
-        if status == OrderStatus.DELIVERED or status == OrderStatus.PICKED_UP:
-            if order.assigned_delivery_agent:
-                agent = self.db.get_delivery_agent(order.assigned_delivery_agent)
-                if agent:
-                    agent.complete_order(order_id)
-                    self.db.update_delivery_agent(agent)
-        
-        self.db.update_order(order)
+    def get_orders_snapshot(self) -> StoreSnapshot:
+        """Get a point-in-time view of all orders that later writes do not change"""
+        return self.db.snapshot()
+    
+    def iter_orders(self, cursor: Optional[str] = None) -> Iterator[Order]:
+        """Stream all orders oldest first, resuming after the cursor"""
+        return self.db.iter_orders(cursor)
+    
+    def get_orders_page(self, cursor: Optional[str] = None,
+                        page_size: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Order], Optional[str]]:
+        """Get one page of orders and the cursor for the next page"""
+        return _paginate(self.db.iter_orders(cursor), page_size)
+    
+    def update_order_status(self, order_id: str, status: OrderStatus,
+                            expected_version: Optional[int] = None) -> Tuple[bool, str]:
+        """Update order status.
+        
+        If expected_version is given the update only applies while the order
+        is still at that version, otherwise a version conflict is reported.
+        """
+        with self.db.lock_records(order_ids=[order_id]):
+            order = self.db.get_order(order_id)
+            if not order:
+                return False, "Order not found"
+            
+            conflict = _check_version("Order", order_id, order, expected_version)
+            if conflict:
+                return False, conflict
+            
+            # Check if status transition is valid
+            valid_transitions = {
+                OrderStatus.PLACED: [OrderStatus.PREPARING, OrderStatus.CANCELLED],
+                OrderStatus.PREPARING: [OrderStatus.READY_FOR_PICKUP, OrderStatus.CANCELLED],
+                OrderStatus.READY_FOR_PICKUP: [OrderStatus.OUT_FOR_DELIVERY, OrderStatus.PICKED_UP],
+                OrderStatus.OUT_FOR_DELIVERY: [OrderStatus.DELIVERED]
+            }
+            
+            if order.status not in valid_transitions or status not in valid_transitions.get(order.status, []):
+                return False, f"Invalid status transition from {order.status.value} to {status.value}"
+            if (status == OrderStatus.PREPARING and self.admission is not None
+                    and self.admission.is_queued(order_id)):
+                return False, "Order is queued until the kitchen has capacity"
+            
+            previous_status = order.status
+            # Home deliveries are quoted the measured delivery time once they are ready
+            delivery_minutes = None
+            if status == OrderStatus.READY_FOR_PICKUP:
+                delivery_minutes = self._estimate_delivery_minutes(
+                    order.delivery_address, order.assigned_delivery_agent)
+            order.update_status(status, delivery_minutes, now=self.db.clock.now())
+            self.db.record_stage_timing(order, previous_status)
+            if status == OrderStatus.READY_FOR_PICKUP:
+                ready_minutes = (order.status_times[status] - order.creation_time).total_seconds() / 60
+                self.db.timeseries.record(TIME_TO_READY, ready_minutes, now=order.status_times[status])
+            
+            # An order that is handed over or cancelled frees its agent
+            if status in (OrderStatus.DELIVERED, OrderStatus.PICKED_UP, OrderStatus.CANCELLED):
+                if order.assigned_delivery_agent:
+                    _release_agent(self.db, order)
+            
+            self.db.update_order(order)
+            self.db.change_feed.publish(
+                OrderEventType.STATUS_CHANGED, order_id,
+                previous_status=previous_status.value,
+                status=status.value
+            )
+        
+        # An order leaving the kitchen makes room for the next queued one
+        if (self.admission is not None and previous_status in KITCHEN_STATUSES
+                and status not in KITCHEN_STATUSES):
+            self.admission.release(order_id)
         return True, f"Order status updated to {status.value}"
     
     def cancel_order(self, order_id: str) -> Tuple[bool, str]:
         """Cancel an order"""
         return self.update_order_status(order_id, OrderStatus.CANCELLED)
+    
+    def get_order_events(self, offset: int = 0) -> Iterator[OrderEvent]:
+        """Stream order events with a sequence number after offset"""
+        return self.db.change_feed.read(offset)
+    
+    def subscribe_to_orders(self, callback: Callable[[OrderEvent], None],
+                            offset: Optional[int] = None) -> Subscription:
+        """Receive order events as they happen, replaying from offset if given"""
+        return self.db.change_feed.subscribe(callback, offset)
 
 
 class DeliveryAgentService:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
     
     def register_agent(self, username: str, password: str, phone: str) -> Tuple[bool, str]:
         """Register a new delivery agent"""
@@ -220,8 +585,10 @@ class DeliveryAgentService:
         if not agent:
             return []
         
+        with self.db.lock_records(agent_usernames=[username]):
+            order_ids = list(agent.current_orders)
         orders = []
-        for order_id in agent.current_orders:
+        for order_id in order_ids:
             order = self.db.get_order(order_id)
             if order:
                 orders.append(order)
@@ -234,18 +601,28 @@ class DeliveryAgentService:
         if not agent:
             return False, "Agent not found"
         
-        order = self.db.get_order(order_id)
-        if not order:
-            return False, "Order not found"
-        
-        if order_id not in agent.current_orders:
-            return False, "Order not assigned to this agent"
-        
-        # Update order status
-        order_service = OrderService()
-        result, message = order_service.update_order_status(order_id, OrderStatus.DELIVERED)
+        # Held through the status update, so the assignment cannot change in between
+        with self.db.lock_records(order_ids=[order_id], agent_usernames=[agent_username]):
+            order = self.db.get_order(order_id)
+            if not order:
+                return False, "Order not found"
+            
+            if order_id not in agent.current_orders:
+                return False, "Order not assigned to this agent"
+            
+            # Update order status
+            order_service = OrderService(self.db)
+            result, message = order_service.update_order_status(order_id, OrderStatus.DELIVERED)
         return result, message
     
+    def update_location(self, username: str, east_km: float, north_km: float) -> Tuple[bool, str]:
+        """Record an agent's current position, in kilometres east and north of the restaurant"""
+        if not (math.isfinite(east_km) and math.isfinite(north_km)):
+            return False, "Location must be a pair of numbers"
+        if not self.db.update_agent_location(username, (east_km, north_km)):
+            return False, "Agent not found"
+        return True, "Location updated"
+    
     def get_all_agents(self) -> List[DeliveryAgent]:
         """Get all delivery agents"""
         return self.db.get_all_delivery_agents()
@@ -254,36 +631,71 @@ class DeliveryAgentService:
         """Get all available delivery agents"""
         return self.db.get_available_delivery_agents()
     
-    def assign_agent_to_order(self, order_id: str, agent_username: str) -> Tuple[bool, str]:
-        """Assign a delivery agent to an order"""
-        agent = self.db.get_delivery_agent(agent_username)
-        if not agent:
-            return False, "Agent not found"
-        
-        if not agent.available:
-            return False, "Agent is not available"
-        
-        order = self.db.get_order(order_id)
-        if not order:
-            return False, "Order not found"
-        
-        if order.status != OrderStatus.READY_FOR_PICKUP:
-            return False, "Order is not ready for pickup"
-        
-        if order.delivery_mode != DeliveryMode.HOME_DELIVERY:
-            return False, "Order is not for home delivery"
-        
-        if order.assigned_delivery_agent:
-            return False, "Order already has an assigned agent"
-        
-        # Assign the agent
-        order.assign_delivery_agent(agent_username)
-        agent.assign_order(order_id)
-        
-        # Update order status to out for delivery
-        order.update_status(OrderStatus.OUT_FOR_DELIVERY)
-        
-        # Save changes
-        self.db.save_data()
-        
-        return True, f"Agent {agent_username} assigned to order {order_id}"
\ No newline at end of file
+    def assign_agent_to_order(self, order_id: str, agent_username: str,
+                              expected_order_version: Optional[int] = None,
+                              expected_agent_version: Optional[int] = None) -> Tuple[bool, str]:
+        """Assign a delivery agent to an order.
+        
+        Expected versions, when given, must match the stored order and agent
+        or a version conflict is reported and nothing is written.
+        """
+        with self.db.lock_records(order_ids=[order_id], agent_usernames=[agent_username]):
+            agent = self.db.get_delivery_agent(agent_username)
+            if not agent:
+                return False, "Agent not found"
+            
+            order = self.db.get_order(order_id)
+            if not order:
+                return False, "Order not found"
+            
+            conflict = (_check_version("Order", order_id, order, expected_order_version) or
+                        _check_version("Agent", agent_username, agent, expected_agent_version))
+            if conflict:
+                return False, conflict
+            
+            if not agent.available:
+                return False, "Agent is not available"
+            
+            if order.status != OrderStatus.READY_FOR_PICKUP:
+                return False, "Order is not ready for pickup"
+            
+            if order.delivery_mode != DeliveryMode.HOME_DELIVERY:
+                return False, "Order is not for home delivery"
+            
+            if order.assigned_delivery_agent:
+                return False, "Order already has an assigned agent"
+            
+            # Assign the agent
+            order.assign_delivery_agent(agent_username)
+            agent.assign_order(order_id)
+            
+            # Update order status to out for delivery
+            order.update_status(OrderStatus.OUT_FOR_DELIVERY, now=self.db.clock.now())
+            self.db.record_stage_timing(order, OrderStatus.READY_FOR_PICKUP)
+            
+            # Save changes
+            self.db.update_order(order)
+            self.db.update_delivery_agent(agent)
+            
+            self.db.change_feed.publish(
+                OrderEventType.AGENT_ASSIGNED, order_id,
+                agent_username=agent_username
+            )
+            self.db.change_feed.publish(
+                OrderEventType.STATUS_CHANGED, order_id,
+                previous_status=OrderStatus.READY_FOR_PICKUP.value,
+                status=OrderStatus.OUT_FOR_DELIVERY.value
+            )
+            _record_active_agents(self.db)
+        
+        return True, f"Agent {agent_username} assigned to order {order_id}"
+    
+    def subscribe_to_assignments(self, agent_username: str, callback: Callable[[OrderEvent], None],
+                                 offset: Optional[int] = None) -> Subscription:
+        """Receive new order assignments for an agent, replaying from offset if given"""
+        def on_event(event: OrderEvent):
+            if (event.event_type == OrderEventType.AGENT_ASSIGNED
+                    and event.data.get('agent_username') == agent_username):
+                callback(event)
+        
+        return self.db.change_feed.subscribe(on_event, offset)
\ No newline at end of file
@@ -0,0 +1,267 @@
+# src/sharding.py
+import os
+import hashlib
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from src.models import DeliveryMode, Order, OrderStatus
+from src.events import OrderEventType
+from src.database import Database
+from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+
+T = TypeVar('T')
+
+
+class ConsistentHashRing:
+    """Maps keys to nodes so adding or removing a node only moves ~1/N of the keys"""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100):
+        self.replicas = replicas  # Virtual points per node, smooths the distribution
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def add_node(self, node: str):
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if point not in self._owners:
+                self._owners[point] = node
+        self._points = sorted(self._owners)
+
+    def remove_node(self, node: str):
+        self._owners = {point: owner for point, owner in self._owners.items() if owner != node}
+        self._points = sorted(self._owners)
+
+    def get_node(self, key: str) -> Optional[str]:
+        """Get the node owning a key: the first point clockwise from its hash"""
+        if not self._points:
+            return None
+        index = bisect_right(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+class ShardServices:
+    """The four services bound to one restaurant's store"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.user_service = UserService(db)
+        self.menu_service = MenuService(db)
+        self.order_service = OrderService(db)
+        self.delivery_service = DeliveryAgentService(db)
+
+
+class ShardedStore:
+    """Hosts one store per restaurant in a single process.
+
+    Each restaurant persists to its own directory under base_dir. Delivery
+    agents form one fleet spread over the restaurants' stores by consistent
+    hashing of their username. When a restaurant is added or removed, only
+    the agents whose owner changed are moved to their new store. A home
+    delivery that its own restaurant cannot staff is offered to agents held
+    by the other restaurants, and whichever store's services finish or
+    cancel it then free the agent in the store that holds them. Orders live
+    with the restaurant they were placed at, and a locator remembers where
+    each order went.
+    """
+
+    def __init__(self, base_dir: str, restaurant_ids: Iterable[str] = (),
+                 replicas: int = 100, max_workers: Optional[int] = None, clock=None):
+        self.base_dir = base_dir
+        self.clock = clock
+        self.ring = ConsistentHashRing(replicas=replicas)
+        self.max_workers = max_workers
+        self._shards: Dict[str, ShardServices] = {}
+        self._order_locations: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(self.base_dir, exist_ok=True)
+        for restaurant_id in restaurant_ids:
+            self.add_restaurant(restaurant_id)
+
+    @property
+    def restaurant_ids(self) -> List[str]:
+        return list(self._shards)
+
+    def add_restaurant(self, restaurant_id: str) -> ShardServices:
+        """Open (or create) a restaurant's store and add it to the ring"""
+        with self._lock:
+            if restaurant_id in self._shards:
+                return self._shards[restaurant_id]
+
+            shard = ShardServices(Database(os.path.join(self.base_dir, restaurant_id), clock=self.clock))
+            shard.db.agent_directory = self._agent_store
+            self._shards[restaurant_id] = shard
+            self.ring.add_node(restaurant_id)
+            for order_id in list(shard.db.orders):
+                self._order_locations[order_id] = restaurant_id
+            self._rebalance_agents(self._shards.items())
+            return shard
+
+    def remove_restaurant(self, restaurant_id: str) -> bool:
+        """Take a restaurant out of the ring; its files stay on disk"""
+        with self._lock:
+            shard = self._shards.pop(restaurant_id, None)
+            if not shard:
+                return False
+            self.ring.remove_node(restaurant_id)
+            for order_id in list(shard.db.orders):
+                self._order_locations.pop(order_id, None)
+            # Its agents stay in the fleet, handed to whichever restaurants now own them
+            self._rebalance_agents([(restaurant_id, shard)])
+            return True
+
+    def _rebalance_agents(self, sources: Iterable[Tuple[str, ShardServices]]):
+        """Move agents held by the given stores to the store the ring now routes them to"""
+        for restaurant_id, shard in list(sources):
+            for agent in shard.db.get_all_delivery_agents():
+                owner = self.ring.get_node(agent.username)
+                if owner is None or owner == restaurant_id:
+                    continue
+                target = self._shards[owner]
+                with shard.db.lock_records(agent_usernames=[agent.username]):
+                    if target.db.add_delivery_agent(agent):
+                        shard.db.delete_delivery_agent(agent.username)
+                    else:
+                        print(f"Warning: Agent {agent.username} already exists at {owner}")
+
+    def shard(self, restaurant_id: str) -> Optional[ShardServices]:
+        """Get the services of a restaurant's store"""
+        return self._shards.get(restaurant_id)
+
+    def route(self, key: str) -> Optional[str]:
+        """Get the restaurant whose store owns a routing key"""
+        return self.ring.get_node(key)
+
+    # Orders
+
+    def create_order(self, restaurant_id: str, username: str, item_quantities: List[Tuple[str, int]],
+                     delivery_mode: DeliveryMode, delivery_address: Optional[str] = None,
+                     idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
+        """Place an order at a restaurant"""
+        shard = self.shard(restaurant_id)
+        if not shard:
+            return False, f"Restaurant {restaurant_id} not found"
+
+        success, message, order = shard.order_service.place_order(
+            username, item_quantities, delivery_mode, delivery_address, idempotency_key)
+        # A retried request placed nothing new, and its order was handled the first time
+        if order is not None:
+            self._order_locations[order.order_id] = restaurant_id
+            if delivery_mode == DeliveryMode.HOME_DELIVERY and not order.assigned_delivery_agent:
+                self._assign_from_fleet(shard, order)
+        return success, message
+
+    def _assign_from_fleet(self, order_shard: ShardServices, order: Order) -> bool:
+        """Give an unstaffed home delivery to an available agent held by another restaurant"""
+        for agent_shard in list(self._shards.values()):
+            if agent_shard is order_shard:
+                continue
+            for agent in agent_shard.db.get_available_delivery_agents():
+                # Orders before agents, as within a single store
+                with order_shard.db.lock_records(order_ids=[order.order_id]), \
+                        agent_shard.db.lock_records(agent_usernames=[agent.username]):
+                    if not agent.available or order.assigned_delivery_agent:
+                        continue
+                    order.assign_delivery_agent(agent.username)
+                    agent.assign_order(order.order_id)
+                    agent_shard.db.update_delivery_agent(agent)
+                    order_shard.db.update_order(order)
+                order_shard.db.change_feed.publish(
+                    OrderEventType.AGENT_ASSIGNED, order.order_id, agent_username=agent.username)
+                return True
+        return False
+
+    def find_order(self, order_id: str) -> Optional[Order]:
+        """Get an order from whichever restaurant holds it"""
+        restaurant_id = self._order_locations.get(order_id)
+        if restaurant_id and restaurant_id in self._shards:
+            return self._shards[restaurant_id].order_service.get_order(order_id)
+        return None
+
+    # Delivery agents
+
+    def shard_for_agent(self, username: str) -> Optional[ShardServices]:
+        """Get the store an agent is placed on"""
+        restaurant_id = self.route(username)
+        return self._shards.get(restaurant_id) if restaurant_id else None
+
+    def _agent_store(self, username: str) -> Optional[Database]:
+        shard = self.shard_for_agent(username)
+        return shard.db if shard else None
+
+    def register_agent(self, username: str, password: str, phone: str) -> Tuple[bool, str]:
+        """Register an agent in the shared fleet"""
+        shard = self.shard_for_agent(username)
+        if not shard:
+            return False, "No restaurants available"
+        return shard.delivery_service.register_agent(username, password, phone)
+
+    def login_agent(self, username: str, password: str) -> Tuple[bool, str]:
+        shard = self.shard_for_agent(username)
+        if not shard:
+            return False, "Invalid username or password"
+        return shard.delivery_service.login_agent(username, password)
+
+    def complete_order(self, agent_username: str, order_id: str) -> Tuple[bool, str]:
+        """Mark an order as delivered by an agent, wherever each of them is held"""
+        agent_shard = self.shard_for_agent(agent_username)
+        order_shard = self.shard(self._order_locations.get(order_id, ''))
+        if not agent_shard or not agent_shard.db.get_delivery_agent(agent_username):
+            return False, "Agent not found"
+        if not order_shard:
+            return False, "Order not found"
+        if order_shard is agent_shard:
+            return agent_shard.delivery_service.complete_order(agent_username, order_id)
+
+        agent = agent_shard.db.get_delivery_agent(agent_username)
+        if order_id not in agent.current_orders:
+            return False, "Order not assigned to this agent"
+        # The order's store frees the agent through the store holding them
+        return order_shard.order_service.update_order_status(order_id, OrderStatus.DELIVERED)
+
+    # Cross-shard admin queries
+
+    def map_shards(self, fn: Callable[[ShardServices], T]) -> Dict[str, T]:
+        """Run a query against every restaurant in parallel, keyed by restaurant ID"""
+        shards = list(self._shards.items())
+        if not shards:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.max_workers or len(shards)) as pool:
+            futures = {restaurant_id: pool.submit(fn, shard) for restaurant_id, shard in shards}
+            return {restaurant_id: future.result() for restaurant_id, future in futures.items()}
+
+    def revenue_by_restaurant(self) -> Dict[str, float]:
+        """Revenue of non-cancelled orders per restaurant"""
+        return self.map_shards(lambda shard: sum(
+            order.total_price for order in shard.db.iter_orders()
+            if order.status != OrderStatus.CANCELLED))
+
+    def total_revenue(self) -> float:
+        """Revenue of non-cancelled orders across all restaurants"""
+        return sum(self.revenue_by_restaurant().values())
+
+    def order_counts_by_status(self) -> Dict[str, int]:
+        """Order counts per status across all restaurants"""
+        def count(shard: ShardServices) -> Dict[str, int]:
+            counts: Dict[str, int] = {}
+            for order in shard.db.iter_orders():
+                counts[order.status.value] = counts.get(order.status.value, 0) + 1
+            return counts
+
+        totals: Dict[str, int] = {}
+        for counts in self.map_shards(count).values():
+            for status, number in counts.items():
+                totals[status] = totals.get(status, 0) + number
+        return totals
+
+    def save_all(self) -> bool:
+        """Persist every restaurant's store"""
+        return all(self.map_shards(lambda shard: shard.db.save_data()).values())
@@ -0,0 +1,278 @@
+# src/simulation.py
+import time
+import heapq
+import random
+import argparse
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from src.models import DeliveryMode, OrderStatus
+from src.clock import VirtualClock
+from src.database import Database
+from src.storage import MemoryStorage
+from src.writer import DurabilityMode
+from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+
+# (name, price, preparation minutes) of the menu used when none is given
+DEFAULT_MENU = [
+    ("Margherita Pizza", 9.99, 15),
+    ("Veggie Burger", 8.50, 12),
+    ("Chicken Wings", 7.99, 20),
+    ("French Fries", 3.99, 8),
+    ("Caesar Salad", 6.99, 10),
+]
+
+
+class TraceOrder(NamedTuple):
+    """One order arrival in a trace, `minute` minutes after opening"""
+    minute: float
+    username: str
+    item_quantities: List[Tuple[int, int]]  # (menu position, quantity)
+    delivery_mode: DeliveryMode
+
+
+def generate_trace(menu_size: int, hours: float = 12, orders_per_hour: float = 30,
+                   home_delivery_share: float = 0.6, customers: int = 50, seed: int = 0) -> List[TraceOrder]:
+    """Random arrivals at a steady rate, each with one to three menu items"""
+    rng = random.Random(seed)
+    trace = []
+    minute = rng.expovariate(orders_per_hour / 60)
+    while minute < hours * 60:
+        positions = rng.sample(range(menu_size), rng.randint(1, min(3, menu_size)))
+        mode = DeliveryMode.HOME_DELIVERY if rng.random() < home_delivery_share else DeliveryMode.TAKEAWAY
+        trace.append(TraceOrder(minute, f"sim-customer-{rng.randrange(customers)}",
+                                [(position, rng.randint(1, 2)) for position in positions], mode))
+        minute += rng.expovariate(orders_per_hour / 60)
+    return trace
+
+
+class SimulationReport:
+    """Capacity figures from one simulated run"""
+
+    def __init__(self):
+        self.orders_placed = 0
+        self.orders_rejected = 0
+        self.orders_completed = 0
+        self.simulated_minutes = 0.0
+        self.wall_seconds = 0.0
+        self.kitchen_queue_avg = 0.0
+        self.kitchen_queue_max = 0
+        self.dispatch_queue_avg = 0.0
+        self.dispatch_queue_max = 0
+        self.agent_utilization = 0.0
+        self.completion_minutes: List[float] = []
+
+    @property
+    def throughput_per_hour(self) -> float:
+        hours = self.simulated_minutes / 60
+        return self.orders_completed / hours if hours > 0 else 0.0
+
+    def completion_quantile(self, q: float) -> float:
+        if not self.completion_minutes:
+            return 0.0
+        ordered = sorted(self.completion_minutes)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def report(self) -> str:
+        lines = [
+            "Simulation Report",
+            "-" * 50,
+            f"Simulated time: {self.simulated_minutes / 60:.1f} hours in {self.wall_seconds:.2f} s",
+            f"Orders placed: {self.orders_placed} ({self.orders_rejected} rejected)",
+            f"Orders completed: {self.orders_completed} ({self.throughput_per_hour:.1f}/hour)",
+            f"Kitchen queue: avg {self.kitchen_queue_avg:.1f}, max {self.kitchen_queue_max}",
+            f"Dispatch queue: avg {self.dispatch_queue_avg:.1f}, max {self.dispatch_queue_max}",
+            f"Agent utilization: {self.agent_utilization * 100:.1f}%",
+            f"Order to completion: median {self.completion_quantile(0.5):.1f} mins, "
+            f"90% within {self.completion_quantile(0.9):.1f} mins"
+        ]
+        return "\n".join(lines)
+
+
+class RestaurantSimulation:
+    """Replays an order trace through the real services in virtual time.
+
+    Orders wait for one of the kitchen stations, cook for the longest
+    preparation time of their items, and then either wait to be collected
+    or for an agent to drive them out and come back. Nothing sleeps: the
+    clock jumps from one event to the next.
+    """
+
+    def __init__(self, menu: Optional[List[Tuple[str, float, int]]] = None, agents: int = 10,
+                 kitchen_stations: int = 8, trip_minutes: Tuple[float, float] = (10, 25),
+                 pickup_minutes: float = 5, start: datetime = datetime(2024, 1, 1, 9, 0), seed: int = 0):
+        self.start = start
+        self.kitchen_stations = kitchen_stations
+        self.trip_minutes = trip_minutes
+        self.pickup_minutes = pickup_minutes
+        self.rng = random.Random(seed)
+        self.clock = VirtualClock(start)
+
+        # Writes are coalesced, the store is only flushed when the run ends
+        self.db = Database(storage=MemoryStorage(), durability=DurabilityMode.INTERVAL,
+                           write_interval=3600, clock=self.clock)
+        self.user_service = UserService(self.db)
+        self.menu_service = MenuService(self.db)
+        self.order_service = OrderService(self.db)
+        self.delivery_service = DeliveryAgentService(self.db)
+
+        self.menu_ids = []
+        for name, price, preparation_time in menu or DEFAULT_MENU:
+            _, message = self.menu_service.add_item(name, price, preparation_time)
+            self.menu_ids.append(message.split(": ")[1])
+        self.agent_names = [f"sim-agent-{index}" for index in range(agents)]
+        for username in self.agent_names:
+            self.delivery_service.register_agent(username, "sim", "000-0000")
+
+    def run(self, trace: List[TraceOrder]) -> SimulationReport:
+        """Process every arrival in the trace and all the work it causes"""
+        started = time.perf_counter()
+        self._report = SimulationReport()
+        self._events: List = []
+        self._sequence = count()
+        self._minute = 0.0
+        self._kitchen_queue: deque = deque()
+        self._dispatch_queue: deque = deque()
+        self._busy_stations = 0
+        self._on_trip: Dict[str, float] = {}  # Agent -> minute they left
+        self._agent_busy_minutes = 0.0
+        self._arrivals: Dict[str, float] = {}
+        kitchen_area = dispatch_area = 0.0
+
+        for arrival in trace:
+            self._schedule(arrival.minute, self._arrive, arrival)
+
+        while self._events:
+            minute, _, handler, payload = heapq.heappop(self._events)
+            # Queue lengths weighted by how long they lasted
+            elapsed = minute - self._minute
+            kitchen_area += len(self._kitchen_queue) * elapsed
+            dispatch_area += len(self._dispatch_queue) * elapsed
+            self._minute = minute
+            self.clock.advance_to(self.start + timedelta(minutes=minute))
+            handler(payload)
+
+        report = self._report
+        report.simulated_minutes = self._minute
+        if self._minute > 0:
+            report.kitchen_queue_avg = kitchen_area / self._minute
+            report.dispatch_queue_avg = dispatch_area / self._minute
+            if self.agent_names:
+                report.agent_utilization = self._agent_busy_minutes / (len(self.agent_names) * self._minute)
+        self.db.close()
+        report.wall_seconds = time.perf_counter() - started
+        return report
+
+    def _schedule(self, minute: float, handler, payload):
+        heapq.heappush(self._events, (minute, next(self._sequence), handler, payload))
+
+    def _track_queues(self):
+        self._report.kitchen_queue_max = max(self._report.kitchen_queue_max, len(self._kitchen_queue))
+        self._report.dispatch_queue_max = max(self._report.dispatch_queue_max, len(self._dispatch_queue))
+
+    # Event handlers
+
+    def _arrive(self, arrival: TraceOrder):
+        if not self.db.get_user(arrival.username):
+            self.user_service.register_user(arrival.username, "sim", "1 Simulation Way", "000-0000")
+        items = [(self.menu_ids[position], quantity) for position, quantity in arrival.item_quantities]
+        success, message = self.order_service.create_order(arrival.username, items, arrival.delivery_mode)
+        if not success:
+            self._report.orders_rejected += 1
+            return
+
+        order_id = message.split(": ")[1]
+        self._report.orders_placed += 1
+        self._arrivals[order_id] = self._minute
+        self._kitchen_queue.append(order_id)
+        self._track_queues()
+        self._start_cooking()
+
+    def _start_cooking(self):
+        while self._kitchen_queue and self._busy_stations < self.kitchen_stations:
+            order_id = self._kitchen_queue.popleft()
+            self.order_service.update_order_status(order_id, OrderStatus.PREPARING)
+            order = self.db.get_order(order_id)
+            self._busy_stations += 1
+            self._schedule(self._minute + max(item.preparation_time for item in order.items),
+                           self._finish_cooking, order_id)
+
+    def _finish_cooking(self, order_id: str):
+        self._busy_stations -= 1
+        self.order_service.update_order_status(order_id, OrderStatus.READY_FOR_PICKUP)
+        if self.db.get_order(order_id).delivery_mode == DeliveryMode.TAKEAWAY:
+            self._schedule(self._minute + self.pickup_minutes, self._collect, order_id)
+        else:
+            self._dispatch_queue.append(order_id)
+            self._track_queues()
+            self._dispatch()
+        self._start_cooking()
+
+    def _dispatch(self):
+        """Send out every waiting delivery whose agent is free"""
+        waiting = deque()
+        while self._dispatch_queue:
+            order_id = self._dispatch_queue.popleft()
+            order = self.db.get_order(order_id)
+            agent = order.assigned_delivery_agent
+            if agent is None:
+                agent = self._free_agent()
+                if agent is None or not self.delivery_service.assign_agent_to_order(order_id, agent)[0]:
+                    waiting.append(order_id)
+                    continue
+            elif agent in self._on_trip:
+                waiting.append(order_id)
+                continue
+            else:
+                self.order_service.update_order_status(order_id, OrderStatus.OUT_FOR_DELIVERY)
+
+            trip = self.rng.uniform(*self.trip_minutes)
+            self._on_trip[agent] = self._minute
+            self._schedule(self._minute + trip, self._deliver, (order_id, agent, trip))
+        self._dispatch_queue = waiting
+
+    def _free_agent(self) -> Optional[str]:
+        for username in self.agent_names:
+            agent = self.db.get_delivery_agent(username)
+            if username not in self._on_trip and agent.available:
+                return username
+        return None
+
+    def _deliver(self, payload: Tuple[str, str, float]):
+        order_id, agent, trip = payload
+        self.delivery_service.complete_order(agent, order_id)
+        self._complete(order_id)
+        # The agent drives back before taking the next delivery
+        self._schedule(self._minute + trip, self._return, agent)
+
+    def _return(self, agent: str):
+        self._agent_busy_minutes += self._minute - self._on_trip.pop(agent)
+        self._dispatch()
+
+    def _collect(self, order_id: str):
+        self.order_service.update_order_status(order_id, OrderStatus.PICKED_UP)
+        self._complete(order_id)
+
+    def _complete(self, order_id: str):
+        self._report.orders_completed += 1
+        self._report.completion_minutes.append(self._minute - self._arrivals[order_id])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a restaurant day in virtual time")
+    parser.add_argument('--hours', type=float, default=12)
+    parser.add_argument('--orders-per-hour', type=float, default=30)
+    parser.add_argument('--agents', type=int, default=10)
+    parser.add_argument('--stations', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    simulation = RestaurantSimulation(agents=args.agents, kitchen_stations=args.stations, seed=args.seed)
+    trace = generate_trace(len(simulation.menu_ids), args.hours, args.orders_per_hour, seed=args.seed)
+    print(simulation.run(trace).report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# src/snapshot.py
+import datetime
+import threading
+import weakref
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.models import Order, DeliveryMode, OrderStatus
+
+# Statuses after which an order needs no more work
+_FINAL_STATUSES = (OrderStatus.DELIVERED, OrderStatus.PICKED_UP, OrderStatus.CANCELLED)
+
+
+class OrderItemSnapshot(NamedTuple):
+    item_id: str
+    name: str
+    unit_price: float
+    quantity: int
+
+    @property
+    def total_price(self) -> float:
+        return self.unit_price * self.quantity
+
+
+class OrderSnapshot(NamedTuple):
+    """Immutable copy of an order as it was written"""
+    order_id: str
+    customer_username: str
+    items: Tuple[OrderItemSnapshot, ...]
+    delivery_mode: DeliveryMode
+    delivery_address: Optional[str]
+    status: OrderStatus
+    creation_time: datetime.datetime
+    estimated_completion_time: datetime.datetime
+    assigned_delivery_agent: Optional[str]
+    total_price: float
+    version: int
+
+    @classmethod
+    def of(cls, order: Order) -> 'OrderSnapshot':
+        items = tuple(OrderItemSnapshot(item.menu_item.item_id, item.menu_item.name,
+                                        item.menu_item.price, item.quantity) for item in order.items)
+        return cls(order.order_id, order.customer_username, items, order.delivery_mode,
+                   order.delivery_address, order.status, order.creation_time,
+                   order.estimated_completion_time, order.assigned_delivery_agent,
+                   sum(item.total_price for item in items), order.version)
+
+    @property
+    def is_active(self) -> bool:
+        return self.status not in _FINAL_STATUSES
+
+    def get_time_remaining(self, now: Optional[datetime.datetime] = None) -> int:
+        """Returns the estimated time remaining in minutes."""
+        if not self.is_active:
+            return 0
+        time_remaining = (self.estimated_completion_time - (now or datetime.datetime.now())).total_seconds() / 60
+        return max(0, int(time_remaining))
+
+
+class StoreSnapshot:
+    """Point-in-time, read-only view of a store's orders.
+
+    Later writes to the store are never visible through a snapshot, and
+    taking or reading one never blocks writers.
+    """
+
+    def __init__(self, generation: int, orders: Mapping[str, OrderSnapshot]):
+        self.generation = generation  # The store's orders_generation when it was taken
+        self.orders = orders
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def get_order(self, order_id: str) -> Optional[OrderSnapshot]:
+        return self.orders.get(order_id)
+
+    def iter_orders(self) -> Iterator[OrderSnapshot]:
+        """Yield orders oldest first"""
+        return iter(sorted(self.orders.values(), key=lambda order: (order.creation_time, order.order_id)))
+
+
+class _OrdersAt(Mapping):
+    """Read-only mapping of the order snapshots a table held at one epoch"""
+
+    def __init__(self, table: 'SnapshotTable', epoch: int, count: int):
+        self._table = table
+        self._epoch = epoch
+        self._count = count  # Orders are only ever added, so the first count of them existed then
+
+    def __getitem__(self, order_id: str) -> OrderSnapshot:
+        # Copied in one step, as writers may be appending to or trimming the list
+        for epoch, order in reversed(tuple(self._table._versions.get(order_id, ()))):
+            if epoch <= self._epoch:
+                return order
+        raise KeyError(order_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table._order_ids[:self._count])
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class SnapshotTable:
+    """Versioned table of order snapshots kept in step with a store.
+
+    Each write adds a version of one order, tagged with the current epoch,
+    and a snapshot taken at an epoch sees each order's newest version from
+    then or earlier. The epoch moves on with the first write after a
+    snapshot is handed out. Versions no live snapshot can see are dropped
+    when their order is next written, so a write costs one tuple and O(1)
+    amortized work however many orders there are or snapshots are held.
+    """
+
+    def __init__(self, orders: Mapping[str, Order]):
+        self._versions: Dict[str, List[Tuple[int, OrderSnapshot]]] = {
+            order_id: [(0, OrderSnapshot.of(order))] for order_id, order in list(orders.items())}
+        self._order_ids: List[str] = list(self._versions)
+        self._epoch = 0
+        self._view: Optional[_OrdersAt] = None  # Handed out at the current epoch, if any
+        # Snapshots still referenced, per epoch; released from garbage collection, so under a lock of its own
+        self._live: Dict[int, int] = {}
+        self._live_lock = threading.RLock()
+        self._oldest_live = 0
+
+    def __len__(self) -> int:
+        return len(self._order_ids)
+
+    def put(self, order: Order):
+        """Record the written state of an order; called with the store's snapshot lock held"""
+        if self._view is not None:
+            self._epoch += 1
+            self._view = None
+        version = (self._epoch, OrderSnapshot.of(order))
+        versions = self._versions.get(order.order_id)
+        if versions is None:
+            self._versions[order.order_id] = [version]
+            self._order_ids.append(order.order_id)
+            return
+        if versions[-1][0] == self._epoch:
+            versions[-1] = version
+            return
+        versions.append(version)
+        # Keep the newest version the oldest live snapshot sees, and everything after it
+        oldest = self._oldest_live
+        drop = 0
+        while drop + 1 < len(versions) and versions[drop + 1][0] <= oldest:
+            drop += 1
+        if drop:
+            del versions[:drop]
+
+    def snapshot(self, generation: int) -> StoreSnapshot:
+        """Hand out the current table; called with the store's snapshot lock held"""
+        if self._view is None:
+            self._view = _OrdersAt(self, self._epoch, len(self._order_ids))
+            with self._live_lock:
+                self._live[self._epoch] = self._live.get(self._epoch, 0) + 1
+                self._oldest_live = min(self._live)
+            weakref.finalize(self._view, self._release, self._epoch)
+        return StoreSnapshot(generation, self._view)
+
+    def _release(self, epoch: int):
+        with self._live_lock:
+            self._live[epoch] -= 1
+            if not self._live[epoch]:
+                del self._live[epoch]
+            # With no snapshot held, only the newest versions are needed
+            self._oldest_live = min(self._live) if self._live else self._epoch
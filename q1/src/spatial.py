@@ -0,0 +1,117 @@
+# src/spatial.py
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Positions are kilometres east and north of the restaurant, which sits at the origin
+Location = Tuple[float, float]
+RESTAURANT_LOCATION: Location = (0.0, 0.0)
+
+# Side of a grid cell in kilometres; about the distance an agent covers in a couple of minutes
+CELL_KM = 1.0
+
+
+def distance_km(a: Location, b: Location) -> float:
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+class AgentGrid:
+    """Uniform grid of agent positions for nearest-agent queries.
+
+    Each agent sits in the cell holding its last-known position, so a
+    position update is a dictionary write, plus moving between two cell
+    sets when the agent crosses a cell edge. Nearest queries search rings
+    of cells outwards from the query point and stop as soon as no farther
+    ring can hold a closer agent.
+    """
+
+    def __init__(self, cell_km: float = CELL_KM):
+        self.cell_km = cell_km
+        self._positions: Dict[str, Location] = {}
+        self._cell_of: Dict[str, Tuple[int, int]] = {}
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._lock = threading.Lock()
+        # Work done by the last nearest() call: cells looked up and agents measured
+        self.last_cells = 0
+        self.last_examined = 0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _cell(self, location: Location) -> Tuple[int, int]:
+        return math.floor(location[0] / self.cell_km), math.floor(location[1] / self.cell_km)
+
+    def update(self, username: str, location: Location):
+        """Move an agent to a new position"""
+        cell = self._cell(location)
+        with self._lock:
+            self._positions[username] = location
+            previous = self._cell_of.get(username)
+            if previous == cell:
+                return
+            if previous is not None:
+                self._discard(username, previous)
+            self._cell_of[username] = cell
+            self._cells.setdefault(cell, set()).add(username)
+
+    def remove(self, username: str):
+        with self._lock:
+            self._positions.pop(username, None)
+            cell = self._cell_of.pop(username, None)
+            if cell is not None:
+                self._discard(username, cell)
+
+    def _discard(self, username: str, cell: Tuple[int, int]):
+        members = self._cells[cell]
+        members.discard(username)
+        if not members:
+            del self._cells[cell]
+
+    def position(self, username: str) -> Optional[Location]:
+        return self._positions.get(username)
+
+    def nearest(self, location: Location, limit: int = 1,
+                accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[float, str]]:
+        """Up to limit accepted agents closest to location, as (distance, username), nearest first"""
+        cx, cy = self._cell(location)
+        found: List[Tuple[float, str]] = []
+        with self._lock:
+            self.last_cells = self.last_examined = 0
+            if not self._cells:
+                return found
+
+            def consider(usernames: Iterable[str]):
+                self.last_cells += 1
+                for username in usernames:
+                    self.last_examined += 1
+                    if accept is None or accept(username):
+                        found.append((distance_km(location, self._positions[username]), username))
+
+            ring = 0
+            while True:
+                if 8 * ring > len(self._cells):
+                    # Rings now hold more empty cells than there are occupied ones: visit those directly
+                    for (x, y), members in self._cells.items():
+                        if max(abs(x - cx), abs(y - cy)) >= ring:
+                            consider(members)
+                    break
+                for cell in self._ring(cx, cy, ring):
+                    consider(self._cells.get(cell, ()))
+                # Anything beyond this ring is at least ring cells away
+                found.sort()
+                if len(found) >= limit and found[limit - 1][0] <= ring * self.cell_km:
+                    break
+                ring += 1
+        found.sort()
+        return found[:limit]
+
+    @staticmethod
+    def _ring(cx: int, cy: int, ring: int) -> Iterable[Tuple[int, int]]:
+        """Cells exactly ring cells away from (cx, cy)"""
+        if ring == 0:
+            return [(cx, cy)]
+        cells = [(x, cy - ring) for x in range(cx - ring, cx + ring + 1)]
+        cells += [(x, cy + ring) for x in range(cx - ring, cx + ring + 1)]
+        cells += [(cx - ring, y) for y in range(cy - ring + 1, cy + ring)]
+        cells += [(cx + ring, y) for y in range(cy - ring + 1, cy + ring)]
+        return cells
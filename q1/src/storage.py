@@ -0,0 +1,106 @@
+# src/storage.py
+import os
+import json
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.events import ChangeFeed
+from src.json_stream import LoadStats, iter_object_items
+
+# Collections persisted by the store, each a mapping of key -> record
+COLLECTIONS = ('users', 'menu_items', 'orders', 'delivery_agents', 'idempotency_keys', 'stage_timings')
+
+
+def _copy(value):
+    """Copy a JSON-style record so callers never share its lists or dicts"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+class JsonFileStorage:
+    """Stores each collection as a pretty-printed JSON file in a data directory"""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    def path(self, collection: str) -> str:
+        return os.path.join(self.data_dir, f"{collection}.json")
+
+    def exists(self, collection: str) -> bool:
+        return os.path.exists(self.path(collection))
+
+    def iter_records(self, collection: str, stats: Optional[LoadStats] = None) -> Iterator[Tuple[str, dict]]:
+        """Yield (key, record) pairs, parsing the file one record at a time"""
+        if not self.exists(collection):
+            return
+        with open(self.path(collection), 'r') as f:
+            yield from iter_object_items(f, stats=stats)
+
+    def write_collection(self, collection: str, records: Dict[str, dict]):
+        with open(self.path(collection), 'w') as f:
+            json.dump(records, f, indent=4)
+
+    def change_feed(self) -> ChangeFeed:
+        """Order event log kept next to the data files"""
+        return ChangeFeed.for_file(os.path.join(self.data_dir, 'order_events.jsonl'))
+
+
+class MemoryStorage:
+    """Keeps collections in process memory, for tests and simulations.
+
+    Every store built on the same instance sees the same data, and separate
+    instances are fully isolated, so several service stacks can run side by
+    side in one process. With a snapshot directory, existing JSON files are
+    loaded on creation and snapshot() writes the current state back.
+    """
+
+    data_dir = None
+
+    def __init__(self, snapshot_dir: Optional[str] = None):
+        self.snapshot_dir = snapshot_dir
+        self._collections: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+        self._feed = ChangeFeed(None)
+
+        if snapshot_dir and os.path.isdir(snapshot_dir):
+            source = JsonFileStorage(snapshot_dir)
+            for collection in COLLECTIONS:
+                if source.exists(collection):
+                    self._collections[collection] = dict(source.iter_records(collection))
+
+    def exists(self, collection: str) -> bool:
+        return collection in self._collections
+
+    def iter_records(self, collection: str, stats: Optional[LoadStats] = None) -> Iterator[Tuple[str, dict]]:
+        with self._lock:
+            records = list(self._collections.get(collection, {}).items())
+        for key, record in records:
+            if stats is not None:
+                stats.records += 1
+            yield key, _copy(record)
+
+    def write_collection(self, collection: str, records: Dict[str, dict]):
+        copied = {key: _copy(record) for key, record in records.items()}
+        with self._lock:
+            self._collections[collection] = copied
+
+    def change_feed(self) -> ChangeFeed:
+        """Order event log held in memory alongside the collections"""
+        return self._feed
+
+    def snapshot(self, snapshot_dir: Optional[str] = None) -> bool:
+        """Write every collection to JSON files readable by JsonFileStorage"""
+        target_dir = snapshot_dir or self.snapshot_dir
+        if not target_dir:
+            return False
+
+        target = JsonFileStorage(target_dir)
+        with self._lock:
+            collections = {name: dict(records) for name, records in self._collections.items()}
+        for collection, records in collections.items():
+            target.write_collection(collection, records)
+        return True
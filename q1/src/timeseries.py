@@ -0,0 +1,152 @@
+# src/timeseries.py
+import os
+import struct
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+TIMESERIES_FILE = 'timeseries.bin'
+
+# Series recorded by the order service, and how their slots are read back:
+# 'rate' series count events, 'mean' series average the recorded values
+ORDERS_PLACED = 'orders_placed'
+TIME_TO_READY = 'time_to_ready'
+ACTIVE_AGENTS = 'active_agents'
+SERIES = {ORDERS_PLACED: 'rate', TIME_TO_READY: 'mean', ACTIVE_AGENTS: 'mean'}
+
+# An hour of minutes and a day of hours
+MINUTE_SLOTS = 60
+HOUR_SLOTS = 24
+
+# Magic, format version, minute and hour slot counts, then each series' rings in SERIES order
+_HEADER = struct.Struct('<4sHII')
+_MAGIC = b'QTSR'
+
+_SPARKS = "▁▂▃▄▅▆▇█"
+_EPOCH = datetime(1970, 1, 1)
+
+
+class RingBuffer:
+    """Event count and value total per fixed-width time slot, over the last `slots` slots.
+
+    Each position remembers the slot it holds, so positions left over from
+    an earlier pass round the ring read as empty instead of being cleared.
+    """
+
+    def __init__(self, slots: int, slot_seconds: int):
+        self.slots = slots
+        self.slot_seconds = slot_seconds
+        self.stamps = array('q', [-1]) * slots
+        self.counts = array('d', [0.0]) * slots
+        self.totals = array('d', [0.0]) * slots
+
+    def slot_of(self, moment: datetime) -> int:
+        return int((moment - _EPOCH).total_seconds() // self.slot_seconds)
+
+    def add(self, slot: int, value: float):
+        position = slot % self.slots
+        if self.stamps[position] != slot:
+            self.stamps[position] = slot
+            self.counts[position] = 0.0
+            self.totals[position] = 0.0
+        self.counts[position] += 1
+        self.totals[position] += value
+
+    def window(self, last_slot: int) -> List[Tuple[float, float]]:
+        """(count, total) for each slot of the window ending at last_slot, oldest first"""
+        window = []
+        for slot in range(last_slot - self.slots + 1, last_slot + 1):
+            position = slot % self.slots
+            if self.stamps[position] == slot:
+                window.append((self.counts[position], self.totals[position]))
+            else:
+                window.append((0.0, 0.0))
+        return window
+
+    def arrays(self) -> Tuple[array, array, array]:
+        return self.stamps, self.counts, self.totals
+
+
+class TimeSeriesRecorder:
+    """Fixed-memory operational time series.
+
+    Every sample lands in a per-minute ring covering the last hour and is
+    rolled up into a per-hour ring covering the last day, so memory stays
+    the same however long the restaurant runs.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.minutes: Dict[str, RingBuffer] = {name: RingBuffer(MINUTE_SLOTS, 60) for name in SERIES}
+        self.hours: Dict[str, RingBuffer] = {name: RingBuffer(HOUR_SLOTS, 3600) for name in SERIES}
+
+    def record(self, name: str, value: float = 1.0, now: Optional[datetime] = None):
+        """Add a sample: 1 per event for rate series, the measured value for mean series"""
+        now = now or self.clock.now()
+        minutes, hours = self.minutes[name], self.hours[name]
+        with self._lock:
+            minutes.add(minutes.slot_of(now), value)
+            hours.add(hours.slot_of(now), value)
+
+    def values(self, name: str, hourly: bool = False, now: Optional[datetime] = None) -> List[Optional[float]]:
+        """Per-slot values, oldest first: events per minute for rates, averages (None if empty) for means"""
+        rings = self.hours if hourly else self.minutes
+        ring = rings[name]
+        with self._lock:
+            window = ring.window(ring.slot_of(now or self.clock.now()))
+        if SERIES[name] == 'rate':
+            return [count * 60 / ring.slot_seconds for count, _ in window]
+        return [total / count if count else None for count, total in window]
+
+    # Persistence: the rings are written out as raw arrays
+
+    def dump(self, path: str) -> bool:
+        """Write every ring to a compact binary file"""
+        try:
+            with self._lock, open(path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, 1, MINUTE_SLOTS, HOUR_SLOTS))
+                for name in SERIES:
+                    for ring in (self.minutes[name], self.hours[name]):
+                        for values in ring.arrays():
+                            values.tofile(f)
+            return True
+        except OSError as e:
+            print(f"Error saving time series: {e}")
+            return False
+
+    def load(self, path: str) -> bool:
+        """Restore rings dumped earlier; a missing or mismatched file leaves them empty"""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                magic, _, minute_slots, hour_slots = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or (minute_slots, hour_slots) != (MINUTE_SLOTS, HOUR_SLOTS):
+                    raise ValueError(f"{path} is not a compatible time series file")
+                with self._lock:
+                    for name in SERIES:
+                        for ring in (self.minutes[name], self.hours[name]):
+                            for values in ring.arrays():
+                                del values[:]
+                                values.fromfile(f, ring.slots)
+            return True
+        except (OSError, ValueError, EOFError, struct.error) as e:
+            print(f"Error loading time series: {e}")
+            with self._lock:
+                self._clear()
+            return False
+
+
+def sparkline(values: List[Optional[float]]) -> str:
+    """Render values as a row of block characters scaled to the largest; gaps stay blank"""
+    present = [value for value in values if value is not None]
+    top = max(present) if present else 0
+    if top <= 0:
+        return ''.join(' ' if value is None else _SPARKS[0] for value in values)
+    return ''.join(' ' if value is None else _SPARKS[min(len(_SPARKS) - 1, int(value / top * len(_SPARKS)))]
+                   for value in values)
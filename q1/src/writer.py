@@ -0,0 +1,106 @@
+# src/writer.py
+import atexit
+import threading
+from enum import Enum
+from typing import Callable, Dict, Set
+
+
+class DurabilityMode(Enum):
+    SYNC = "sync"          # Write before the mutator returns
+    ASYNC = "async"        # Write on a background thread as soon as possible
+    INTERVAL = "interval"  # Write on a background thread at most once per interval
+
+
+class BackgroundWriter:
+    """Persists dirty collections, coalescing repeated writes to the same one.
+
+    Mutators call mark_dirty() with a collection name. In sync mode the
+    collection's saver runs straight away; otherwise the name joins a dirty
+    set that a background thread drains, so a burst of edits to the same
+    collection costs one write. Savers serialize the current in-memory
+    state when they run, so a coalesced write always stores the latest data.
+    """
+
+    def __init__(self, savers: Dict[str, Callable[[], bool]],
+                 mode: DurabilityMode = DurabilityMode.SYNC, interval: float = 0.5):
+        self.savers = savers
+        self.mode = mode
+        self.interval = interval
+        self.notifications = 0  # Dirty notifications received
+        self.writes = 0         # Collection writes performed
+        self._dirty: Set[str] = set()
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def mark_dirty(self, collection: str) -> bool:
+        """Note that a collection changed; returns False if a sync write failed"""
+        with self._condition:
+            self.notifications += 1
+            self._dirty.add(collection)
+            # Once closed there is no thread left, so later changes are written at once
+            if self.mode != DurabilityMode.SYNC and not self._closed:
+                self._start()
+                if self.mode == DurabilityMode.ASYNC:
+                    self._condition.notify()
+                return True
+        return self.flush()
+
+    def flush(self) -> bool:
+        """Write every dirty collection now; returns False if any save failed"""
+        # Collections are taken under the write lock, so flush() also waits
+        # for a background write that is already in progress
+        with self._write_lock:
+            with self._condition:
+                dirty, self._dirty = self._dirty, set()
+
+            success = True
+            for collection, saver in self.savers.items():
+                if collection not in dirty:
+                    continue
+                if saver():
+                    self.writes += 1
+                else:
+                    success = False
+                    with self._condition:
+                        self._dirty.add(collection)  # Retry on the next write
+            return success
+
+    @property
+    def pending(self) -> Set[str]:
+        """Collections changed since their last write"""
+        with self._condition:
+            return set(self._dirty)
+
+    def close(self) -> bool:
+        """Stop the background thread and write anything still pending"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+            atexit.unregister(self.close)
+        return self.flush()
+
+    def _start(self):
+        # Called with the condition held
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="background-writer", daemon=True)
+            self._thread.start()
+            # Daemon threads are killed at exit, so pending writes are flushed here
+            atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self.mode == DurabilityMode.ASYNC:
+                    while not self._dirty and not self._closed:
+                        self._condition.wait()
+                elif not self._closed:
+                    # close() may already have notified before this thread got here
+                    self._condition.wait(self.interval)
+                if self._closed:
+                    return
+            self.flush()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.database import Database
+from src.storage import MemoryStorage
+from src.admission import AdmissionController, AdmissionPolicy
+from src.services import UserService, MenuService, OrderService
+
+
+class TestAdmissionControl(unittest.TestCase):
+    """Test cases for limiting the orders the kitchen takes on at once"""
+
+    def setUp(self):
+        """Set up a customer and a menu item on an in-memory store"""
+        self.db = Database(storage=MemoryStorage())
+        UserService(self.db).register_user("hungry", "pass", "1 Queue St", "555-0001")
+        _, message = MenuService(self.db).add_item("Slow Roast", 12.00, 20)
+        self.item_id = message.split(": ")[1]
+
+    def tearDown(self):
+        self.db.close()
+
+    def _order_service(self, policy, max_in_flight=2, kitchen_stations=1):
+        admission = AdmissionController(max_in_flight=max_in_flight, policy=policy,
+                                        kitchen_stations=kitchen_stations)
+        return OrderService(self.db, admission)
+
+    def _place(self, order_service):
+        return order_service.create_order("hungry", [(self.item_id, 1)], DeliveryMode.TAKEAWAY)
+
+    def test_01_reject_past_the_limit(self):
+        """Test orders are turned away while the kitchen is full and accepted once it frees up"""
+        order_service = self._order_service(AdmissionPolicy.REJECT)
+        first_id = self._place(order_service)[1].split(": ")[1]
+        self.assertTrue(self._place(order_service)[0])
+
+        success, message = self._place(order_service)
+        self.assertFalse(success)
+        self.assertIn("capacity", message)
+        self.assertEqual(len(self.db.orders), 2)
+
+        order_service.update_order_status(first_id, OrderStatus.PREPARING)
+        order_service.update_order_status(first_id, OrderStatus.READY_FOR_PICKUP)
+        self.assertTrue(self._place(order_service)[0])
+
+    def test_02_queue_until_released(self):
+        """Test queued orders cannot start cooking until an earlier order leaves the kitchen"""
+        order_service = self._order_service(AdmissionPolicy.QUEUE, max_in_flight=1)
+        first_id = self._place(order_service)[1].split(": ")[1]
+        success, message = self._place(order_service)
+        self.assertTrue(success)
+        queued_id = message.split(": ")[1]
+        self.assertTrue(order_service.admission.is_queued(queued_id))
+
+        success, _ = order_service.update_order_status(queued_id, OrderStatus.PREPARING)
+        self.assertFalse(success)
+
+        order_service.cancel_order(first_id)
+        self.assertFalse(order_service.admission.is_queued(queued_id))
+        self.assertTrue(order_service.update_order_status(queued_id, OrderStatus.PREPARING)[0])
+
+    def test_03_quote_longer_eta(self):
+        """Test orders past the limit are accepted with the backlog added to their ETA"""
+        order_service = self._order_service(AdmissionPolicy.QUOTE, max_in_flight=1)
+        first = order_service.get_order(self._place(order_service)[1].split(": ")[1])
+        second = order_service.get_order(self._place(order_service)[1].split(": ")[1])
+
+        first_wait = first.estimated_completion_time - first.creation_time
+        second_wait = second.estimated_completion_time - second.creation_time
+        self.assertEqual((second_wait - first_wait).total_seconds(), 20 * 60)
+
+    def test_04_metrics_and_existing_orders(self):
+        """Test a controller counts orders already in the kitchen and reports its counters"""
+        self._place(OrderService(self.db))
+        order_service = self._order_service(AdmissionPolicy.REJECT, max_in_flight=2)
+        self.assertTrue(self._place(order_service)[0])
+        self.assertFalse(self._place(order_service)[0])
+
+        metrics = order_service.admission.metrics()
+        self.assertEqual(metrics['in_flight'], 2)
+        self.assertEqual(metrics['station_load'], 2.0)
+        self.assertEqual(metrics['admitted'], 1)
+        self.assertEqual(metrics['rejected'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
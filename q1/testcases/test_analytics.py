@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+import shutil
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import MenuItem, Order, OrderItem, DeliveryMode, OrderStatus, User
+from src.database import Database
+from src import analytics
+
+
+@unittest.skipIf(analytics.np is None, "NumPy is not installed")
+class TestOrderAnalytics(unittest.TestCase):
+    """Test cases for the columnar analytics engine"""
+
+    def setUp(self):
+        """Set up a store with orders spread over two hours"""
+        self.test_data_dir = "test_data_analytics"
+        os.environ['DATA_DIR'] = self.test_data_dir
+        os.makedirs(self.test_data_dir, exist_ok=True)
+
+        self.db = Database()
+        self.db.add_user(User("analyst", "pass", "1 Data St", "555-0001"))
+        self.pizza = MenuItem("pizza", "Pizza", 10.0, 15)
+        self.tea = MenuItem("tea", "Tea", 2.5, 2)
+        self.db.add_menu_item(self.pizza)
+        self.db.add_menu_item(self.tea)
+
+        self.base = datetime(2025, 3, 1, 12, 0)
+        self._add_order("o1", [(self.pizza, 2)], DeliveryMode.TAKEAWAY, self.base)
+        self._add_order("o2", [(self.pizza, 1), (self.tea, 4)], DeliveryMode.HOME_DELIVERY,
+                        self.base + timedelta(minutes=30))
+        self._add_order("o3", [(self.tea, 2)], DeliveryMode.TAKEAWAY,
+                        self.base + timedelta(hours=1, minutes=5))
+        self.analytics = analytics.OrderAnalytics(self.db)
+
+    def tearDown(self):
+        """Clean up after tests"""
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+        if 'DATA_DIR' in os.environ:
+            del os.environ['DATA_DIR']
+
+    def _add_order(self, order_id, lines, mode, created, status=OrderStatus.PLACED):
+        order = Order(order_id, "analyst", [OrderItem(item, qty) for item, qty in lines], mode, "addr")
+        order.creation_time = created
+        order.status = status
+        self.db.add_order(order)
+        return order
+
+    def test_01_revenue_by_item(self):
+        """Test revenue is grouped per menu item"""
+        self.assertEqual(self.analytics.revenue_by_item(), {"pizza": 30.0, "tea": 15.0})
+        self.assertEqual(self.analytics.quantity_by_item(), {"pizza": 3, "tea": 6})
+
+    def test_02_revenue_by_delivery_mode(self):
+        """Test revenue is grouped per delivery mode"""
+        by_mode = self.analytics.revenue_by_delivery_mode()
+        self.assertEqual(by_mode[DeliveryMode.TAKEAWAY], 25.0)
+        self.assertEqual(by_mode[DeliveryMode.HOME_DELIVERY], 20.0)
+
+    def test_03_hourly_buckets_and_ranges(self):
+        """Test time-bucketed revenue and half-open time ranges"""
+        buckets = self.analytics.revenue_by_time_bucket(timedelta(hours=1))
+        self.assertEqual(buckets, [(self.base, 40.0), (self.base + timedelta(hours=1), 5.0)])
+
+        first_hour = self.analytics.total_revenue(self.base, self.base + timedelta(hours=1))
+        self.assertEqual(first_hour, 40.0)
+        self.assertEqual(self.analytics.revenue_by_hour_of_day()[12], 40.0)
+
+    def test_04_cache_refreshes_on_new_orders(self):
+        """Test cached results are recomputed once new orders arrive"""
+        self.assertEqual(self.analytics.total_revenue(), 45.0)
+        self._add_order("o4", [(self.pizza, 1)], DeliveryMode.TAKEAWAY, self.base + timedelta(hours=2))
+        self.assertEqual(self.analytics.total_revenue(), 55.0)
+
+    def test_05_cancelled_orders_excluded(self):
+        """Test cancelled orders do not count as revenue unless requested"""
+        self._add_order("o5", [(self.pizza, 5)], DeliveryMode.TAKEAWAY,
+                        self.base + timedelta(hours=3), OrderStatus.CANCELLED)
+        self.assertEqual(self.analytics.total_revenue(), 45.0)
+        self.assertEqual(self.analytics.total_revenue(include_cancelled=True), 95.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
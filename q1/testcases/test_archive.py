@@ -0,0 +1,106 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.clock import VirtualClock
+from src.database import Database
+from src.storage import MemoryStorage
+from src.services import UserService, MenuService, OrderService
+from src.archive import OrderArchive, write_archive
+
+
+def _record(day: int, minute: int, status: str = "Delivered") -> dict:
+    created = datetime(2024, 1, 1) + timedelta(days=day, minutes=minute)
+    return {"customer_username": "arch", "items": [{"menu_item_id": "m1", "quantity": 1}],
+            "delivery_mode": "Takeaway", "delivery_address": None, "status": status,
+            "creation_time": created.isoformat(), "estimated_completion_time": created.isoformat(),
+            "assigned_delivery_agent": None, "version": 0, "status_times": {}}
+
+
+class TestOrderArchive(unittest.TestCase):
+    """Test cases for the compressed order archive"""
+
+    def setUp(self):
+        self.test_data_dir = "test_data_archive"
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.path = os.path.join(self.test_data_dir, "orders.q1a")
+        # Ten days of orders, 100 a day, in creation order
+        self.orders = [(f"o{day:02d}-{n:03d}", _record(day, n, "Cancelled" if n % 10 == 0 else "Delivered"))
+                       for day in range(10) for n in range(100)]
+
+    def tearDown(self):
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+    def test_01_round_trip_and_size(self):
+        """Test every order comes back unchanged and the archive is smaller than the JSON file"""
+        for codec in ("gzip", "lzma"):
+            stats = write_archive(self.path, self.orders, codec=codec, block_orders=50)
+            self.assertEqual((stats.orders, stats.blocks), (1000, 20))
+            self.assertLess(stats.archive_bytes * 5, len(json.dumps(dict(self.orders), indent=4)))
+
+            archive = OrderArchive(self.path)
+            self.assertEqual(archive.codec, codec)
+            self.assertEqual(len(archive), 1000)
+            self.assertEqual(list(archive.iter_range()), self.orders)
+
+    def test_02_lookup_reads_one_block(self):
+        """Test a lookup decompresses only the block holding the order"""
+        write_archive(self.path, self.orders, block_orders=50)
+        archive = OrderArchive(self.path)
+        self.assertEqual(archive.get("o07-042"), dict(self.orders)["o07-042"])
+        self.assertEqual(archive.get("o07-043")["creation_time"], "2024-01-08T00:43:00")
+        self.assertEqual(archive.blocks_read, 1)
+        self.assertIsNone(archive.get("missing"))
+        self.assertNotIn("missing", archive)
+
+    def test_03_date_range_report(self):
+        """Test a date-range report reads only overlapping blocks"""
+        write_archive(self.path, self.orders, block_orders=50)
+        archive = OrderArchive(self.path)
+        report = archive.orders_by_day(datetime(2024, 1, 3), datetime(2024, 1, 5))
+        self.assertEqual(list(report), [datetime(2024, 1, 3).date(), datetime(2024, 1, 4).date()])
+        self.assertEqual(report[datetime(2024, 1, 3).date()], {"Delivered": 90, "Cancelled": 10})
+        self.assertEqual(archive.blocks_read, 4)
+
+    def test_04_damaged_file_rejected(self):
+        """Test a truncated archive is refused"""
+        write_archive(self.path, self.orders)
+        with open(self.path, "r+b") as f:
+            f.truncate(200)
+        with self.assertRaises(ValueError):
+            OrderArchive(self.path)
+
+    def test_05_database_archives_finished_orders(self):
+        """Test a store archives finished orders created before the cutoff"""
+        clock = VirtualClock(datetime(2024, 1, 1, 9, 0))
+        db = Database(storage=MemoryStorage(), clock=clock)
+        order_service = OrderService(db)
+        UserService(db).register_user("arch", "pass", "1 Arch St", "555-0001")
+        _, message = MenuService(db).add_item("Archive Pie", 4.00, 5)
+        item_id = message.split(": ")[1]
+
+        order_ids = []
+        for _ in range(3):
+            _, message = order_service.create_order("arch", [(item_id, 1)], DeliveryMode.TAKEAWAY)
+            order_ids.append(message.split(": ")[1])
+            clock.advance(timedelta(hours=1))
+        order_service.cancel_order(order_ids[0])
+        order_service.cancel_order(order_ids[2])
+
+        stats = db.archive_orders(self.path, before=datetime(2024, 1, 1, 11, 0))
+        self.assertEqual(stats.orders, 1)
+        record = OrderArchive(self.path).get(order_ids[0])
+        self.assertEqual(record["status"], OrderStatus.CANCELLED.value)
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
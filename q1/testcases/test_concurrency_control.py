@@ -0,0 +1,101 @@
+import unittest
+import os
+import sys
+import shutil
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.database import Database
+from src.services import (UserService, MenuService, OrderService, DeliveryAgentService,
+                          is_version_conflict, retry_on_conflict)
+
+
+class TestOptimisticConcurrency(unittest.TestCase):
+    """Test cases for versioned writes on orders and delivery agents"""
+
+    def setUp(self):
+        """Set up services sharing one store"""
+        self.test_data_dir = "test_data_versions"
+        os.environ['DATA_DIR'] = self.test_data_dir
+        os.makedirs(self.test_data_dir, exist_ok=True)
+
+        self.db = Database()
+        self.order_service = OrderService(self.db)
+        self.delivery_service = DeliveryAgentService(self.db)
+        UserService(self.db).register_user("versionuser", "pass", "1 Version St", "555-0001")
+        _, message = MenuService(self.db).add_item("Version Pizza", 10.00, 10)
+        self.item_id = message.split(": ")[1]
+
+    def tearDown(self):
+        """Clean up after tests"""
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+        if 'DATA_DIR' in os.environ:
+            del os.environ['DATA_DIR']
+
+    def _ready_order(self):
+        _, message = self.order_service.create_order(
+            "versionuser", [(self.item_id, 1)], DeliveryMode.HOME_DELIVERY)
+        order_id = message.split(": ")[1]
+        self.order_service.update_order_status(order_id, OrderStatus.PREPARING)
+        self.order_service.update_order_status(order_id, OrderStatus.READY_FOR_PICKUP)
+        return order_id
+
+    def test_01_writes_bump_version(self):
+        """Test each write increments the order version and survives a reload"""
+        order_id = self._ready_order()
+        self.assertEqual(self.order_service.get_order(order_id).version, 2)
+        self.assertEqual(Database().get_order(order_id).version, 2)
+
+    def test_02_stale_write_is_rejected(self):
+        """Test a writer holding an old version gets a conflict instead of overwriting"""
+        _, message = self.order_service.create_order(
+            "versionuser", [(self.item_id, 1)], DeliveryMode.TAKEAWAY)
+        order_id = message.split(": ")[1]
+        seen_version = self.order_service.get_order(order_id).version
+
+        # Another admin moves the order on first
+        self.order_service.update_order_status(order_id, OrderStatus.PREPARING, seen_version)
+        success, message = self.order_service.update_order_status(
+            order_id, OrderStatus.CANCELLED, seen_version)
+
+        self.assertFalse(success)
+        self.assertTrue(is_version_conflict(message))
+        self.assertEqual(self.order_service.get_order(order_id).status, OrderStatus.PREPARING)
+
+    def test_03_agent_version_checked_on_assignment(self):
+        """Test assignment checks the agent's version as well as the order's"""
+        order_id = self._ready_order()
+        self.delivery_service.register_agent("versionagent", "pass", "555-0002")
+        agent = self.db.get_delivery_agent("versionagent")
+
+        success, message = self.delivery_service.assign_agent_to_order(
+            order_id, "versionagent", expected_agent_version=agent.version + 1)
+        self.assertTrue(is_version_conflict(message))
+        self.assertIsNone(self.order_service.get_order(order_id).assigned_delivery_agent)
+
+        success, _ = self.delivery_service.assign_agent_to_order(
+            order_id, "versionagent", expected_agent_version=agent.version)
+        self.assertTrue(success)
+
+    def test_04_retry_helper_rereads_version(self):
+        """Test the retry helper re-runs a conflicting write against fresh state"""
+        _, message = self.order_service.create_order(
+            "versionuser", [(self.item_id, 1)], DeliveryMode.TAKEAWAY)
+        order_id = message.split(": ")[1]
+        stale = [self.order_service.get_order(order_id).version - 1]
+
+        def operation():
+            # First attempt uses a stale version, later ones read the current one
+            version = stale.pop() if stale else self.order_service.get_order(order_id).version
+            return self.order_service.update_order_status(order_id, OrderStatus.PREPARING, version)
+
+        success, _ = retry_on_conflict(operation, backoff=0)
+        self.assertTrue(success)
+
+
+if __name__ == '__main__':
+    unittest.main()
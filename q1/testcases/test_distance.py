@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import shutil
+from datetime import timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.database import Database
+from src.distance import DeliveryTimeEstimator, MATRIX_FILE, RESTAURANT, write_matrix
+from src.services import UserService, MenuService, OrderService
+
+
+def _grid_minutes(origin, destination):
+    """Travel time between nodes named by their position on a line"""
+    position = lambda node: 0 if node == RESTAURANT else int(node.split('-')[1])
+    return float(abs(position(origin) - position(destination)) * 2)
+
+
+class TestDistanceMatrix(unittest.TestCase):
+    """Test cases for matrix-based delivery time estimates"""
+
+    def setUp(self):
+        self.test_data_dir = "test_data_distance"
+        os.environ['DATA_DIR'] = self.test_data_dir
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        nodes = [RESTAURANT] + [f"zone-{i}" for i in range(1, 500)]
+        write_matrix(self.test_data_dir, nodes, _grid_minutes,
+                     {"12 Near St.": "zone-6", "400 Far Road": "zone-40"})
+
+    def tearDown(self):
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+        if 'DATA_DIR' in os.environ:
+            del os.environ['DATA_DIR']
+
+    def test_01_lookups(self):
+        """Test travel times between nodes and to known addresses"""
+        estimator = DeliveryTimeEstimator.open(self.test_data_dir)
+        self.addCleanup(estimator.close)
+
+        self.assertEqual(estimator.size, 500)
+        self.assertEqual(estimator.travel_minutes("zone-10", "zone-499"), 978.0)
+        self.assertEqual(estimator.delivery_minutes("12 near st"), 12.0)
+        self.assertEqual(estimator.delivery_minutes("400  FAR road"), 80.0)
+        self.assertIsNone(estimator.delivery_minutes("Unknown Lane"))
+        self.assertIsNone(estimator.travel_minutes("zone-1", "nowhere"))
+
+    def test_02_store_quotes_from_the_matrix(self):
+        """Test home delivery ETAs use the matrix and fall back for unknown addresses"""
+        db = Database()
+        self.addCleanup(db.close)
+        user_service, order_service = UserService(db), OrderService(db)
+        user_service.register_user("near", "pass", "12 Near St.", "555-0001")
+        user_service.register_user("lost", "pass", "Unknown Lane", "555-0002")
+        _, message = MenuService(db).add_item("Matrix Pizza", 10.00, 10)
+        item_id = message.split(": ")[1]
+
+        for username, expected in (("near", 22), ("lost", 40)):
+            _, message = order_service.create_order(username, [(item_id, 1)], DeliveryMode.HOME_DELIVERY)
+            order = db.get_order(message.split(": ")[1])
+            self.assertEqual(order.estimated_completion_time - order.creation_time,
+                             timedelta(minutes=expected))
+
+        order_service.update_order_status(order.order_id, OrderStatus.PREPARING)
+        _, message = order_service.create_order("near", [(item_id, 1)], DeliveryMode.HOME_DELIVERY)
+        order_id = message.split(": ")[1]
+        order_service.update_order_status(order_id, OrderStatus.PREPARING)
+        order_service.update_order_status(order_id, OrderStatus.READY_FOR_PICKUP)
+        order = db.get_order(order_id)
+        self.assertEqual(order.estimated_completion_time - order.status_times[OrderStatus.READY_FOR_PICKUP],
+                         timedelta(minutes=12))
+
+    def test_03_invalid_matrix_is_ignored(self):
+        """Test a damaged matrix file is reported and not used"""
+        with open(os.path.join(self.test_data_dir, MATRIX_FILE), 'r+b') as f:
+            f.truncate(100)
+        self.assertIsNone(DeliveryTimeEstimator.open(self.test_data_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+import os
+import sys
+import shutil
+import threading
+import multiprocessing
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+from src.events import ChangeFeed, OrderEventType, INDEX_EVERY, MEMORY_EVENTS
+
+
+def _publish_events(path, count):
+    """Append events from a separate process"""
+    feed = ChangeFeed.for_file(path)
+    for index in range(count):
+        feed.publish(OrderEventType.CREATED, f"{os.getpid()}-{index}")
+
+
+class TestOrderChangeFeed(unittest.TestCase):
+    """Test cases for the order change feed"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.test_data_dir = "test_data_events"
+        os.environ['DATA_DIR'] = self.test_data_dir
+        os.makedirs(self.test_data_dir, exist_ok=True)
+
+        UserService().register_user("eventuser", "pass", "1 Event St", "555-0001")
+        DeliveryAgentService().register_agent("eventagent", "pass", "555-0002")
+        _, message = MenuService().add_item("Event Pizza", 10.00, 10)
+        self.item_id = message.split(": ")[1]
+
+        self.order_service = OrderService()
+        self.delivery_service = DeliveryAgentService()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+        if 'DATA_DIR' in os.environ:
+            del os.environ['DATA_DIR']
+
+    def _place_order(self, mode=DeliveryMode.TAKEAWAY):
+        _, message = self.order_service.create_order("eventuser", [(self.item_id, 1)], mode)
+        return message.split(": ")[1]
+
+    def test_01_events_are_sequenced(self):
+        """Test order lifecycle events are logged with increasing sequence numbers"""
+        order_id = self._place_order()
+        self.order_service.update_order_status(order_id, OrderStatus.PREPARING)
+
+        events = list(self.order_service.get_order_events())
+        self.assertEqual([e.event_type for e in events],
+                         [OrderEventType.CREATED, OrderEventType.STATUS_CHANGED])
+        self.assertEqual([e.seq for e in events], [1, 2])
+        self.assertEqual(events[1].data['status'], OrderStatus.PREPARING.value)
+
+    def test_02_resume_from_offset(self):
+        """Test reading from an offset returns only newer events"""
+        self._place_order()
+        offset = self.order_service.db.change_feed.last_seq
+        second = self._place_order()
+
+        events = list(self.order_service.get_order_events(offset))
+        self.assertEqual([e.order_id for e in events], [second])
+
+    def test_03_subscription_receives_new_events(self):
+        """Test subscribers get live events and replay from their offset"""
+        self._place_order()
+        received = []
+        subscription = self.order_service.subscribe_to_orders(received.append, offset=0)
+        self.assertEqual(len(received), 1)
+
+        self._place_order()
+        self.assertEqual(len(received), 2)
+        self.assertEqual(subscription.offset, 2)
+
+        subscription.unsubscribe()
+        self._place_order()
+        self.assertEqual(len(received), 2)
+
+    def test_04_agent_assignment_subscription(self):
+        """Test agents are notified only of their own assignments"""
+        assigned = []
+        subscription = self.delivery_service.subscribe_to_assignments("eventagent", assigned.append)
+
+        self._place_order(DeliveryMode.TAKEAWAY)
+        order_id = self._place_order(DeliveryMode.HOME_DELIVERY)
+        subscription.unsubscribe()
+
+        self.assertEqual([e.order_id for e in assigned], [order_id])
+
+    def test_05_tail_follows_file(self):
+        """Test tailing the log file picks up events from other writers"""
+        order_id = self._place_order()
+        feed = ChangeFeed(self.order_service.db.change_feed.path)
+        stop = threading.Event()
+
+        event = next(feed.tail(offset=0, poll_interval=0.01, stop=stop))
+        stop.set()
+        self.assertEqual(event.order_id, order_id)
+        self.assertEqual(feed.last_seq, 1)
+
+    def test_06_processes_get_distinct_sequence_numbers(self):
+        """Test processes appending to one log never reuse a sequence number"""
+        path = self.order_service.db.change_feed.path
+        self._place_order()  # Warm this process's cached feed first
+        workers = [multiprocessing.Process(target=_publish_events, args=(path, 25)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self._place_order()
+
+        seqs = [event.seq for event in ChangeFeed(path).read()]
+        self.assertEqual(seqs, list(range(1, 53)))
+
+    def test_07_reads_seek_near_their_offset(self):
+        """Test reads and tails from an offset start at an indexed line near it, and memory feeds stay bounded"""
+        path = os.path.join(self.test_data_dir, "long_events.jsonl")
+        writer = ChangeFeed(path)
+        for index in range(5 * INDEX_EVERY):
+            writer.publish(OrderEventType.CREATED, f"order-{index}")
+
+        events = list(writer.read(4 * INDEX_EVERY + 10))
+        self.assertEqual([event.seq for event in events], list(range(4 * INDEX_EVERY + 11, 5 * INDEX_EVERY + 1)))
+        self.assertLessEqual(writer.last_lines_read, INDEX_EVERY)
+
+        # A fresh reader builds the index as it goes, so its second read seeks too
+        reader = ChangeFeed(path)
+        self.assertEqual(len(list(reader.read())), 5 * INDEX_EVERY)
+        self.assertEqual(next(reader.read(3 * INDEX_EVERY)).seq, 3 * INDEX_EVERY + 1)
+        self.assertLessEqual(reader.last_lines_read, INDEX_EVERY)
+        stop = threading.Event()
+        self.assertEqual(next(reader.tail(offset=2 * INDEX_EVERY + 5, stop=stop)).seq, 2 * INDEX_EVERY + 6)
+        stop.set()
+
+        memory = ChangeFeed(None)
+        for index in range(MEMORY_EVENTS + 5):
+            memory.publish(OrderEventType.CREATED, f"order-{index}")
+        self.assertEqual(next(memory.read()).seq, 6)
+        self.assertEqual([event.seq for event in memory.read(MEMORY_EVENTS + 3)],
+                         [MEMORY_EVENTS + 4, MEMORY_EVENTS + 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
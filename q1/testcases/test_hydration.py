@@ -0,0 +1,71 @@
+import unittest
+import os
+import sys
+import shutil
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import MenuItem, Order, OrderStatus, DeliveryMode
+from src.database import Database
+from src.services import UserService, MenuService, OrderService
+from src.benchmark_load import make_records, hydrate_with_constructor
+
+
+class TestOrderHydration(unittest.TestCase):
+    """Test cases for rebuilding stored orders on load"""
+
+    def setUp(self):
+        self.menu_items = {"m1": MenuItem("m1", "Soup", 4.00, 10), "m2": MenuItem("m2", "Bread", 2.00, 5)}
+
+    def test_01_matches_constructor_path(self):
+        """Test from_record builds the same order as the constructor path"""
+        for order_id, record in make_records(20, self.menu_items).items():
+            fast = Order.from_record(order_id, record, self.menu_items)
+            slow = hydrate_with_constructor(order_id, record, self.menu_items)
+            self.assertEqual(vars(fast).keys(), vars(slow).keys())
+            for field in ('customer_username', 'delivery_mode', 'status', 'creation_time',
+                          'estimated_completion_time', 'version'):
+                self.assertEqual(getattr(fast, field), getattr(slow, field))
+            self.assertEqual(fast.total_price, slow.total_price)
+
+    def test_02_stored_times_are_kept(self):
+        """Test no times are recomputed, even when they disagree with the items"""
+        record = next(iter(make_records(1, self.menu_items).values()))
+        record['estimated_completion_time'] = record['creation_time']
+        order = Order.from_record("o1", record, self.menu_items)
+
+        self.assertEqual(order.estimated_completion_time, order.creation_time)
+        self.assertIs(order.items[0].menu_item, self.menu_items[record['items'][0]['menu_item_id']])
+
+    def test_03_missing_menu_items_are_dropped(self):
+        """Test items whose menu item was deleted are skipped"""
+        record = next(iter(make_records(1, self.menu_items).values()))
+        order = Order.from_record("o1", record, {"m1": self.menu_items["m1"]})
+        self.assertTrue(all(item.menu_item.item_id == "m1" for item in order.items))
+
+    def test_04_store_reload_round_trip(self):
+        """Test orders saved by the store load back unchanged"""
+        data_dir = "test_data_hydration"
+        try:
+            db = Database(data_dir)
+            UserService(db).register_user("loaduser", "pass", "1 Load Ln", "555-0001")
+            _, message = MenuService(db).add_item("Load Pizza", 10.00, 10)
+            item_id = message.split(": ")[1]
+            _, message = OrderService(db).create_order(
+                "loaduser", [(item_id, 2)], DeliveryMode.HOME_DELIVERY)
+            order_id = message.split(": ")[1]
+            OrderService(db).update_order_status(order_id, OrderStatus.PREPARING)
+
+            saved, loaded = db.get_order(order_id), Database(data_dir).get_order(order_id)
+            self.assertEqual(loaded.status, OrderStatus.PREPARING)
+            self.assertEqual(loaded.creation_time, saved.creation_time)
+            self.assertEqual(loaded.estimated_completion_time, saved.estimated_completion_time)
+            self.assertEqual(loaded.total_price, 20.00)
+        finally:
+            if os.path.exists(data_dir):
+                shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
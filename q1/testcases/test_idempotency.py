@@ -0,0 +1,111 @@
+import unittest
+import os
+import sys
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode
+from src.database import Database
+from src.idempotency import IdempotencyTable
+from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+
+
+class TestIdempotentOrders(unittest.TestCase):
+    """Test cases for order creation with idempotency keys"""
+
+    def setUp(self):
+        """Set up services sharing one store"""
+        self.test_data_dir = "test_data_idempotency"
+        os.environ['DATA_DIR'] = self.test_data_dir
+        os.makedirs(self.test_data_dir, exist_ok=True)
+
+        self.db = Database()
+        self.order_service = OrderService(self.db)
+        UserService(self.db).register_user("retryuser", "pass", "1 Retry Rd", "555-0001")
+        DeliveryAgentService(self.db).register_agent("retryagent", "pass", "555-0002")
+        _, message = MenuService(self.db).add_item("Retry Pizza", 10.00, 10)
+        self.item_id = message.split(": ")[1]
+
+    def tearDown(self):
+        """Clean up after tests"""
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+        if 'DATA_DIR' in os.environ:
+            del os.environ['DATA_DIR']
+
+    def _order(self, key, service=None):
+        return (service or self.order_service).create_order(
+            "retryuser", [(self.item_id, 1)], DeliveryMode.HOME_DELIVERY, idempotency_key=key)
+
+    def test_01_retry_returns_original_result(self):
+        """Test a retried request places one order and assigns one agent"""
+        first = self._order("key-1")
+        second = self._order("key-1")
+
+        self.assertTrue(first[0])
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.db.get_all_orders()), 1)
+        self.assertEqual(len(self.db.get_delivery_agent("retryagent").current_orders), 1)
+        self.assertEqual(len(list(self.db.change_feed.read())), 2)
+
+    def test_02_keys_survive_a_reload(self):
+        """Test the dedup table is persisted with the store"""
+        first = self._order("key-2")
+
+        self.assertEqual(self._order("key-2", OrderService()), first)
+        self.assertEqual(len(Database().get_all_orders()), 1)
+
+    def test_03_failures_are_not_remembered(self):
+        """Test a failed attempt can be retried with the same key"""
+        success, _ = self.order_service.create_order(
+            "retryuser", [("missing", 1)], DeliveryMode.TAKEAWAY, idempotency_key="key-3")
+        self.assertFalse(success)
+
+        success, _ = self._order("key-3")
+        self.assertTrue(success)
+
+    def test_04_concurrent_retries_place_one_order(self):
+        """Test requests racing with the same key wait for the first one"""
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self._order("key-4")))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(len(self.db.get_all_orders()), 1)
+
+    def test_05_table_is_bounded_and_expires(self):
+        """Test the dedup table evicts the oldest keys and expired keys"""
+        table = IdempotencyTable(capacity=2, ttl=timedelta(minutes=10))
+        start = datetime(2024, 1, 1, 12, 0)
+        for index in range(3):
+            table.put(f"k{index}", "fp", (True, f"order {index}"), now=start)
+
+        self.assertEqual(len(table), 2)
+        self.assertIsNone(table.get("k0", now=start))
+        self.assertEqual(table.get("k2", now=start), ("fp", (True, "order 2")))
+        self.assertIsNone(table.get("k2", now=start + timedelta(minutes=10)))
+
+    def test_06_key_reused_for_another_request(self):
+        """Test a key reused with different arguments is rejected, not answered"""
+        first = self._order("key-6")
+        success, message = self.order_service.create_order(
+            "retryuser", [(self.item_id, 3)], DeliveryMode.HOME_DELIVERY, idempotency_key="key-6")
+
+        self.assertFalse(success)
+        self.assertIn("different order", message)
+        self.assertEqual(len(self.db.get_all_orders()), 1)
+        # The original request can still be retried
+        self.assertEqual(self._order("key-6", OrderService()), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
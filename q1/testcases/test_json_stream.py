@@ -0,0 +1,136 @@
+import unittest
+import io
+import os
+import sys
+import json
+import shutil
+import tracemalloc
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode
+from src.services import UserService, MenuService, OrderService
+from src.database import Database
+from src.json_stream import LoadStats, iter_object_items
+
+
+class TestStreamingJsonParser(unittest.TestCase):
+    """Test cases for the incremental JSON object parser"""
+
+    SAMPLE = {
+        "a": {"items": [{"menu_item_id": "x", "quantity": 12345}], "note": "brace } and \" quote"},
+        "b": 1234567890,
+        "c": [1.5, -2e10, None, True, False],
+        "dé": {}
+    }
+
+    def _parse(self, text, chunk_size):
+        stats = LoadStats()
+        items = list(iter_object_items(io.StringIO(text), chunk_size=chunk_size, stats=stats))
+        stats.finish()
+        return items, stats
+
+    def test_01_matches_json_load_for_any_chunk_size(self):
+        """Test streamed records equal json.load output across chunk boundaries"""
+        for text in (json.dumps(self.SAMPLE), json.dumps(self.SAMPLE, indent=4)):
+            for chunk_size in (1, 2, 7, 64, 4096):
+                items, stats = self._parse(text, chunk_size)
+                self.assertEqual(dict(items), self.SAMPLE)
+                self.assertEqual(stats.records, 4)
+                self.assertEqual(stats.bytes_read, len(text))
+
+    def test_02_empty_object(self):
+        """Test an empty object yields no records"""
+        items, _ = self._parse("  {  }  ", 1)
+        self.assertEqual(items, [])
+
+    def test_03_malformed_input_raises(self):
+        """Test truncated or invalid documents raise ValueError"""
+        for text in ('', '[1, 2]', '{"a": 1', '{"a" 1}', '{"a": 1 "b": 2}'):
+            with self.assertRaises(ValueError):
+                self._parse(text, 3)
+
+    def test_04_buffer_stays_bounded(self):
+        """Test the parse buffer holds roughly one record, not the whole file"""
+        records = {f"order-{i}": {"payload": "x" * 100} for i in range(1000)}
+        text = json.dumps(records)
+        items, stats = self._parse(text, 256)
+
+        self.assertEqual(len(items), 1000)
+        self.assertLess(stats.peak_buffer_bytes, 1024)
+
+    def test_05_scalar_values_across_chunk_boundaries(self):
+        """Test bare numbers and literals are never cut short by a chunk boundary"""
+        records = {"k0": 0.1, "k1": 1.0, "k2": -12e3, "k3": 1e-7, "k4": 123456,
+                   "k5": True, "k6": None, "k7": "1.5", "k8": 0}
+        for text in (json.dumps(records), json.dumps(records, indent=4)):
+            for chunk_size in range(1, 12):
+                items, _ = self._parse(text, chunk_size)
+                self.assertEqual(dict(items), records)
+                self.assertEqual([type(value) for _, value in items],
+                                 [type(value) for value in records.values()])
+
+
+class TestStreamingOrderLoad(unittest.TestCase):
+    """Test cases for loading orders through the streaming parser"""
+
+    def setUp(self):
+        self.test_data_dir = "test_data_json_stream"
+        os.environ['DATA_DIR'] = self.test_data_dir
+        os.makedirs(self.test_data_dir, exist_ok=True)
+
+    def tearDown(self):
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+        if 'DATA_DIR' in os.environ:
+            del os.environ['DATA_DIR']
+
+    def test_01_orders_round_trip_with_stats(self):
+        """Test orders saved by the store load back with load statistics"""
+        UserService().register_user("streamuser", "pass", "1 Stream St", "555-0001")
+        _, message = MenuService().add_item("Stream Pizza", 10.00, 10)
+        item_id = message.split(": ")[1]
+        order_service = OrderService()
+        for _ in range(3):
+            order_service.create_order("streamuser", [(item_id, 2)], DeliveryMode.TAKEAWAY)
+
+        db = Database()
+        self.assertEqual(len(db.orders), 3)
+        self.assertEqual(db.order_load_stats.records, 3)
+        self.assertIn("records/s", db.order_load_stats.report())
+        for order in db.orders.values():
+            self.assertEqual(order.total_price, 20.00)
+
+    def test_03_traced_peak_covers_the_load_only(self):
+        """Test the traced peak excludes memory held or peaked before the load started"""
+        stats = LoadStats()
+        self.assertIsNone(stats.peak_traced_bytes)
+        tracemalloc.start()
+        try:
+            held = bytearray(4 * 1024 * 1024)
+            spike = bytearray(8 * 1024 * 1024)
+            del spike
+            stats = LoadStats()
+            burst = bytearray(1024 * 1024)
+            del burst
+            stats.finish()
+            del held
+        finally:
+            tracemalloc.stop()
+        self.assertGreaterEqual(stats.peak_traced_bytes, 1024 * 1024)
+        self.assertLess(stats.peak_traced_bytes, 2 * 1024 * 1024)
+        self.assertIn("Peak traced memory during load", stats.report())
+
+    def test_02_load_profile_covers_each_collection(self):
+        """Test the startup load profile times every collection file"""
+        db = Database()
+        phases = [name for name, _ in db.load_profile.phases]
+        for collection in ('users', 'menu_items', 'orders', 'delivery_agents'):
+            self.assertIn(f"load {collection}", phases)
+        self.assertIn("Total (wall clock)", db.load_profile.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
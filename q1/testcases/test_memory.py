@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import tracemalloc
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode
+from src.database import Database
+from src.storage import MemoryStorage
+from src.services import UserService, MenuService, OrderService
+from src.memory import MemoryProfiler, deep_sizeof, UNOWNED
+
+
+class TestMemoryProfiler(unittest.TestCase):
+    """Test cases for the store memory report"""
+
+    def setUp(self):
+        self.db = Database(storage=MemoryStorage())
+        self.order_service = OrderService(self.db)
+        UserService(self.db).register_user("mem", "pass", "1 Mem St", "555-0001")
+        _, message = MenuService(self.db).add_item("Memory Soup", 5.00, 10)
+        self.item_id = message.split(": ")[1]
+
+    def tearDown(self):
+        self.db.close()
+
+    def _place_orders(self, count):
+        for _ in range(count):
+            self.order_service.create_order("mem", [(self.item_id, 1)], DeliveryMode.TAKEAWAY)
+
+    def test_01_deep_size_counts_shared_objects_once(self):
+        """Test deep sizes follow references, count each object once and attribute it to its model"""
+        shared = ["x" * 1000]
+        seen, by_type = set(), {}
+        first = deep_sizeof({"a": shared}, seen, by_type)
+        second = deep_sizeof({"b": shared}, seen, by_type)
+        self.assertGreater(first, 1000)
+        self.assertLess(second, 1000)
+        self.assertEqual(list(by_type), [UNOWNED])
+
+        by_type = {}
+        deep_sizeof(self.db.menu_items, set(), by_type)
+        self.assertEqual(by_type["MenuItem"][0], 1)
+
+    def test_02_snapshot_breaks_down_by_collection_and_type(self):
+        """Test orders and their items are counted per collection and per model type"""
+        self._place_orders(50)
+        snapshot = MemoryProfiler(self.db).snapshot()
+        self.assertEqual(snapshot.collections["orders"][0], 50)
+        self.assertEqual(snapshot.types["Order"][0], 50)
+        self.assertEqual(snapshot.types["OrderItem"][0], 50)
+        self.assertEqual(snapshot.types["User"][0], 1)
+        # The menu item every order refers to counts once, with the menu
+        self.assertEqual(snapshot.types["MenuItem"][0], 1)
+        self.assertGreater(snapshot.collections["orders"][1], snapshot.collections["users"][1])
+        self.assertEqual(snapshot.total, sum(size for _, size in snapshot.types.values()))
+
+    def test_03_report_shows_growth(self):
+        """Test a second report shows what grew since the first, and traced allocation sites"""
+        profiler = MemoryProfiler(self.db)
+        tracemalloc.start()
+        try:
+            first = profiler.report()
+            self._place_orders(100)
+            second = profiler.report()
+        finally:
+            tracemalloc.stop()
+
+        self.assertNotIn("KB", first.split("\n")[2])
+        orders_line = next(line for line in second.split("\n") if line.startswith("orders"))
+        self.assertIn("100 entries", orders_line)
+        self.assertIn("  +", orders_line)
+        self.assertIn("Top allocation sites", second)
+        self.assertIn("Allocation tracing is off", profiler.report())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import Database
+from src.storage import MemoryStorage
+from src.services import MenuService
+
+
+class CountingStorage(MemoryStorage):
+    """In-memory storage counting collection writes"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = {}
+
+    def write_collection(self, collection, records):
+        self.writes[collection] = self.writes.get(collection, 0) + 1
+        super().write_collection(collection, records)
+
+
+class TestMenuImport(unittest.TestCase):
+    """Test cases for bulk menu import and export"""
+
+    def setUp(self):
+        self.test_data_dir = "test_data_menu_import"
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.storage = CountingStorage()
+        self.menu_service = MenuService(Database(storage=self.storage))
+
+    def tearDown(self):
+        self.menu_service.db.close()
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.test_data_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_01_csv_catalog_in_one_write(self):
+        """Test a 2000-row CSV catalog is imported with a single menu write"""
+        rows = "".join(f"Dish {i},{i % 20 + 1}.50,{i % 30 + 1}\n" for i in range(2000))
+        path = self._write("catalog.csv", "name,price,preparation_time\n" + rows)
+        writes = self.storage.writes.get("menu_items", 0)
+
+        success, message = self.menu_service.import_items(path)
+        self.assertTrue(success, message)
+        self.assertEqual(message, "Imported 2000 items (2000 added, 0 updated)")
+        self.assertEqual(self.storage.writes["menu_items"] - writes, 1)
+        self.assertEqual(len(self.menu_service.get_all_items()), 2000)
+
+    def test_02_invalid_rows_reported_and_nothing_imported(self):
+        """Test every invalid row is listed and a file with errors imports nothing"""
+        path = self._write("bad.jsonl", "\n".join([
+            json.dumps({"name": "Good Soup", "price": 4.5, "preparation_time": 5}),
+            json.dumps({"name": "", "price": -1, "preparation_time": 5}),
+            "{not json",
+            json.dumps({"item_id": "x", "name": "Pie", "price": "cheap", "preparation_time": 2.5}),
+            json.dumps({"item_id": "x", "name": "Pie", "price": 3, "preparation_time": 4})
+        ]) + "\n")
+
+        success, message = self.menu_service.import_items(path)
+        self.assertFalse(success)
+        lines = message.split("\n")
+        self.assertEqual(lines[0], "Import failed, 4 invalid rows:")
+        self.assertEqual(lines[1], "Line 2: name is missing; price must be positive")
+        self.assertEqual(lines[2], "Line 3: not a JSON object")
+        self.assertTrue(lines[3].startswith("Line 4: price 'cheap' is not a number; preparation time"))
+        self.assertEqual(lines[4], "Line 5: item ID x appears more than once")
+        self.assertEqual(self.menu_service.get_all_items(), [])
+
+    def test_03_export_round_trip_updates(self):
+        """Test an exported menu imports back, updating items by ID"""
+        self.menu_service.add_items([("Tea", 2.00, 2), ("Cake", 5.00, 5)])
+        for name in ("menu.csv", "menu.jsonl"):
+            path = os.path.join(self.test_data_dir, name)
+            success, message = self.menu_service.export_items(path)
+            self.assertTrue(success, message)
+            success, message = self.menu_service.import_items(path)
+            self.assertEqual(message, "Imported 2 items (0 added, 2 updated)")
+        self.assertEqual(sorted(item.name for item in self.menu_service.get_all_items()), ["Cake", "Tea"])
+        self.assertFalse(self.menu_service.import_items(os.path.join(self.test_data_dir, "menu.xml"))[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
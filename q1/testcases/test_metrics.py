@@ -0,0 +1,115 @@
+import unittest
+import os
+import sys
+import shutil
+from datetime import timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus, DEFAULT_DELIVERY_MINUTES
+from src.database import Database
+from src.metrics import LatencyHistogram, MIN_SAMPLES
+from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+
+
+class TestStageTimings(unittest.TestCase):
+    """Test cases for per-stage order timing histograms"""
+
+    def setUp(self):
+        """Set up services sharing one store"""
+        self.test_data_dir = "test_data_metrics"
+        os.environ['DATA_DIR'] = self.test_data_dir
+        os.makedirs(self.test_data_dir, exist_ok=True)
+
+        self.db = Database()
+        self.order_service = OrderService(self.db)
+        UserService(self.db).register_user("timeduser", "pass", "1 Timer Rd", "555-0001")
+        DeliveryAgentService(self.db).register_agent("timedagent", "pass", "555-0002")
+        _, message = MenuService(self.db).add_item("Timed Pizza", 10.00, 10)
+        self.item_id = message.split(": ")[1]
+
+    def tearDown(self):
+        """Clean up after tests"""
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+        if 'DATA_DIR' in os.environ:
+            del os.environ['DATA_DIR']
+
+    def _delivered_order(self, delivery_minutes):
+        """Run an order to delivery, backdating its delivery leg"""
+        _, message = self.order_service.create_order(
+            "timeduser", [(self.item_id, 1)], DeliveryMode.HOME_DELIVERY)
+        order_id = message.split(": ")[1]
+        for status in (OrderStatus.PREPARING, OrderStatus.READY_FOR_PICKUP, OrderStatus.OUT_FOR_DELIVERY):
+            self.order_service.update_order_status(order_id, status)
+        order = self.db.get_order(order_id)
+        order.status_times[OrderStatus.OUT_FOR_DELIVERY] -= timedelta(minutes=delivery_minutes)
+        self.order_service.update_order_status(order_id, OrderStatus.DELIVERED)
+        return order_id
+
+    def test_01_transitions_are_timestamped(self):
+        """Test every status an order enters is timestamped and survives a reload"""
+        order_id = self._delivered_order(12)
+        order = Database().get_order(order_id)
+
+        self.assertEqual(set(order.status_times), {OrderStatus.PLACED, OrderStatus.PREPARING,
+                                                   OrderStatus.READY_FOR_PICKUP,
+                                                   OrderStatus.OUT_FOR_DELIVERY, OrderStatus.DELIVERED})
+        self.assertEqual(order.status_times[OrderStatus.PLACED], order.creation_time)
+
+    def test_02_histograms_per_stage_item_and_agent(self):
+        """Test stage, menu item and agent histograms are filled, and stored as bucket counts only on flush"""
+        self._delivered_order(12)
+        self.assertEqual(Database().stage_timings.stages, {})
+        self.db.flush()
+        timings = Database().stage_timings
+
+        self.assertEqual(len(timings.stages[OrderStatus.PREPARING.value]), 1)
+        self.assertEqual(len(timings.items[self.item_id]), 1)
+        self.assertEqual(dict(timings.agents["timedagent"].buckets())["<=15m"], 1)
+        self.assertEqual(timings.agents["timedagent"].quantile(0.5), 12.0)
+        record = timings.to_records()["agent:timedagent"]
+        self.assertEqual(sorted(record), ["counts", "sums"])
+        self.assertEqual(len(record["counts"]), 12)
+
+    def test_03_measured_delivery_time_feeds_eta(self):
+        """Test ETAs use the measured delivery time once there are enough samples"""
+        self.assertEqual(self.db.stage_timings.delivery_minutes(), DEFAULT_DELIVERY_MINUTES)
+        for _ in range(MIN_SAMPLES):
+            self._delivered_order(12)
+        self.assertEqual(self.db.stage_timings.delivery_minutes("timedagent"), 12.0)
+
+        _, message = self.order_service.create_order(
+            "timeduser", [(self.item_id, 1)], DeliveryMode.HOME_DELIVERY)
+        order = self.db.get_order(message.split(": ")[1])
+        self.assertEqual(order.estimated_completion_time - order.creation_time, timedelta(minutes=22))
+
+    def test_04_histogram_decays_and_gives_percentiles(self):
+        """Test old durations fade from the bucket counts and percentiles come from the buckets"""
+        histogram = LatencyHistogram(decay_at=8)
+        for minutes in (1, 1, 1, 1, 50, 50, 50, 50):
+            histogram.add(minutes)
+        for minutes in (50, 50, 50, 50):
+            histogram.add(minutes)
+
+        # Halved at 8 durations and again at the next 8: the early 1-minute ones weigh less
+        buckets = dict(histogram.buckets())
+        self.assertEqual((buckets["<=1m"], buckets["<=60m"]), (1, 3))
+        self.assertEqual(histogram.quantile(0.5), 50)
+        self.assertEqual(histogram.quantile(0.1), 1)
+
+        histogram = LatencyHistogram()
+        for minutes in range(1, 101):
+            histogram.add(minutes)
+        self.assertEqual((histogram.quantile(0.5), histogram.quantile(0.95), histogram.quantile(0.99)),
+                         (53.0, 95.5, 95.5))
+
+        # Records saved before bucket counts were stored hold raw samples
+        legacy = LatencyHistogram.from_record({"samples": [12.0, 14.0]})
+        self.assertEqual((len(legacy), legacy.quantile(0.5)), (2, 13.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import Database
+from src.migrations import Migrator, MigrationStep, current_versions, read_versions, CHECKPOINT_FILE
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    """Test cases for versioned schemas and streaming migrations"""
+
+    def setUp(self):
+        self.test_data_dir = "test_data_migrations"
+        os.makedirs(self.test_data_dir, exist_ok=True)
+
+    def tearDown(self):
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+    def _write(self, collection, records):
+        with open(os.path.join(self.test_data_dir, f"{collection}.json"), "w") as f:
+            json.dump(records, f, indent=4)
+
+    def _read(self, collection):
+        with open(os.path.join(self.test_data_dir, f"{collection}.json")) as f:
+            return json.load(f)
+
+    def test_01_unversioned_directory_is_upgraded(self):
+        """Test files from before versioning are migrated when a store opens them"""
+        self._write("users", {"old": {"password": "p", "address": "a", "phone": "1", "order_history": ["o1"]}})
+        self._write("menu_items", {"m1": {"name": "Soup", "price": 4.0, "preparation_time": 5}})
+        self._write("orders", {"o1": {
+            "customer_username": "old", "items": [{"menu_item_id": "m1", "quantity": 1}],
+            "delivery_mode": "Takeaway", "delivery_address": None, "status": "Placed",
+            "creation_time": "2024-01-01T09:00:00", "estimated_completion_time": "2024-01-01T09:05:00",
+            "assigned_delivery_agent": None}})
+
+        db = Database(data_dir=self.test_data_dir)
+        self.assertEqual([order.order_id for order in db.get_user_orders("old")], ["o1"])
+        db.close()
+
+        self.assertNotIn("order_history", self._read("users")["old"])
+        order = self._read("orders")["o1"]
+        self.assertEqual(order["version"], 0)
+        self.assertEqual(order["status_times"], {"Placed": "2024-01-01T09:00:00"})
+        self.assertEqual(read_versions(self.test_data_dir), current_versions())
+        self.assertEqual(Migrator(self.test_data_dir).pending(), {})
+
+    def test_02_new_directory_starts_current(self):
+        """Test a new data directory is recorded at the current schema without migrating"""
+        self.assertEqual(Migrator(self.test_data_dir).migrate(), [])
+        self.assertEqual(read_versions(self.test_data_dir), current_versions())
+
+    def test_03_interrupted_migration_resumes(self):
+        """Test a migration stopped part way resumes from its checkpoint and keeps every record"""
+        self._write("menu_items", {f"m{i}": {"name": f"Dish {i}", "price": float(i)} for i in range(2000)})
+        fail_at = {"key": "m1700"}
+
+        def add_currency(key, record):
+            if key == fail_at["key"]:
+                raise RuntimeError("interrupted")
+            if key.endswith("9"):
+                return None
+            record["currency"] = "USD"
+            return key, record
+
+        steps = [MigrationStep("menu_items", 1, "add currency, drop retired dishes", add_currency)]
+        with self.assertRaises(RuntimeError):
+            Migrator(self.test_data_dir, steps, checkpoint_every=500).migrate()
+        self.assertTrue(os.path.exists(os.path.join(self.test_data_dir, CHECKPOINT_FILE)))
+        self.assertNotIn("currency", self._read("menu_items")["m0"])
+
+        fail_at["key"] = None
+        results = Migrator(self.test_data_dir, steps, checkpoint_every=500).migrate()
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].resumed_at, 1500)
+        self.assertEqual(results[0].records + results[0].dropped, 500)
+        self.assertGreater(results[0].records_per_second, 0)
+
+        items = self._read("menu_items")
+        self.assertEqual(len(items), 1800)
+        self.assertTrue(all(item["currency"] == "USD" for item in items.values()))
+        self.assertFalse(os.path.exists(os.path.join(self.test_data_dir, CHECKPOINT_FILE)))
+        self.assertEqual(read_versions(self.test_data_dir)["menu_items"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import os
+import sys
+import shutil
+import json
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode
+from src.database import Database
+from src.services import UserService, MenuService, OrderService
+
+
+class TestOrderPagination(unittest.TestCase):
+    """Test cases for cursor-based order listings"""
+
+    def setUp(self):
+        """Set up test environment with a handful of orders"""
+        self.test_data_dir = "test_data_pagination"
+        os.environ['DATA_DIR'] = self.test_data_dir
+        os.makedirs(self.test_data_dir, exist_ok=True)
+
+        self.user_service = UserService()
+        self.menu_service = MenuService()
+        self.user_service.register_user("pageuser", "pass", "1 Page St", "555-0001")
+        self.user_service.register_user("otheruser", "pass", "2 Page St", "555-0002")
+        _, message = self.menu_service.add_item("Page Pizza", 10.00, 10)
+        item_id = message.split(": ")[1]
+
+        self.order_service = OrderService()
+        self.order_ids = []
+        for i in range(7):
+            username = "pageuser" if i % 2 == 0 else "otheruser"
+            _, message = self.order_service.create_order(
+                username, [(item_id, 1)], DeliveryMode.TAKEAWAY)
+            self.order_ids.append(message.split(": ")[1])
+
+        self.order_service = OrderService()
+        self.user_service = UserService()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+        if 'DATA_DIR' in os.environ:
+            del os.environ['DATA_DIR']
+
+    def test_01_pages_cover_all_orders_in_creation_order(self):
+        """Test paging through all orders returns each order once, oldest first"""
+        seen = []
+        orders, cursor = self.order_service.get_orders_page(page_size=3)
+        seen.extend(order.order_id for order in orders)
+        while cursor:
+            orders, cursor = self.order_service.get_orders_page(cursor, page_size=3)
+            self.assertLessEqual(len(orders), 3)
+            seen.extend(order.order_id for order in orders)
+
+        self.assertEqual(seen, self.order_ids)
+
+    def test_02_last_page_has_no_cursor(self):
+        """Test an exactly-full final page does not hand out a dangling cursor"""
+        orders, cursor = self.order_service.get_orders_page(page_size=7)
+        self.assertEqual(len(orders), 7)
+        self.assertIsNone(cursor)
+
+    def test_03_user_order_pages(self):
+        """Test paging through one user's orders"""
+        orders, cursor = self.user_service.get_user_orders_page("pageuser", page_size=2)
+        self.assertEqual([o.order_id for o in orders], self.order_ids[0:4:2])
+
+        orders, cursor = self.user_service.get_user_orders_page("pageuser", cursor, page_size=2)
+        self.assertEqual([o.order_id for o in orders], self.order_ids[4:7:2])
+        self.assertIsNone(cursor)
+
+    def test_04_iterator_resumes_from_cursor(self):
+        """Test the streaming iterator resumes after a cursor"""
+        _, cursor = self.order_service.get_orders_page(page_size=5)
+        remaining = [order.order_id for order in self.order_service.iter_orders(cursor)]
+        self.assertEqual(remaining, self.order_ids[5:])
+
+    def test_05_legacy_history_is_migrated(self):
+        """Test order histories copied into an old users file are dropped and pages follow creation time"""
+        users_path = os.path.join(self.test_data_dir, "users.json")
+        with open(users_path) as f:
+            users = json.load(f)
+        users["pageuser"]["order_history"] = list(reversed(self.order_ids[0:7:2]))
+        with open(users_path, "w") as f:
+            json.dump(users, f)
+        # Directories from before versioned schemas have no version sidecar
+        os.remove(os.path.join(self.test_data_dir, "schema_version.json"))
+
+        user_service = UserService(Database())
+        with open(users_path) as f:
+            self.assertNotIn("order_history", json.load(f)["pageuser"])
+
+        seen = []
+        orders, cursor = user_service.get_user_orders_page("pageuser", page_size=1)
+        seen.extend(order.order_id for order in orders)
+        while cursor:
+            orders, cursor = user_service.get_user_orders_page("pageuser", cursor, page_size=1)
+            seen.extend(order.order_id for order in orders)
+
+        self.assertEqual(seen, self.order_ids[0:7:2])
+        self.assertEqual([o.order_id for o in user_service.get_user_orders("pageuser")], seen)
+        self.assertEqual(list(user_service.get_user_details("pageuser")[1].order_history), seen)
+
+    def test_06_orders_do_not_rewrite_users(self):
+        """Test placing an order leaves the users file alone but extends the history"""
+        users_path = os.path.join(self.test_data_dir, "users.json")
+        with open(users_path) as f:
+            before = f.read()
+
+        item_id = self.order_service.db.get_all_orders()[0].items[0].menu_item.item_id
+        _, message = self.order_service.create_order("pageuser", [(item_id, 1)], DeliveryMode.TAKEAWAY)
+
+        with open(users_path) as f:
+            self.assertEqual(f.read(), before)
+        history = self.order_service.db.get_user("pageuser").order_history
+        self.assertEqual(history[-1], message.split(": ")[1])
+        self.assertEqual(len(history), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
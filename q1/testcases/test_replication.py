@@ -0,0 +1,174 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.clock import VirtualClock
+from src.database import Database
+from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+from src.replica import Replica, REPLICA_STATE_FILE
+from src.replication_log import read_checkpoint
+
+
+class TestReplication(unittest.TestCase):
+    """Test cases for the replication log and warm standby replicas"""
+
+    def setUp(self):
+        self.primary_dir = "test_data_primary"
+        self.replica_dir = "test_data_replica"
+        os.makedirs(self.primary_dir, exist_ok=True)
+        os.makedirs(self.replica_dir, exist_ok=True)
+        self.clock = VirtualClock(datetime(2024, 1, 1, 12, 0))
+        self.primary = Database(data_dir=self.primary_dir, clock=self.clock, replicate=True)
+
+    def tearDown(self):
+        self.primary.close()
+        for path in (self.primary_dir, self.replica_dir):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+    def _place_order(self):
+        UserService(self.primary).register_user("follow", "pass", "1 Follow St", "555-0001")
+        DeliveryAgentService(self.primary).register_agent("rider", "pass", "555-0002")
+        _, message = MenuService(self.primary).add_item("Replica Soup", 6.00, 10)
+        item_id = message.split(": ")[1]
+        _, message = OrderService(self.primary).create_order(
+            "follow", [(item_id, 2)], DeliveryMode.HOME_DELIVERY, "1 Follow St", idempotency_key="k1")
+        return item_id, message.split(": ")[1]
+
+    def test_01_replica_follows_primary(self):
+        """Test every kind of record written on the primary reaches the replica"""
+        replica = Replica(self.primary_dir, self.replica_dir, clock=self.clock)
+        item_id, order_id = self._place_order()
+        OrderService(self.primary).update_order_status(order_id, OrderStatus.PREPARING)
+        MenuService(self.primary).update_item(item_id, "Replica Stew", 7.50, 12)
+
+        self.assertGreater(replica.poll(), 0)
+        self.assertEqual(replica.lag()["events"], 0)
+        db = replica.db
+        self.assertEqual(db.get_user("follow").address, "1 Follow St")
+        self.assertEqual([order.order_id for order in db.get_user_orders("follow")], [order_id])
+        self.assertEqual(db.get_order(order_id).status, OrderStatus.PREPARING)
+        self.assertEqual(db.get_order(order_id).assigned_delivery_agent, "rider")
+        self.assertEqual(db.get_menu_item(item_id).name, "Replica Stew")
+        self.assertEqual(db.get_delivery_agent("rider").current_orders, [order_id])
+        self.assertIsNotNone(db.idempotency_keys.to_record("k1"))
+
+        MenuService(self.primary).delete_item(item_id)
+        replica.poll()
+        self.assertIsNone(db.get_menu_item(item_id))
+        replica.close()
+
+    def test_02_lag_while_behind(self):
+        """Test lag counts unapplied entries and how long the oldest of them has waited"""
+        replica = Replica(self.primary_dir, clock=self.clock)
+        UserService(self.primary).register_user("first", "pass", "1 First St", "555-0003")
+        replica.poll()
+        # A quiet primary is not lag, however long ago the last entry was applied
+        self.clock.advance(timedelta(seconds=30))
+        self.assertEqual(replica.lag()["seconds"], 0.0)
+
+        UserService(self.primary).register_user("second", "pass", "2 Second St", "555-0004")
+        self.clock.advance(timedelta(seconds=20))
+        UserService(self.primary).register_user("third", "pass", "3 Third St", "555-0005")
+        self.clock.advance(timedelta(seconds=5))
+        lag = replica.lag()
+        self.assertEqual(lag["events"], 2)
+        self.assertEqual(lag["seconds"], 25)
+        replica.poll()
+        self.assertEqual(replica.lag(), {"events": 0, "seconds": 0.0, "applied_seq": 3})
+        replica.close()
+
+    def test_03_promote_and_resume(self):
+        """Test a replica resumes from its state file and takes writes once promoted"""
+        self._place_order()
+        self.primary.flush()
+        replica = Replica(self.primary_dir, self.replica_dir, clock=self.clock)
+        replica.poll()
+        replica.close()
+        applied = replica.applied_seq
+        self.assertTrue(os.path.exists(os.path.join(self.replica_dir, REPLICA_STATE_FILE)))
+
+        UserService(self.primary).register_user("late", "pass", "3 Late St", "555-0005")
+        resumed = Replica(self.primary_dir, self.replica_dir, clock=self.clock)
+        self.assertEqual(resumed.applied_seq, applied)
+        db = resumed.promote()
+        self.assertEqual(resumed.applied_seq, applied + 1)
+        self.assertIsNotNone(db.get_user("late"))
+
+        UserService(self.primary).register_user("ignored", "pass", "4 Old St", "555-0006")
+        self.assertEqual(resumed.poll(), 0)
+        success, _ = UserService(db).register_user("fresh", "pass", "5 New St", "555-0007")
+        self.assertTrue(success)
+        resumed.close()
+
+        reopened = Database(data_dir=self.replica_dir, replicate=False)
+        self.assertIsNotNone(reopened.get_user("fresh"))
+        self.assertIsNone(reopened.get_user("ignored"))
+        reopened.close()
+
+    def test_04_resume_offset_and_rotation(self):
+        """Test a replica reads on from its stored offset, across a checkpoint that rotates the log"""
+        UserService(self.primary).register_user("early", "pass", "1 Early St", "555-0008")
+        replica = Replica(self.primary_dir, self.replica_dir, clock=self.clock)
+        replica.poll()
+        replica.close()
+        with open(os.path.join(self.replica_dir, REPLICA_STATE_FILE)) as f:
+            state = json.load(f)
+        self.assertEqual((state["log_segment"], state["applied_seq"]), (0, 1))
+        self.assertEqual(state["log_offset"], os.path.getsize(self.primary.replication_log.path))
+
+        # Written before and after a checkpoint while the replica is down
+        UserService(self.primary).register_user("before", "pass", "2 Before St", "555-0009")
+        self.assertTrue(self.primary.checkpoint())
+        UserService(self.primary).register_user("after", "pass", "3 After St", "555-0010")
+        self.assertEqual(read_checkpoint(self.primary_dir)[0], 2)
+
+        resumed = Replica(self.primary_dir, self.replica_dir, clock=self.clock)
+        self.assertEqual((resumed._reader.base, resumed._reader.position), (0, state["log_offset"]))
+        self.assertEqual([entry["key"] for entry in resumed._reader.read_new()], ["before", "after"])
+        resumed._reader.base, resumed._reader.position = 0, state["log_offset"]
+        self.assertEqual(resumed.poll(), 2)
+        self.assertEqual(resumed._reader.base, 2)
+        self.assertIsNotNone(resumed.db.get_user("after"))
+        resumed.close()
+
+        # A new replica starts from the checkpoint and replays only the newer segment
+        fresh_dir = self.replica_dir + "_fresh"
+        fresh = Replica(self.primary_dir, fresh_dir, clock=self.clock)
+        self.assertEqual(fresh.applied_seq, 2)
+        self.assertIsNotNone(fresh.db.get_user("before"))
+        self.assertEqual(fresh.poll(), 1)
+        self.assertEqual(sorted(fresh.db.users), ["after", "before", "early"])
+        fresh.close()
+        shutil.rmtree(fresh_dir)
+
+        # A second checkpoint drops the segment the old checkpoint started
+        self.primary.checkpoint()
+        self.assertFalse(os.path.exists(os.path.join(self.primary_dir, "replication_checkpoints", "0")))
+
+    def test_05_promoted_replica_is_followed(self):
+        """Test a promoted replica logs its writes and checkpoints, so another replica can follow it"""
+        self._place_order()
+        replica = Replica(self.primary_dir, self.replica_dir, clock=self.clock)
+        db = replica.promote()
+        UserService(db).register_user("promoted", "pass", "6 New St", "555-0011")
+
+        follower_dir = self.replica_dir + "_follower"
+        follower = Replica(self.replica_dir, follower_dir, clock=self.clock)
+        follower.poll()
+        self.assertIsNotNone(follower.db.get_user("promoted"))
+        self.assertIsNotNone(follower.db.get_user("follow"))
+        follower.close()
+        replica.close()
+        shutil.rmtree(follower_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import os
+import sys
+import shutil
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.sharding import ConsistentHashRing, ShardedStore
+
+
+class TestConsistentHashRing(unittest.TestCase):
+    """Test cases for consistent-hash routing"""
+
+    def test_01_routing_is_stable(self):
+        """Test the same key always routes to the same node"""
+        ring = ConsistentHashRing(["r1", "r2", "r3"])
+        self.assertEqual(ring.get_node("agent-7"), ring.get_node("agent-7"))
+        self.assertIsNone(ConsistentHashRing().get_node("anything"))
+
+    def test_02_adding_node_moves_few_keys(self):
+        """Test adding a node only remaps a minority of keys"""
+        ring = ConsistentHashRing(["r1", "r2", "r3", "r4"])
+        keys = [f"key-{i}" for i in range(2000)]
+        before = {key: ring.get_node(key) for key in keys}
+
+        ring.add_node("r5")
+        moved = [key for key in keys if ring.get_node(key) != before[key]]
+
+        self.assertTrue(all(ring.get_node(key) == "r5" for key in moved))
+        self.assertLess(len(moved), len(keys) * 0.35)
+
+
+class TestShardedStore(unittest.TestCase):
+    """Test cases for hosting several restaurants in one process"""
+
+    def setUp(self):
+        self.base_dir = "test_data_shards"
+        self.store = ShardedStore(self.base_dir, ["north", "south"])
+        self.item_ids = {}
+        for restaurant_id, price in (("north", 10.0), ("south", 4.0)):
+            shard = self.store.shard(restaurant_id)
+            shard.user_service.register_user("diner", "pass", "1 Shard St", "555-0001")
+            _, message = shard.menu_service.add_item("Dish", price, 10)
+            self.item_ids[restaurant_id] = message.split(": ")[1]
+
+    def tearDown(self):
+        if os.path.exists(self.base_dir):
+            shutil.rmtree(self.base_dir)
+
+    def test_01_restaurants_persist_separately(self):
+        """Test each restaurant writes to its own directory"""
+        success, message = self.store.create_order(
+            "north", "diner", [(self.item_ids["north"], 1)], DeliveryMode.TAKEAWAY)
+        self.assertTrue(success)
+
+        reopened = ShardedStore(self.base_dir, ["north", "south"])
+        self.assertEqual(len(reopened.shard("north").db.orders), 1)
+        self.assertEqual(len(reopened.shard("south").db.orders), 0)
+        self.assertIsNotNone(reopened.find_order(message.split(": ")[1]))
+
+    def test_02_agents_route_to_one_shard(self):
+        """Test agents are placed on and found at their routed restaurant"""
+        success, _ = self.store.register_agent("fleet1", "pass", "555-0002")
+        self.assertTrue(success)
+
+        owner = self.store.route("fleet1")
+        self.assertIsNotNone(self.store.shard(owner).db.get_delivery_agent("fleet1"))
+        self.assertTrue(self.store.login_agent("fleet1", "pass")[0])
+
+    def test_03_cross_shard_revenue(self):
+        """Test admin revenue queries fan out across restaurants"""
+        self.store.create_order("north", "diner", [(self.item_ids["north"], 2)], DeliveryMode.TAKEAWAY)
+        self.store.create_order("south", "diner", [(self.item_ids["south"], 1)], DeliveryMode.TAKEAWAY)
+        _, message = self.store.create_order(
+            "south", "diner", [(self.item_ids["south"], 5)], DeliveryMode.TAKEAWAY)
+        self.store.shard("south").order_service.cancel_order(message.split(": ")[1])
+
+        self.assertEqual(self.store.revenue_by_restaurant(), {"north": 20.0, "south": 4.0})
+        self.assertEqual(self.store.total_revenue(), 24.0)
+        self.assertEqual(self.store.order_counts_by_status(),
+                         {OrderStatus.PLACED.value: 2, OrderStatus.CANCELLED.value: 1})
+
+    def _agent_routed_to(self, restaurant_id):
+        return next(f"agent-{i}" for i in range(1000) if self.store.route(f"agent-{i}") == restaurant_id)
+
+    def test_04_agents_move_when_restaurants_change(self):
+        """Test agents stay reachable after restaurants are added and removed"""
+        usernames = [f"fleet-{i}" for i in range(20)]
+        for username in usernames:
+            self.store.register_agent(username, "pass", "555-0002")
+
+        self.store.add_restaurant("east")
+        self.assertTrue(all(self.store.login_agent(name, "pass")[0] for name in usernames))
+        self.assertGreater(len(self.store.shard("east").db.delivery_agents), 0)
+
+        self.store.remove_restaurant("north")
+        self.assertTrue(all(self.store.login_agent(name, "pass")[0] for name in usernames))
+        held = sum(len(self.store.shard(r).db.delivery_agents) for r in self.store.restaurant_ids)
+        self.assertEqual(held, 20)
+
+    def test_05_home_delivery_uses_the_whole_fleet(self):
+        """Test a restaurant without free agents borrows one held by another"""
+        username = self._agent_routed_to("south")
+        self.store.register_agent(username, "pass", "555-0002")
+
+        _, message = self.store.create_order(
+            "north", "diner", [(self.item_ids["north"], 1)], DeliveryMode.HOME_DELIVERY)
+        order_id = message.split(": ")[1]
+        self.assertEqual(self.store.find_order(order_id).assigned_delivery_agent, username)
+
+        north = self.store.shard("north").order_service
+        north.update_order_status(order_id, OrderStatus.PREPARING)
+        north.update_order_status(order_id, OrderStatus.READY_FOR_PICKUP)
+        north.update_order_status(order_id, OrderStatus.OUT_FOR_DELIVERY)
+        success, _ = self.store.complete_order(username, order_id)
+
+        self.assertTrue(success)
+        self.assertEqual(self.store.find_order(order_id).status, OrderStatus.DELIVERED)
+        self.assertEqual(self.store.shard("south").db.get_delivery_agent(username).current_orders, [])
+
+    def test_06_borrowed_agent_freed_by_shard_services(self):
+        """Test cancelling or handing over an order at its own restaurant frees an agent held by another"""
+        username = self._agent_routed_to("south")
+        self.store.register_agent(username, "pass", "555-0002")
+        agent = self.store.shard("south").db.get_delivery_agent(username)
+        north = self.store.shard("north").order_service
+
+        _, message = self.store.create_order(
+            "north", "diner", [(self.item_ids["north"], 1)], DeliveryMode.HOME_DELIVERY, idempotency_key="k1")
+        order_id = message.split(": ")[1]
+        self.assertEqual(agent.current_orders, [order_id])
+        # A retry returns the first result and borrows no second agent
+        self.assertEqual(self.store.create_order(
+            "north", "diner", [(self.item_ids["north"], 1)], DeliveryMode.HOME_DELIVERY,
+            idempotency_key="k1"), (True, message))
+        self.assertTrue(north.cancel_order(order_id)[0])
+        self.assertEqual(agent.current_orders, [])
+        self.assertTrue(agent.available)
+
+        _, message = self.store.create_order(
+            "north", "diner", [(self.item_ids["north"], 1)], DeliveryMode.HOME_DELIVERY)
+        order_id = message.split(": ")[1]
+        north.update_order_status(order_id, OrderStatus.PREPARING)
+        north.update_order_status(order_id, OrderStatus.READY_FOR_PICKUP)
+        north.update_order_status(order_id, OrderStatus.PICKED_UP)
+        self.assertEqual(agent.current_orders, [])
+        self.assertEqual(self.store.shard("north").db.get_delivery_agent(username), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.clock import VirtualClock
+from src.database import Database
+from src.storage import MemoryStorage
+from src.services import UserService, MenuService, OrderService
+from src.simulation import RestaurantSimulation, TraceOrder, generate_trace
+
+
+class TestVirtualClock(unittest.TestCase):
+    """Test cases for running the services on an injected clock"""
+
+    def setUp(self):
+        self.clock = VirtualClock(datetime(2024, 3, 1, 12, 0))
+        self.db = Database(storage=MemoryStorage(), clock=self.clock)
+        self.order_service = OrderService(self.db)
+        UserService(self.db).register_user("clockuser", "pass", "1 Clock St", "555-0001")
+        _, message = MenuService(self.db).add_item("Clock Pizza", 10.00, 10)
+        _, message = self.order_service.create_order(
+            "clockuser", [(message.split(": ")[1], 1)], DeliveryMode.TAKEAWAY)
+        self.order_id = message.split(": ")[1]
+
+    def test_01_orders_use_the_injected_clock(self):
+        """Test creation times, transitions and events follow virtual time"""
+        order = self.db.get_order(self.order_id)
+        self.assertEqual(order.creation_time, datetime(2024, 3, 1, 12, 0))
+
+        self.clock.advance(timedelta(minutes=4))
+        self.order_service.update_order_status(self.order_id, OrderStatus.PREPARING)
+        self.assertEqual(order.status_times[OrderStatus.PREPARING], datetime(2024, 3, 1, 12, 4))
+        self.assertEqual(order.get_time_remaining(self.clock.now()), 6)
+        self.assertEqual([event.timestamp.minute for event in self.db.change_feed.read()], [0, 4])
+
+    def test_02_clock_only_moves_forward(self):
+        """Test a virtual clock refuses to go backwards"""
+        with self.assertRaises(ValueError):
+            self.clock.advance(timedelta(minutes=-1))
+        self.clock.advance_to(datetime(2024, 1, 1))
+        self.assertEqual(self.clock.now(), datetime(2024, 3, 1, 12, 0))
+
+
+class TestRestaurantSimulation(unittest.TestCase):
+    """Test cases for the discrete-event simulator"""
+
+    def test_01_simulated_day_completes_every_order(self):
+        """Test a day of traffic is simulated in virtual time with sane figures"""
+        simulation = RestaurantSimulation(agents=6, kitchen_stations=4, seed=1)
+        trace = generate_trace(len(simulation.menu_ids), hours=8, orders_per_hour=20, seed=1)
+        report = simulation.run(trace)
+
+        self.assertEqual(report.orders_placed, len(trace))
+        self.assertEqual(report.orders_completed, len(trace))
+        self.assertGreaterEqual(report.simulated_minutes, 8 * 60 - 60)
+        self.assertLess(report.wall_seconds, 30)
+        self.assertTrue(0 < report.agent_utilization <= 1)
+        self.assertEqual(simulation.db.get_all_delivery_agents()[0].current_orders, [])
+
+    def test_02_kitchen_queue_builds_when_saturated(self):
+        """Test a single station queues a burst of orders and finishes them in turn"""
+        simulation = RestaurantSimulation(menu=[("Stew", 5.00, 10)], kitchen_stations=1)
+        trace = [TraceOrder(0, "burst", [(0, 1)], DeliveryMode.TAKEAWAY) for _ in range(3)]
+        report = simulation.run(trace)
+
+        self.assertEqual(report.kitchen_queue_max, 2)
+        self.assertEqual(report.simulated_minutes, 35)  # Three cooks of 10 minutes, then a 5 minute pickup
+        self.assertEqual(sorted(report.completion_minutes), [15, 25, 35])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import os
+import gc
+import sys
+import threading
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.database import Database
+from src.storage import MemoryStorage
+from src.services import UserService, MenuService, OrderService
+
+
+class TestReadSnapshots(unittest.TestCase):
+    """Test cases for point-in-time order snapshots"""
+
+    def setUp(self):
+        """Set up a customer and a menu item on an in-memory store"""
+        self.db = Database(storage=MemoryStorage())
+        self.order_service = OrderService(self.db)
+        UserService(self.db).register_user("reader", "pass", "1 Snapshot Rd", "555-0001")
+        _, message = MenuService(self.db).add_item("Frozen Pizza", 10.00, 10)
+        self.item_id = message.split(": ")[1]
+
+    def tearDown(self):
+        self.db.close()
+
+    def _place(self):
+        _, message = self.order_service.create_order("reader", [(self.item_id, 2)], DeliveryMode.TAKEAWAY)
+        return message.split(": ")[1]
+
+    def test_01_later_writes_are_not_visible(self):
+        """Test a snapshot keeps the orders as they were when it was taken"""
+        order_id = self._place()
+        snapshot = self.order_service.get_orders_snapshot()
+
+        self.order_service.update_order_status(order_id, OrderStatus.PREPARING)
+        self._place()
+
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual(snapshot.get_order(order_id).status, OrderStatus.PLACED)
+        self.assertEqual(snapshot.get_order(order_id).total_price, 20.00)
+        fresh = self.order_service.get_orders_snapshot()
+        self.assertEqual(len(fresh), 2)
+        self.assertEqual(fresh.get_order(order_id).status, OrderStatus.PREPARING)
+        self.assertGreater(fresh.generation, snapshot.generation)
+
+    def test_02_unchanged_store_shares_snapshots(self):
+        """Test snapshots taken with no writes in between share one table"""
+        self._place()
+        first = self.db.snapshot()
+        second = self.db.snapshot()
+        self.assertEqual(first.generation, second.generation)
+        self.assertEqual(first.orders, second.orders)
+        with self.assertRaises(TypeError):
+            first.orders["forged"] = None
+
+    def test_03_reads_during_writes(self):
+        """Test iterating a snapshot while another thread places orders sees a stable set"""
+        for _ in range(20):
+            self._place()
+        snapshot = self.db.snapshot()
+        errors = []
+
+        def write():
+            try:
+                for _ in range(200):
+                    self._place()
+            except Exception as e:
+                errors.append(e)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        counts = [sum(1 for _ in snapshot.iter_orders()) for _ in range(50)]
+        writer.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(set(counts), {20})
+        self.assertEqual(len(self.db.snapshot()), 220)
+
+    def test_04_writes_after_a_snapshot_copy_one_order(self):
+        """Test a write after a snapshot keeps one extra version of that order instead of copying the table"""
+        order_ids = [self._place() for _ in range(50)]
+        snapshot = self.db.snapshot()
+        table = self.db._snapshots
+        versions = table._versions
+
+        for status in (OrderStatus.PREPARING, OrderStatus.READY_FOR_PICKUP, OrderStatus.PICKED_UP):
+            self.order_service.update_order_status(order_ids[0], status)
+        self.assertIs(table._versions, versions)
+        self.assertEqual([len(versions[order_id]) for order_id in order_ids[:2]], [2, 1])
+        self.assertEqual(snapshot.get_order(order_ids[0]).status, OrderStatus.PLACED)
+        self.assertEqual(self.db.snapshot().get_order(order_ids[0]).status, OrderStatus.PICKED_UP)
+
+        # Once no snapshot can see the old version it goes with the order's next write
+        del snapshot
+        gc.collect()
+        self.order_service.update_order_status(order_ids[1], OrderStatus.PREPARING)
+        self.order_service.update_order_status(order_ids[1], OrderStatus.CANCELLED)
+        self.assertEqual(len(versions[order_ids[1]]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
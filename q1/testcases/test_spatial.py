@@ -0,0 +1,126 @@
+import unittest
+import os
+import sys
+import random
+import shutil
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode
+from src.database import Database
+from src.storage import MemoryStorage
+from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+from src.spatial import AgentGrid, distance_km
+
+
+class TestAgentGrid(unittest.TestCase):
+    """Test cases for the agent position grid and nearest-agent assignment"""
+
+    def setUp(self):
+        self.test_data_dir = "test_data_spatial"
+        os.makedirs(self.test_data_dir, exist_ok=True)
+
+    def tearDown(self):
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+    def test_01_nearest_matches_brute_force(self):
+        """Test nearest queries agree with checking every agent, after moves and removals"""
+        rng = random.Random(7)
+        grid = AgentGrid(cell_km=0.5)
+        positions = {}
+        for i in range(500):
+            positions[f"a{i}"] = (rng.uniform(-10, 10), rng.uniform(-10, 10))
+            grid.update(f"a{i}", positions[f"a{i}"])
+        for i in range(0, 500, 3):
+            positions[f"a{i}"] = (rng.uniform(-30, 30), rng.uniform(-30, 30))
+            grid.update(f"a{i}", positions[f"a{i}"])
+        for i in range(0, 500, 7):
+            del positions[f"a{i}"]
+            grid.remove(f"a{i}")
+        self.assertEqual(len(grid), len(positions))
+
+        def even(username):
+            return int(username[1:]) % 2 == 0
+
+        for _ in range(200):
+            point = (rng.uniform(-35, 35), rng.uniform(-35, 35))
+            expected = sorted((distance_km(point, location), username)
+                              for username, location in positions.items() if even(username))[:3]
+            self.assertEqual(grid.nearest(point, 3, even), expected)
+        self.assertEqual(AgentGrid().nearest((0, 0)), [])
+
+    def test_02_queries_look_at_nearby_cells_only(self):
+        """Test nearest queries over 5000 agents look at a few cells around the point, not every agent"""
+        rng = random.Random(11)
+        grid = AgentGrid()
+        for _ in range(10):
+            for i in range(5000):
+                grid.update(f"a{i}", (rng.uniform(-15, 15), rng.uniform(-15, 15)))
+
+        for _ in range(200):
+            grid.nearest((rng.uniform(-15, 15), rng.uniform(-15, 15)), 8)
+            self.assertLessEqual(grid.last_cells, 25)
+            self.assertLess(grid.last_examined, 200)
+
+        # Moving within a cell leaves the cell sets alone
+        grid.update("a0", (0.2, 0.2))
+        cells = {cell: set(members) for cell, members in grid._cells.items()}
+        grid.update("a0", (0.7, 0.9))
+        self.assertEqual(grid._cells, cells)
+        self.assertEqual(grid.position("a0"), (0.7, 0.9))
+
+    def test_03_orders_go_to_nearest_available_agent(self):
+        """Test a delivery order goes to the nearest free agent, then to agents without a position, scanning every agent only then"""
+        db = Database(storage=MemoryStorage())
+        order_service = OrderService(db)
+        delivery_service = DeliveryAgentService(db)
+        UserService(db).register_user("near", "pass", "1 Near St", "555-0001")
+        _, message = MenuService(db).add_item("Near Noodles", 8.00, 10)
+        item_id = message.split(": ")[1]
+        for username in ("unplaced", "far", "close", "busy"):
+            delivery_service.register_agent(username, "pass", "555-0100")
+        delivery_service.update_location("far", 4.0, 3.0)
+        delivery_service.update_location("close", 0.5, -0.5)
+        delivery_service.update_location("busy", 0.1, 0.1)
+        db.get_delivery_agent("busy").available = False
+        self.assertFalse(delivery_service.update_location("nobody", 0, 0)[0])
+        self.assertFalse(delivery_service.update_location("far", float("nan"), 0)[0])
+
+        def place():
+            _, message = order_service.create_order("near", [(item_id, 1)], DeliveryMode.HOME_DELIVERY, "1 Near St")
+            return order_service.get_order(message.split(": ")[1]).assigned_delivery_agent
+
+        scans = []
+        get_available = db.get_available_delivery_agents
+        db.get_available_delivery_agents = lambda: scans.append(1) or get_available()
+
+        self.assertEqual([place() for _ in range(3)], ["close"] * 3)
+        self.assertEqual(scans, [])
+        self.assertEqual(place(), "far")
+        delivery_service.update_location("far", 9.0, 9.0)
+        self.assertEqual([place() for _ in range(2)], ["far", "far"])
+        self.assertEqual(place(), "unplaced")
+        self.assertEqual(len(scans), 1)
+        db.close()
+
+    def test_04_positions_survive_reopen(self):
+        """Test positions are saved when the store closes without a write per update"""
+        db = Database(data_dir=self.test_data_dir)
+        delivery_service = DeliveryAgentService(db)
+        delivery_service.register_agent("mover", "pass", "555-0200")
+        version = db.get_delivery_agent("mover").version
+        for step in range(100):
+            delivery_service.update_location("mover", step / 10, 1.0)
+        self.assertEqual(db.get_delivery_agent("mover").version, version)
+        db.close()
+
+        reopened = Database(data_dir=self.test_data_dir)
+        self.assertEqual(reopened.get_delivery_agent("mover").location, (9.9, 1.0))
+        self.assertEqual([agent.username for agent in reopened.nearest_available_agents((10, 1))], ["mover"])
+        reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
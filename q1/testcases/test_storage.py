@@ -0,0 +1,86 @@
+import unittest
+import os
+import sys
+import shutil
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.database import Database
+from src.storage import JsonFileStorage, MemoryStorage
+from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+
+
+class TestMemoryStorage(unittest.TestCase):
+    """Test cases for the in-memory storage backend"""
+
+    def setUp(self):
+        self.snapshot_dir = "test_data_snapshot"
+
+    def tearDown(self):
+        if os.path.exists(self.snapshot_dir):
+            shutil.rmtree(self.snapshot_dir)
+
+    def _stack(self, storage):
+        db = Database(storage=storage)
+        return (UserService(db), MenuService(db), OrderService(db), DeliveryAgentService(db))
+
+    def _seed(self, storage):
+        user_service, menu_service, order_service, _ = self._stack(storage)
+        user_service.register_user("memuser", "pass", "1 Memory Ln", "555-0001")
+        _, message = menu_service.add_item("Memory Pizza", 10.00, 10)
+        item_id = message.split(": ")[1]
+        _, message = order_service.create_order("memuser", [(item_id, 1)], DeliveryMode.TAKEAWAY)
+        return message.split(": ")[1]
+
+    def test_01_stacks_are_isolated(self):
+        """Test two service stacks on separate memory stores do not see each other"""
+        first, second = MemoryStorage(), MemoryStorage()
+        order_id = self._seed(first)
+
+        self.assertIsNotNone(Database(storage=first).get_order(order_id))
+        self.assertIsNone(Database(storage=second).get_order(order_id))
+        self.assertFalse(os.path.exists(self.snapshot_dir))
+
+    def test_02_stores_on_one_storage_share_data(self):
+        """Test a fresh store on the same memory storage sees saved writes"""
+        storage = MemoryStorage()
+        order_id = self._seed(storage)
+        OrderService(Database(storage=storage)).update_order_status(order_id, OrderStatus.PREPARING)
+
+        order = Database(storage=storage).get_order(order_id)
+        self.assertEqual(order.status, OrderStatus.PREPARING)
+        self.assertEqual(len(Database(storage=storage).get_user_orders("memuser")), 1)
+
+    def test_03_unsaved_changes_do_not_leak(self):
+        """Test mutating loaded models does not change stored records until saved"""
+        storage = MemoryStorage()
+        self._seed(storage)
+        db = Database(storage=storage)
+        db.get_user("memuser").address = "not-saved"
+
+        self.assertEqual(Database(storage=storage).get_user("memuser").address, "1 Memory Ln")
+
+    def test_04_snapshot_round_trip(self):
+        """Test a snapshot can be reopened from disk by either backend"""
+        storage = MemoryStorage(self.snapshot_dir)
+        order_id = self._seed(storage)
+        self.assertTrue(storage.snapshot())
+
+        from_files = Database(storage=JsonFileStorage(self.snapshot_dir))
+        self.assertIsNotNone(from_files.get_order(order_id))
+        reloaded = Database(storage=MemoryStorage(self.snapshot_dir))
+        self.assertEqual(reloaded.get_order(order_id).total_price, 10.00)
+
+    def test_05_change_feed_is_per_storage(self):
+        """Test order events stay with the memory storage that produced them"""
+        first, second = MemoryStorage(), MemoryStorage()
+        self._seed(first)
+
+        self.assertEqual(len(list(Database(storage=first).change_feed.read())), 1)
+        self.assertEqual(len(list(Database(storage=second).change_feed.read())), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
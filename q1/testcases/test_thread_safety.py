@@ -0,0 +1,135 @@
+import unittest
+import os
+import sys
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.database import Database, LOCK_STRIPES
+from src.storage import MemoryStorage
+from src.writer import DurabilityMode
+from src.services import UserService, MenuService, OrderService, DeliveryAgentService
+
+
+class TestThreadSafety(unittest.TestCase):
+    """Stress test for services shared by many threads"""
+
+    ORDERS = 2000
+    THREADS = 16
+
+    def setUp(self):
+        """Set up customers, agents and a menu on an in-memory store"""
+        # Switch threads as often as possible so unguarded read-check-writes interleave
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.storage = MemoryStorage()
+        # Coalesced writes, so the test measures locking rather than serialization
+        self.db = Database(storage=self.storage, durability=DurabilityMode.INTERVAL, write_interval=3600)
+        self.order_service = OrderService(self.db)
+        self.delivery_service = DeliveryAgentService(self.db)
+        user_service = UserService(self.db)
+        self.customers = [f"stress-customer-{i}" for i in range(20)]
+        for username in self.customers:
+            user_service.register_user(username, "pass", "1 Stress St", "555-0001")
+        self.agents = [f"stress-agent-{i}" for i in range(8)]
+        for username in self.agents:
+            self.delivery_service.register_agent(username, "pass", "555-0002")
+        menu_service = MenuService(self.db)
+        self.item_ids = [menu_service.add_item(f"Stress Dish {i}", 5.0 + i, 10)[1].split(": ")[1]
+                         for i in range(3)]
+
+    def tearDown(self):
+        sys.setswitchinterval(self._switch_interval)
+        self.db.close()
+
+    def _lifecycle(self, number: int):
+        """Place an order and drive it as far through delivery as the agents allow"""
+        rng = random.Random(number)
+        mode = DeliveryMode.HOME_DELIVERY if number % 2 else DeliveryMode.TAKEAWAY
+        success, message = self.order_service.create_order(
+            rng.choice(self.customers), [(rng.choice(self.item_ids), rng.randint(1, 3))], mode, "1 Stress St")
+        if not success:
+            return message
+        order_id = message.split(": ")[1]
+        self.order_service.update_order_status(order_id, OrderStatus.PREPARING)
+        self.order_service.update_order_status(order_id, OrderStatus.READY_FOR_PICKUP)
+
+        if mode == DeliveryMode.TAKEAWAY:
+            self.order_service.update_order_status(order_id, OrderStatus.PICKED_UP)
+            return None
+        agent = self.order_service.get_order(order_id).assigned_delivery_agent
+        if agent:
+            self.order_service.update_order_status(order_id, OrderStatus.OUT_FOR_DELIVERY)
+        else:
+            agent = rng.choice(self.agents)
+            if not self.delivery_service.assign_agent_to_order(order_id, agent)[0]:
+                return None
+        # Some deliveries are left out, so agents fill up and assignments contend
+        if rng.random() < 0.8:
+            self.delivery_service.complete_order(agent, order_id)
+        return None
+
+    def _lifecycle_with_registrations(self, number: int):
+        """Register a customer and an agent alongside every fourth order, as sign-ups arrive during a rush"""
+        if number % 4 == 0:
+            UserService(self.db).register_user(f"late-customer-{number}", "pass", "2 Stress St", "555-0003")
+            self.delivery_service.register_agent(f"late-agent-{number}", "pass", "555-0004")
+        return self._lifecycle(number)
+
+    def test_01_concurrent_lifecycles_keep_invariants(self):
+        """Test thousands of concurrent create/assign/complete operations and registrations leave consistent records"""
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            failures = [result for result in pool.map(self._lifecycle_with_registrations, range(self.ORDERS))
+                        if result]
+        self.assertEqual(failures, [])
+        self.assertEqual(len(self.db.orders), self.ORDERS)
+        self.assertEqual(len(self.db.users), len(self.customers) + self.ORDERS // 4)
+        self.assertEqual(len(self.db.delivery_agents), len(self.agents) + self.ORDERS // 4)
+        # Record locks are striped, so they do not grow with the number of orders
+        self.assertTrue(all(len(stripes) == LOCK_STRIPES for stripes in self.db._record_locks.values()))
+
+        # Every agent holds exactly its undelivered orders, and its availability matches
+        held = {}
+        for agent in self.db.get_all_delivery_agents():
+            self.assertEqual(len(agent.current_orders), len(set(agent.current_orders)))
+            self.assertEqual(agent.available, len(agent.current_orders) < 3)
+            for order_id in agent.current_orders:
+                held[order_id] = agent.username
+        for order in self.db.get_all_orders():
+            if order.assigned_delivery_agent and order.status != OrderStatus.DELIVERED:
+                self.assertEqual(held.get(order.order_id), order.assigned_delivery_agent)
+            else:
+                self.assertNotIn(order.order_id, held)
+            if order.delivery_mode == DeliveryMode.TAKEAWAY:
+                self.assertEqual(order.status, OrderStatus.PICKED_UP)
+        self.assertGreater(sum(order.status == OrderStatus.DELIVERED for order in self.db.orders.values()), 0)
+
+        # Histories cover every order once, in creation order
+        histories = [self.db.get_user_orders(username) for username in self.customers]
+        self.assertEqual(sum(len(history) for history in histories), self.ORDERS)
+        for history in histories:
+            times = [(order.creation_time, order.order_id) for order in history]
+            self.assertEqual(times, sorted(times))
+
+        # The stored copy agrees once the coalesced writes are flushed
+        self.assertTrue(self.db.flush())
+        reloaded = Database(storage=self.storage)
+        self.assertEqual(len(reloaded.orders), self.ORDERS)
+        for agent in self.db.get_all_delivery_agents():
+            self.assertEqual(reloaded.get_delivery_agent(agent.username).current_orders, agent.current_orders)
+        reloaded.close()
+
+    def test_02_concurrent_registration(self):
+        """Test only one of many concurrent registrations of a username succeeds"""
+        user_service = UserService(self.db)
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            results = list(pool.map(lambda _: user_service.register_user("race", "pass", "1 Race Rd", "555"),
+                                    range(200)))
+        self.assertEqual(sum(success for success, _ in results), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
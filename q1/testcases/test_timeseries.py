@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import shutil
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import DeliveryMode, OrderStatus
+from src.clock import VirtualClock
+from src.database import Database
+from src.storage import MemoryStorage
+from src.services import UserService, MenuService, OrderService
+from src.timeseries import (TimeSeriesRecorder, ORDERS_PLACED, TIME_TO_READY, ACTIVE_AGENTS,
+                            MINUTE_SLOTS, HOUR_SLOTS, sparkline)
+
+
+class TestTimeSeries(unittest.TestCase):
+    """Test cases for the ring-buffer operational time series"""
+
+    def setUp(self):
+        self.test_data_dir = "test_data_timeseries"
+        os.makedirs(self.test_data_dir, exist_ok=True)
+        self.clock = VirtualClock(datetime(2024, 1, 1, 9, 0))
+
+    def tearDown(self):
+        if os.path.exists(self.test_data_dir):
+            shutil.rmtree(self.test_data_dir)
+
+    def test_01_rings_roll_over(self):
+        """Test per-minute slots age out after an hour while hourly roll-ups keep the day"""
+        recorder = TimeSeriesRecorder(self.clock)
+        for _ in range(3):
+            recorder.record(ORDERS_PLACED)
+        recorder.record(TIME_TO_READY, 10)
+        recorder.record(TIME_TO_READY, 20)
+
+        minutes = recorder.values(ORDERS_PLACED)
+        self.assertEqual(len(minutes), MINUTE_SLOTS)
+        self.assertEqual(minutes[-1], 3)
+        self.assertEqual(recorder.values(TIME_TO_READY)[-1], 15)
+        self.assertIsNone(recorder.values(TIME_TO_READY)[-2])
+
+        self.clock.advance(timedelta(minutes=90))
+        recorder.record(ORDERS_PLACED)
+        self.assertEqual(sum(recorder.values(ORDERS_PLACED)), 1)
+        hours = recorder.values(ORDERS_PLACED, hourly=True)
+        self.assertEqual(len(hours), HOUR_SLOTS)
+        self.assertEqual(hours[-2:], [3 / 60, 1 / 60])
+
+        self.clock.advance(timedelta(days=1))
+        self.assertEqual(sum(recorder.values(ORDERS_PLACED, hourly=True)), 0)
+
+    def test_02_order_service_feeds_series(self):
+        """Test placing and preparing orders records throughput, time to ready and active agents"""
+        db = Database(storage=MemoryStorage(), clock=self.clock)
+        order_service = OrderService(db)
+        UserService(db).register_user("trend", "pass", "1 Trend St", "555-0001")
+        _, message = MenuService(db).add_item("Trend Soup", 5.00, 10)
+        item_id = message.split(": ")[1]
+
+        for minutes in (4, 8):
+            _, message = order_service.create_order("trend", [(item_id, 1)], DeliveryMode.TAKEAWAY)
+            order_id = message.split(": ")[1]
+            order_service.update_order_status(order_id, OrderStatus.PREPARING)
+            self.clock.advance(timedelta(minutes=minutes))
+            order_service.update_order_status(order_id, OrderStatus.READY_FOR_PICKUP)
+
+        self.assertEqual(sum(db.timeseries.values(ORDERS_PLACED)), 2)
+        self.assertEqual([value for value in db.timeseries.values(TIME_TO_READY, hourly=True)
+                          if value is not None], [6])
+        self.assertIsNone(db.timeseries.values(ACTIVE_AGENTS, hourly=True)[-1])
+        db.close()
+
+    def test_03_dump_and_load(self):
+        """Test the series survive a close and reopen, and a damaged dump is ignored"""
+        db = Database(data_dir=self.test_data_dir, clock=self.clock)
+        db.timeseries.record(ACTIVE_AGENTS, 4)
+        db.close()
+
+        reopened = Database(data_dir=self.test_data_dir, clock=self.clock)
+        self.assertEqual(reopened.timeseries.values(ACTIVE_AGENTS)[-1], 4)
+        reopened.close()
+
+        with open(os.path.join(self.test_data_dir, "timeseries.bin"), "r+b") as f:
+            f.truncate(100)
+        damaged = Database(data_dir=self.test_data_dir, clock=self.clock)
+        self.assertIsNone(damaged.timeseries.values(ACTIVE_AGENTS)[-1])
+        damaged.close()
+
+    def test_04_sparkline(self):
+        """Test sparklines scale to the largest value and leave gaps blank"""
+        self.assertEqual(sparkline([0, 4, None, 8]), "▁▅ █")
+        self.assertEqual(sparkline([None, 0]), " ▁")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import os
+import sys
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import Database
+from src.storage import MemoryStorage
+from src.services import MenuService
+from src.writer import BackgroundWriter, DurabilityMode
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    """Test cases for durability modes and write coalescing"""
+
+    def _menu(self, storage, mode, interval=60.0):
+        db = Database(storage=storage, durability=mode, write_interval=interval)
+        self.addCleanup(db.close)
+        return db, MenuService(db)
+
+    def _stored_items(self, storage):
+        return dict(storage.iter_records('menu_items'))
+
+    def test_01_sync_writes_before_returning(self):
+        """Test sync mode stores every change before the mutator returns"""
+        storage = MemoryStorage()
+        db, menu_service = self._menu(storage, DurabilityMode.SYNC)
+        for index in range(3):
+            menu_service.add_item(f"Sync Item {index}", 5.00, 5)
+
+        self.assertEqual(len(self._stored_items(storage)), 3)
+        self.assertEqual(db.writer.writes, 3)
+
+    def test_02_interval_coalesces_bursts(self):
+        """Test a burst of edits to one collection becomes a single write"""
+        storage = MemoryStorage()
+        db, menu_service = self._menu(storage, DurabilityMode.INTERVAL)
+        for index in range(50):
+            menu_service.add_item(f"Burst Item {index}", 5.00, 5)
+
+        self.assertEqual(self._stored_items(storage), {})
+        self.assertEqual(db.writer.pending, {'menu_items'})
+        self.assertTrue(db.flush())
+        self.assertEqual(len(self._stored_items(storage)), 50)
+        self.assertEqual((db.writer.notifications, db.writer.writes), (50, 1))
+
+    def test_03_async_writes_in_background(self):
+        """Test async mode stores changes without an explicit flush"""
+        storage = MemoryStorage()
+        db, menu_service = self._menu(storage, DurabilityMode.ASYNC)
+        menu_service.add_item("Async Item", 5.00, 5)
+
+        deadline = time.time() + 5
+        while not self._stored_items(storage) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self._stored_items(storage)), 1)
+
+    def test_04_close_flushes_pending_writes(self):
+        """Test shutting the writer down stores what was still pending"""
+        storage = MemoryStorage()
+        db, menu_service = self._menu(storage, DurabilityMode.INTERVAL)
+        menu_service.add_item("Closing Item", 5.00, 5)
+        db.close()
+
+        self.assertEqual(len(self._stored_items(storage)), 1)
+        # After closing, writes no longer wait for a thread
+        menu_service.add_item("Late Item", 5.00, 5)
+        self.assertEqual(len(self._stored_items(storage)), 2)
+
+    def test_05_failed_write_is_retried(self):
+        """Test a collection whose save fails stays dirty for the next flush"""
+        outcomes = [False, True]
+        writer = BackgroundWriter({'orders': lambda: outcomes.pop(0)}, DurabilityMode.INTERVAL, 60.0)
+        self.addCleanup(writer.close)
+        writer.mark_dirty('orders')
+
+        self.assertFalse(writer.flush())
+        self.assertEqual(writer.pending, {'orders'})
+        self.assertTrue(writer.flush())
+        self.assertEqual(writer.pending, set())
+
+    def test_06_close_returns_promptly(self):
+        """Test closing does not wait out the write interval"""
+        writer = BackgroundWriter({'orders': lambda: True}, DurabilityMode.INTERVAL, 60.0)
+        writer.mark_dirty('orders')
+
+        started = time.perf_counter()
+        self.assertTrue(writer.close())
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(writer.writes, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()